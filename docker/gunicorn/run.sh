@@ -14,6 +14,16 @@ python3 manage.py migrate
 # Collect static files into /var/www/static
 python3 manage.py collectstatic --noinput
 
-gunicorn encryption_compendium.wsgi \
+# Serve the site over ASGI (using uvicorn workers) when SERVER_INTERFACE=asgi.
+# Async views (e.g. /search_async) only avoid blocking the worker under ASGI.
+if [ "${SERVER_INTERFACE}" = "asgi" ]
+then
+    APP="encryption_compendium.asgi"
+    ADDTL_OPTS="${ADDTL_OPTS} --worker-class uvicorn.workers.UvicornWorker"
+else
+    APP="encryption_compendium.wsgi"
+fi
+
+gunicorn "${APP}" \
     --config "${GUNICORN_CONFIG}" \
     ${ADDTL_OPTS}
@@ -7,6 +7,19 @@ export POSTGRES_USER=$POSTGRES_USER
 export POSTGRES_PASSWORD=$POSTGRES_PASSWORD
 DATA_CONFIG="${CONFIG_DIR}/data-config.xml"
 
+# Query for the documents indexed by the DataImportHandler. Tags and authors are
+# aggregated into "|"-separated strings, sorted by codepoint (i.e. using the "C"
+# collation).
+ENTRIES_QUERY="select c.id, c.title, c.abstract, c.slug, c.url, c.year, c.month, c.day, \
+nullif(coalesce(p.publishername, c.publisher_text), '') as publisher, \
+(select string_agg(t.tagname, '|' order by t.tagname collate &quot;C&quot;) \
+from compendium_tags ct join entries_compendiumentrytag t on t.id = ct.compendiumentrytag_id \
+where ct.compendiumentry_id = c.id) as tags, \
+(select string_agg(a.authorname, '|' order by a.authorname collate &quot;C&quot;) \
+from compendium_authors ca join entries_author a on a.id = ca.author_id \
+where ca.compendiumentry_id = c.id) as authors \
+from compendium c left join entries_publisher p on p.id = c.publisher_id"
+
 cat > "${DATA_CONFIG}" <<- EOXML
 <dataConfig>
 
@@ -19,8 +32,35 @@ cat > "${DATA_CONFIG}" <<- EOXML
     user="$POSTGRES_USER"
     password="$POSTGRES_PASSWORD" />
 
+  <!--
+    full-import reads the whole compendium table, and is run with clean=true so
+    that every other document is removed from the index. delta-import only reads
+    the entries that were modified (or deleted) since the last import:
+
+    - deltaQuery finds entries whose last_modified is newer than the last import;
+    - deltaImportQuery fetches each of those entries; and
+    - deletedPkQuery finds deleted entries in the search index outbox. Other
+      changes are pruned from the outbox after SEARCH_OUTBOX_RETENTION days, but
+      the latest deletion of each entry is kept as a tombstone (see
+      search.indexing.OutboxWorker.prune), so deletions are found however long
+      it has been since the last delta import.
+
+    Tags and authors are split back into multiple values by the RegexTransformer.
+    These documents must be identical to the ones created by
+    search.documents.build_document.
+  -->
   <document name="entries">
-    <entity name="compendium" query="select id, title, abstract, slug, url, year, month, day from compendium" />
+    <entity
+      name="compendium"
+      pk="id"
+      transformer="RegexTransformer"
+      query="${ENTRIES_QUERY}"
+      deltaQuery="select id from compendium where last_modified &gt; '\${dataimporter.last_index_time}'"
+      deltaImportQuery="${ENTRIES_QUERY} where c.id = \${dataimporter.delta.id}"
+      deletedPkQuery="select distinct entry_id as id from search_index_outbox where action = 'delete' and created &gt; '\${dataimporter.last_index_time}'">
+      <field column="tags" splitBy="\|" />
+      <field column="authors" splitBy="\|" />
+    </entity>
   </document>
 
 </dataConfig>
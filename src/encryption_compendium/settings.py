@@ -154,6 +154,42 @@ elif backend == "dummy":
 else:
     raise Exception("CACHE_BACKEND must be 'dummy' or 'memcached'")
 
+# Search options
+# SOLR_URL: the URL of the Solr core used for search.
+# SOLR_POOL_SIZE: maximum number of keep-alive connections each worker process
+#   holds open to Solr.
+# SOLR_ASYNC_POOL_SIZE: the same as SOLR_POOL_SIZE, but for the pool used by
+#   the async search views (which can have many searches in flight at once).
+# SOLR_CONNECT_TIMEOUT, SOLR_READ_TIMEOUT: timeouts (in seconds) for
+#   connecting to Solr and for waiting on a response.
+# SOLR_MAX_RETRIES: number of times to retry idempotent requests that fail.
+# SEARCH_CACHE_TIMEOUT: number of seconds for which search results are cached.
+# SEARCH_MAX_ROWS: maximum number of results returned per page of a search.
+# SEARCH_INDEX_BATCH_SIZE: maximum number of documents sent to Solr at once.
+# SEARCH_OUTBOX_POLL_INTERVAL: number of seconds that the index worker waits
+#   between checks for new changes once the outbox is empty.
+# SEARCH_OUTBOX_MAX_BACKOFF: maximum number of seconds to wait before retrying
+#   changes that couldn't be sent to Solr.
+# SEARCH_OUTBOX_RETENTION: number of days for which changes are kept in the
+#   outbox after they've been sent to Solr. The latest deletion of each entry
+#   is kept regardless, since the DataImportHandler's delta-import finds
+#   deleted entries through it (see docker/solr/setup.sh).
+# SOLR_COMMIT_WITHIN: maximum number of milliseconds before changes sent to
+#   Solr become visible to searches.
+SOLR_URL = os.getenv("SOLR_URL", "http://tec-search:8983/solr/compendium")
+SOLR_POOL_SIZE = int(os.getenv("SOLR_POOL_SIZE", 4))
+SOLR_ASYNC_POOL_SIZE = int(os.getenv("SOLR_ASYNC_POOL_SIZE", 100))
+SOLR_CONNECT_TIMEOUT = float(os.getenv("SOLR_CONNECT_TIMEOUT", 3.05))
+SOLR_READ_TIMEOUT = float(os.getenv("SOLR_READ_TIMEOUT", 10))
+SOLR_MAX_RETRIES = int(os.getenv("SOLR_MAX_RETRIES", 2))
+SEARCH_CACHE_TIMEOUT = int(os.getenv("SEARCH_CACHE_TIMEOUT", 600))
+SEARCH_MAX_ROWS = int(os.getenv("SEARCH_MAX_ROWS", 100))
+SEARCH_INDEX_BATCH_SIZE = int(os.getenv("SEARCH_INDEX_BATCH_SIZE", 500))
+SEARCH_OUTBOX_POLL_INTERVAL = float(os.getenv("SEARCH_OUTBOX_POLL_INTERVAL", 1))
+SEARCH_OUTBOX_MAX_BACKOFF = float(os.getenv("SEARCH_OUTBOX_MAX_BACKOFF", 300))
+SEARCH_OUTBOX_RETENTION = int(os.getenv("SEARCH_OUTBOX_RETENTION", 7))
+SOLR_COMMIT_WITHIN = int(os.getenv("SOLR_COMMIT_WITHIN", 1000))
+
 # Authentication options
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
 
@@ -224,6 +260,38 @@ STATICFILES_FINDERS = (
     "compressor.finders.CompressorFinder",
 )
 
+### Snapshots of the full compendium
+# SNAPSHOT_ROOT: directory in which compressed snapshots of the compendium are
+#   written by `manage.py build_snapshots`. Defaults to a subdirectory of
+#   STATIC_ROOT, from which the snapshots are served by nginx.
+# SNAPSHOT_URL: the URL from which the files in SNAPSHOT_ROOT are served.
+# SNAPSHOT_KEEP: number of versions of the snapshots to keep. Older versions
+#   are kept around for a while so that downloads in progress aren't cut off.
+# SNAPSHOT_POLL_INTERVAL: number of seconds between checks for changes to the
+#   compendium when running `manage.py build_snapshots --watch`.
+SNAPSHOT_ROOT = os.getenv("SNAPSHOT_ROOT", os.path.join(STATIC_ROOT, "snapshots"))
+SNAPSHOT_URL = os.getenv("SNAPSHOT_URL", STATIC_URL + "snapshots/")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", 3))
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", 60))
+
+### Background imports of uploaded BibTeX and Zotero JSON
+# IMPORT_ROOT: directory in which uploaded files are kept until they've been
+#   imported. Must be shared between the site and the import workers.
+# IMPORT_WORKERS: number of worker processes started by
+#   `manage.py process_import_jobs`.
+# IMPORT_BATCH_SIZE: number of entries that are validated and inserted at a
+#   time while importing a file.
+# IMPORT_POLL_INTERVAL: number of seconds that an idle import worker waits
+#   between checks for new jobs.
+# IMPORT_VALIDATION_WORKERS: number of processes that each import worker uses
+#   to validate entries in parallel. With fewer than two, entries are
+#   validated in the import worker itself.
+IMPORT_ROOT = os.getenv("IMPORT_ROOT", os.path.join(MEDIA_ROOT, "imports"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", 2))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+IMPORT_POLL_INTERVAL = float(os.getenv("IMPORT_POLL_INTERVAL", 1))
+IMPORT_VALIDATION_WORKERS = int(os.getenv("IMPORT_VALIDATION_WORKERS", 2))
+
 ### Compression settings for django-compressor
 # COMPRESS_ENABLED: whether or not to compress files. Defaults to the
 # opposite of DEBUG.
@@ -0,0 +1,241 @@
+"""
+Query and latency budgets for every view of the site
+"""
+
+from django.test import override_settings, tag
+from entries.importers import EntryImporter
+from entries.models import CompendiumEntry, CompendiumEntryTag
+from research_assistant.models import ImportJob
+from search.documents import build_document, index_queryset
+from users.models import SignupToken, User
+from utils.test_utils import (
+    FakeSolrServer,
+    RequestProfiler,
+    ViewBudget,
+    ViewBudgetTest,
+    random_email,
+    random_password,
+    random_username,
+)
+
+
+def first_entry(test) -> CompendiumEntry:
+    return CompendiumEntry.objects.filter(owner=test.user).order_by("id").first()
+
+
+def edited_entry(test) -> dict:
+    return {
+        "title": "An edited entry",
+        "year": 1978,
+        "tags": list(CompendiumEntryTag.objects.values_list("id", flat=True)[:2]),
+        # (Authors and a publisher that were seeded, so that they exist at
+        # every data size)
+        "authors_text": ["Ron Rivest", "Author 0", "Author 1"],
+        "publisher_text": "Publisher 0",
+        "edit-entry": "",
+    }
+
+
+@tag("budgets")
+class ViewBudgetsTestCase(ViewBudgetTest):
+    """
+    Every view of the site has to make a fixed number of queries (no matter how
+    many entries, authors, tags, import jobs, etc. there are), and stay within
+    its budget.
+    """
+
+    budgets = [
+        ### Research assistant
+        ViewBudget("^research/^add-user", "/research/add-user", 3, user="staff"),
+        ViewBudget(
+            "^research/^sign-up",
+            "/research/sign-up",
+            2,
+            data=lambda test: {"token": test.token.token},
+        ),
+        ViewBudget("^research/^dashboard", "/research/dashboard", 7, user="user"),
+        ViewBudget("^research/^login", "/research/login", 0),
+        ViewBudget(
+            "^research/^login",
+            "/research/login",
+            12,
+            method="post",
+            data=lambda test: {"username": test.username, "password": test.password},
+            status=302,
+        ),
+        ViewBudget("^research/^logout", "/research/logout", 4, user="user", status=302),
+        ViewBudget("^research/^new-article", "/research/new-article", 3, user="user"),
+        ViewBudget(
+            "^research/^new-article",
+            "/research/new-article",
+            34,
+            method="post",
+            data=edited_entry,
+            user="user",
+            status=302,
+        ),
+        ViewBudget("^research/^new-tag", "/research/new-tag", 3, user="user"),
+        ViewBudget(
+            "^research/imports/<int:job_id>",
+            lambda test: f"/research/imports/{test.job.id}",
+            3,
+            user="user",
+        ),
+        ViewBudget(
+            "^research/list-my-entries/", "/research/list-my-entries/", 5, user="user"
+        ),
+        ViewBudget(
+            "^research/list-my-entries/",
+            "/research/list-my-entries/",
+            14,
+            method="post",
+            data=lambda test: {
+                "entry_id": CompendiumEntry.objects.filter(owner=test.user)
+                .latest("id")
+                .id
+            },
+            user="user",
+        ),
+        ViewBudget(
+            "^research/edit-entries$",
+            "/research/edit-entries",
+            2,
+            user="user",
+            status=403,
+        ),
+        ViewBudget(
+            "^research/edit-entries/(?P<id>[0-9]+)",
+            lambda test: f"/research/edit-entries/{first_entry(test).id}",
+            6,
+            user="user",
+        ),
+        ViewBudget(
+            "^research/edit-entries/(?P<id>[0-9]+)",
+            lambda test: f"/research/edit-entries/{first_entry(test).id}",
+            22,
+            method="post",
+            data=edited_entry,
+            user="user",
+            status=302,
+        ),
+        ViewBudget("^research/^settings", "/research/settings", 2, user="user"),
+        ViewBudget("^research/^profile", "/research/profile", 5, user="user"),
+        ### Public views
+        ViewBudget("^$", "/", 0, max_solr_calls=1),
+        ViewBudget("^advanced-search$", "/advanced-search", 0),
+        ViewBudget(
+            "^advanced-search$",
+            "/advanced-search",
+            0,
+            max_solr_calls=1,
+            data={"search_string": "encryption"},
+        ),
+        ViewBudget(
+            "articles/<slug:slug_title>/",
+            lambda test: f"/articles/{first_entry(test).slug}/",
+            5,
+        ),
+        ViewBudget(
+            "articles/<slug:slug_title>/",
+            lambda test: f"/articles/{first_entry(test).slug}/",
+            7,
+            user="user",
+        ),
+        ### Search
+        ViewBudget(
+            "^search^$", "/search", 0, max_solr_calls=1, data={"query": "encryption"}
+        ),
+        ViewBudget(
+            "^search^_async$",
+            "/search_async",
+            0,
+            max_solr_calls=1,
+            data={"query": "encryption"},
+        ),
+        ViewBudget("^search_all", "/search_all", 4),
+        ViewBudget("^search_all", "/search_all", 4, data={"format": "csv"}),
+        ViewBudget(
+            "^search_basic",
+            "/search_basic",
+            0,
+            max_solr_calls=1,
+            data={"query": "encryption"},
+        ),
+        ViewBudget(
+            "^search_basic_async",
+            "/search_basic_async",
+            0,
+            max_solr_calls=1,
+            data={"query": "encryption"},
+        ),
+        ViewBudget("^search_stats", "/search_stats", 4, user="staff"),
+    ]
+
+    def setUp(self):
+        super().setUp(create_user=True)
+        self.staff = User.objects.create_user(
+            username=random_username(self.rd),
+            email=random_email(self.rd),
+            password=random_password(self.rd),
+            is_staff=True,
+        )
+        self.token = SignupToken.objects.create(email=random_email(self.rd))
+
+        # Search results are made up of the documents of the seeded entries
+        self.documents = []
+        self.solr = FakeSolrServer(respond=self.respond)
+        self.solr.__enter__()
+        self.addCleanup(self.solr.__exit__)
+        self.settings_override = override_settings(SOLR_URL=self.solr.url)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+    def respond(self, params):
+        start = int(params.get("start", 0))
+        rows = int(params.get("rows", 10))
+        return {
+            "responseHeader": {"status": 0, "QTime": 0, "params": params},
+            "response": {
+                "numFound": len(self.documents),
+                "start": start,
+                "docs": self.documents[start : start + rows],
+            },
+        }
+
+    def seed(self, size: int):
+        # The user's entries, each with a few authors and tags (some shared
+        # between entries) and a publisher, along with their import jobs and
+        # the sign-up tokens of invited users
+        n_entries = CompendiumEntry.objects.count()
+        EntryImporter(owner=self.user).import_entries(
+            {
+                "entry": {
+                    "title": f"Encryption policy {ii}",
+                    "abstract": f"Abstract {ii}",
+                    "url": f"https://example.com/articles/{ii}",
+                    "year": 1970 + ii % 50,
+                    "publisher_text": f"Publisher {ii % 7}",
+                },
+                "authors": [f"Author {ii}", f"Author {ii + 1}", "Ron Rivest"],
+                "tags": [f"tag {ii % 11}", "encryption"],
+            }
+            for ii in range(n_entries, size)
+        )
+        for ii in range(ImportJob.objects.count(), size):
+            self.job = ImportJob.objects.create(
+                owner=self.user,
+                format=ImportJob.JSON,
+                filename=f"upload-{ii}.json",
+                path=f"/tmp/upload-{ii}.json",
+                status=ImportJob.DONE,
+            )
+        for ii in range(SignupToken.objects.count(), size):
+            SignupToken.objects.create(email=random_email(self.rd))
+
+        self.documents = [build_document(e) for e in index_queryset()]
+
+    def test_views_are_within_budget(self):
+        self.assertWithinBudgets(RequestProfiler(self.solr))
+
+    def test_every_view_has_a_budget(self):
+        self.assertAllRoutesBudgeted()
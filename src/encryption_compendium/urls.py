@@ -31,6 +31,9 @@ urlpatterns = [
     url(r"^research/", include(research_urls)),
     ### URLs for the public-facing views
     url(r"^$", pubviews.LandingPage.as_view(), name="landing page"),
+    url(
+        r"^advanced-search$", pubviews.AdvancedSearch.as_view(), name="advanced search",
+    ),
     ### URLs for search
     url(r"^search", include(search_urls)),
     ### URLs for viewing articles
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class EntriesConfig(AppConfig):
     name = "entries"
+
+    def ready(self):
+        # Connect signal handlers
+        import entries.signals
@@ -0,0 +1,323 @@
+"""
+Synthetic corpora of compendium entries, for load and scaling tests.
+
+The development database only has a handful of entries, which says little
+about how search, imports, exports or page rendering behave with a full
+compendium. CorpusGenerator creates a realistic corpus of any size instead:
+titles and abstracts are made of words from a synthetic vocabulary whose
+frequencies follow Zipf's law (as in natural language), authors, tags and
+publishers are drawn from pools that grow with the corpus (a few of them
+appearing far more often than the rest), and publication dates are skewed
+towards recent years. The corpus only depends on its size and seed, so
+benchmarks can be repeated against identical data.
+
+Entries are generated in the same format as the records read from uploaded
+files (see entries.importers), and can also be written out as BibTeX or
+Zotero JSON, in the formats that the upload forms accept.
+"""
+
+import calendar
+import itertools
+import json
+import random
+
+from django.utils.text import slugify
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# Syllables used to construct the synthetic vocabulary
+SYLLABLES = (
+    "a al an ar as be ci co crypt da de di e el en er graph ha he hash i in "
+    "is key la le li lo ma me mi mo na ne ni no o or pa pe ph pri qu ra re "
+    "ri ro sa se si sig so ta te ti to u ul un ve vi xo za ze zi"
+).split()
+
+# The range of publication years, and the yearly growth in the number of
+# entries published (so that recent years have many more entries)
+FIRST_YEAR = 1970
+LAST_YEAR = 2020
+YEARLY_GROWTH = 1.08
+
+# Kinds of publishers, used to name them
+PUBLISHER_KINDS = ("Press", "Review", "Journal", "Times", "Institute", "Quarterly")
+
+
+class CorpusGenerator:
+    """
+    Generates a reproducible synthetic corpus of compendium entries.
+
+    Parameters
+    ----------
+    n_entries : int
+        The number of entries in the corpus.
+
+    seed : int
+        The seed for the random number generator. Corpora with the same size
+        and seed are identical.
+
+    n_words : int
+        The size of the vocabulary that titles and abstracts are made of.
+
+    n_tags : int
+        The number of distinct tags.
+
+    n_authors : Optional[int]
+        The number of distinct authors. Defaults to one author for every five
+        entries (between 100 and 200,000).
+
+    n_publishers : Optional[int]
+        The number of distinct publishers. Defaults to one publisher for every
+        2,000 entries (between 20 and 2,000).
+    """
+
+    def __init__(
+        self,
+        n_entries: int,
+        seed: int = 0,
+        n_words: int = 20_000,
+        n_tags: int = 200,
+        n_authors: Optional[int] = None,
+        n_publishers: Optional[int] = None,
+    ):
+        if n_authors is None:
+            n_authors = min(max(n_entries // 5, 100), 200_000)
+        if n_publishers is None:
+            n_publishers = min(max(n_entries // 2_000, 20), 2_000)
+
+        self.n_entries = n_entries
+        self.seed = seed
+        self.random = random.Random(seed)
+        self._cum_weights = {}
+
+        self.vocabulary = self.make_vocabulary(n_words)
+        self.tags = self.make_vocabulary(n_tags)
+        self.authors = [
+            f"{first.title()} {last.title()}"
+            for (first, last) in zip(
+                self.make_vocabulary(n_authors), self.make_vocabulary(n_authors)
+            )
+        ]
+        self.publishers = [
+            f"{name.title()} {self.random.choice(PUBLISHER_KINDS)}"
+            for name in self.make_vocabulary(n_publishers)
+        ]
+
+        self._years = list(range(FIRST_YEAR, LAST_YEAR + 1))
+        self._year_cum_weights = list(
+            itertools.accumulate(YEARLY_GROWTH ** (y - FIRST_YEAR) for y in self._years)
+        )
+
+    def records(self) -> Iterator[Dict]:
+        """
+        Generate the entries of the corpus, one at a time. Each record has the
+        fields of an entry ("entry"), and the names of its authors ("authors")
+        and tags ("tags"), as for EntryImporter.import_entries.
+        """
+        for ii in range(self.n_entries):
+            yield self.record(ii)
+
+    def record(self, ii: int) -> Dict:
+        """
+        Generate the next entry of the corpus, which is the ii-th entry.
+        Entries have to be generated in order for the corpus to be
+        reproducible.
+        """
+        rd = self.random
+        (year, month, day) = self.make_date()
+        publisher = self.zipf_choices(self.publishers, 1)[0]
+        if rd.random() < 0.1:
+            publisher = None
+
+        # Every entry has a URL of its own (so that none of them are skipped as
+        # duplicates of each other when they're imported): most have a DOI,
+        # and the rest link to their publisher's site
+        if rd.random() < 0.6 or publisher is None:
+            url = f"https://doi.org/10.{5000 + ii % 5000}/corpus.{self.seed}.{ii}"
+        else:
+            url = f"https://www.{slugify(publisher)}.example/articles/{self.seed}-{ii}"
+
+        title = self.make_text(rd.randint(3, 12))
+        abstract = None
+        if rd.random() < 0.7:
+            abstract = self.make_text(rd.randint(30, 250)).capitalize() + "."
+
+        return {
+            "entry": {
+                "title": title[0].upper() + title[1:],
+                "abstract": abstract,
+                "url": url,
+                "publisher_text": publisher,
+                "year": year,
+                "month": month,
+                "day": day,
+            },
+            "authors": _unique(self.zipf_choices(self.authors, rd.randint(1, 6))),
+            "tags": _unique(self.zipf_choices(self.tags, rd.randint(1, 5))),
+        }
+
+    """
+    Random text and dates
+    """
+
+    def make_vocabulary(self, size: int) -> List[str]:
+        """
+        Make a list of `size` distinct (made-up) words, in random order.
+        """
+        words = set()
+        while len(words) < size:
+            n_syllables = self.random.randint(1, 5)
+            words.add("".join(self.random.choices(SYLLABLES, k=n_syllables)))
+        words = sorted(words)
+        self.random.shuffle(words)
+        return words
+
+    def zipf_choices(self, population: List, k: int) -> List:
+        """
+        Choose `k` elements of a population (with replacement), with
+        frequencies that follow Zipf's law: the n-th element of the population
+        is chosen with weight 1/n.
+        """
+        cum_weights = self._cum_weights.get(len(population))
+        if cum_weights is None:
+            cum_weights = []
+            total = 0
+            for rank in range(1, len(population) + 1):
+                total += 1 / rank
+                cum_weights.append(total)
+            self._cum_weights[len(population)] = cum_weights
+        return self.random.choices(population, cum_weights=cum_weights, k=k)
+
+    def make_text(self, n_words: int) -> str:
+        """
+        Make a string of `n_words` words from the vocabulary.
+        """
+        return " ".join(self.zipf_choices(self.vocabulary, n_words))
+
+    def make_date(self):
+        """
+        Make a publication date, as a (year, month, day) tuple. A few entries
+        don't have a date, and many only have a year, or a year and a month.
+        """
+        rd = self.random
+        if rd.random() < 0.05:
+            return (None, None, None)
+        year = rd.choices(self._years, cum_weights=self._year_cum_weights)[0]
+        if rd.random() < 0.2:
+            return (year, None, None)
+        month = rd.randint(1, 12)
+        if rd.random() < 0.5:
+            return (year, month, None)
+        return (year, month, rd.randint(1, calendar.monthrange(year, month)[1]))
+
+
+"""
+Writing corpora to files
+"""
+
+
+def bibtex_entry(record: Dict, key: str) -> str:
+    """
+    Convert a record to a BibTeX entry, in the format of Zotero's BibTeX
+    exports (which is what BibTexUploadForm reads).
+    """
+    entry = record["entry"]
+    fields = [("title", "{" + entry["title"] + "}")]
+    if record["authors"]:
+        fields.append(
+            ("author", " and ".join("{" + a + "}" for a in record["authors"]))
+        )
+    if entry["abstract"]:
+        fields.append(("abstract", entry["abstract"]))
+    if entry["publisher_text"]:
+        fields.append(("journal", entry["publisher_text"]))
+    if entry["year"]:
+        fields.append(("year", str(entry["year"])))
+    if entry["month"]:
+        fields.append(("month", calendar.month_name[entry["month"]]))
+    fields.append(("url", entry["url"]))
+    if record["tags"]:
+        fields.append(("keywords", ", ".join(record["tags"])))
+
+    body = ",\n".join(f"  {name} = {{{value}}}" for (name, value) in fields)
+    return f"@article{{{key},\n{body}\n}}\n"
+
+
+def zotero_item(record: Dict) -> Dict:
+    """
+    Convert a record to an item of a Zotero JSON export (which is what
+    JsonUploadForm reads).
+    """
+    entry = record["entry"]
+    item = {
+        "type": "article-journal",
+        "title": entry["title"],
+        "URL": entry["url"],
+        "author": [
+            dict(zip(("given", "family"), name.split(" ", 1)))
+            for name in record["authors"]
+        ],
+        "tags": [{"tag": tag} for tag in record["tags"]],
+    }
+    if entry["abstract"]:
+        item["abstract"] = entry["abstract"]
+    if entry["publisher_text"]:
+        item["container-title"] = entry["publisher_text"]
+    if entry["year"]:
+        date = [entry["year"], entry["month"], entry["day"]]
+        item["issued"] = {"date-parts": [[part for part in date if part]]}
+    return item
+
+
+class BibTexWriter:
+    """
+    Writes records to a BibTeX file one at a time, numbering their citation
+    keys in the order in which they're written.
+    """
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.n_entries = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def write(self, records: Iterator[Dict]):
+        for record in records:
+            self.f.write(bibtex_entry(record, f"corpus{self.n_entries}") + "\n")
+            self.n_entries += 1
+
+
+class ZoteroJsonWriter:
+    """
+    Writes records to a Zotero JSON file one at a time, so that the whole
+    corpus never has to be held in memory. Used as a context manager, which
+    closes the file's list of items at the end.
+    """
+
+    def __init__(self, f: TextIO):
+        self.f = f
+        self.n_items = 0
+
+    def __enter__(self):
+        self.f.write('{"items": [')
+        return self
+
+    def __exit__(self, *args):
+        self.f.write("\n]}\n")
+
+    def write(self, records: Iterator[Dict]):
+        for record in records:
+            self.f.write(",\n" if self.n_items > 0 else "\n")
+            json.dump(zotero_item(record), self.f)
+            self.n_items += 1
+
+
+"""
+Helper functions
+"""
+
+
+def _unique(names: List[str]) -> List[str]:
+    return list(dict.fromkeys(names))
@@ -0,0 +1,313 @@
+"""
+Detection of near-duplicate compendium entries.
+
+Researchers often upload overlapping libraries, so new entries are checked
+against the compendium for near-duplicates: entries whose titles, authors and
+years are almost (but not necessarily exactly) the same. Comparing every new
+entry to every existing one would take time proportional to the size of the
+compendium, so instead each entry gets a MinHash signature, which is stored
+along with its locality-sensitive hashing (LSH) buckets. Entries that share a
+bucket are candidate duplicates; only those candidates are compared.
+
+A MinHash signature summarizes the set of "shingles" (overlapping substrings
+of the title, plus the authors' surnames and the year) of an entry. The
+fraction of positions at which two signatures agree estimates the Jaccard
+similarity of the two entries' shingles. The signature is split into bands,
+and two entries share the bucket of a band if they agree on every position in
+it, which makes entries much more likely to share a bucket the more similar
+they are.
+"""
+
+import hashlib
+import random
+import struct
+import zlib
+
+from entries.fingerprints import normalize
+from entries.models import CompendiumEntry, EntrySignature, SignatureBucket
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# The number of hash functions in a MinHash signature, and the number of bands
+# that signatures are split into for LSH. With 16 bands of 4 rows, entries
+# that are 80% similar share a bucket with probability > 0.999, while entries
+# that are 30% similar only do with probability ~0.12.
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+
+# The estimated similarity above which two entries are reported as likely
+# duplicates
+DUPLICATE_THRESHOLD = 0.8
+
+# The length of the substrings of the title used as shingles
+SHINGLE_LENGTH = 4
+
+# The maximum number of parameters used in a single IN (...) lookup
+MAX_LOOKUP_SIZE = 900
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHasher:
+    """
+    Computes the MinHash signatures of compendium entries.
+
+    Parameters
+    ----------
+    num_permutations : int
+        The number of hash functions (and values) in each signature.
+
+    bands : int
+        The number of LSH bands that signatures are split into. Must divide
+        num_permutations.
+
+    seed : int
+        The seed used to generate the hash functions. Signatures are only
+        comparable if they were computed with the same seed.
+    """
+
+    def __init__(
+        self,
+        num_permutations: int = NUM_PERMUTATIONS,
+        bands: int = LSH_BANDS,
+        seed: int = 1,
+    ):
+        if num_permutations % bands != 0:
+            raise ValueError("The number of bands must divide num_permutations")
+
+        self.num_permutations = num_permutations
+        self.bands = bands
+        self.rows = num_permutations // bands
+
+        rd = random.Random(seed)
+        self._permutations = [
+            (rd.randrange(1, _MERSENNE_PRIME), rd.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_permutations)
+        ]
+
+    def signature(
+        self, title: Optional[str], authors: Iterable[str], year: Optional[int]
+    ) -> Optional[Tuple[int, ...]]:
+        """
+        Compute the MinHash signature of an entry. Entries with neither a title
+        nor authors don't have a signature (and None is returned), since they'd
+        otherwise all have the same signature (or one that only depends on
+        their year), and be reported as duplicates of each other.
+        """
+        found = shingles(title, authors, year)
+        if not any(not s.startswith("year:") for s in found):
+            return None
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in found]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for (a, b) in self._permutations
+        )
+
+    def buckets(self, signature: Sequence[int]) -> List[int]:
+        """
+        Get the LSH buckets of a signature, one per band, as 64-bit integers.
+        """
+        buckets = []
+        for band in range(self.bands):
+            rows = signature[band * self.rows : (band + 1) * self.rows]
+            digest = hashlib.blake2b(
+                struct.pack(f"<H{self.rows}I", band, *rows), digest_size=8
+            ).digest()
+            buckets.append(int.from_bytes(digest, "little", signed=True))
+        return buckets
+
+    def pack(self, signature: Sequence[int]) -> bytes:
+        """
+        Serialize a signature to store it in the database.
+        """
+        return struct.pack(f"<{self.num_permutations}I", *signature)
+
+    def unpack(self, data: bytes) -> Tuple[int, ...]:
+        """
+        Deserialize a signature that was stored in the database.
+        """
+        return struct.unpack(f"<{self.num_permutations}I", bytes(data))
+
+
+class DuplicateDetector:
+    """
+    Stores the signatures of compendium entries, and finds the entries in the
+    compendium that new entries are likely duplicates of.
+
+    Parameters
+    ----------
+    hasher : Optional[MinHasher]
+        The MinHasher used to compute signatures. Defaults to the hasher that
+        the stored signatures were computed with.
+
+    threshold : float
+        The estimated similarity above which two entries are likely duplicates.
+    """
+
+    def __init__(
+        self, hasher: Optional[MinHasher] = None, threshold: float = DUPLICATE_THRESHOLD
+    ):
+        self.hasher = minhasher if hasher is None else hasher
+        self.threshold = threshold
+
+    def find_duplicates(self, entries: Sequence[Dict]) -> Dict[int, List[Dict]]:
+        """
+        Find the compendium entries that each of a sequence of new entries is
+        likely a duplicate of. Each new entry is a dictionary with a "title", a
+        "year", and a list of "authors" (by name).
+
+        Returns a map from the indices of the new entries that have likely
+        duplicates to a list of the duplicates, each of which is a dictionary
+        with the "id", "title" and "slug" of an existing entry and its
+        estimated "similarity" to the new entry (most similar first). This takes
+        two queries for a batch of up to MAX_LOOKUP_SIZE / LSH_BANDS entries.
+        """
+        signatures = [
+            self.hasher.signature(e.get("title"), e.get("authors", []), e.get("year"))
+            for e in entries
+        ]
+        buckets = [
+            self.hasher.buckets(sig) if sig is not None else [] for sig in signatures
+        ]
+
+        # Find the existing entries that share a bucket with each new entry
+        bucket_entries = {}
+        all_buckets = list({b for bs in buckets for b in bs})
+        for chunk in _chunks(all_buckets, MAX_LOOKUP_SIZE):
+            rows = SignatureBucket.objects.filter(bucket__in=chunk).values_list(
+                "bucket", "entry_id"
+            )
+            for (bucket, entry_id) in rows:
+                bucket_entries.setdefault(bucket, set()).add(entry_id)
+
+        candidates = [
+            set().union(*(bucket_entries.get(b, ()) for b in bs)) for bs in buckets
+        ]
+
+        # Estimate the similarity of each new entry to its candidates
+        existing = {}
+        all_candidates = list(set().union(*candidates))
+        for chunk in _chunks(all_candidates, MAX_LOOKUP_SIZE):
+            rows = EntrySignature.objects.filter(entry_id__in=chunk).values_list(
+                "entry_id", "signature", "entry__title", "entry__slug"
+            )
+            for (entry_id, signature, title, slug) in rows:
+                existing[entry_id] = (self.hasher.unpack(signature), title, slug)
+
+        duplicates = {}
+        for (ii, (signature, entry_ids)) in enumerate(zip(signatures, candidates)):
+            matches = []
+            for entry_id in entry_ids:
+                if entry_id not in existing:
+                    # The entry was deleted after we found its buckets
+                    continue
+                (other, title, slug) = existing[entry_id]
+                score = similarity(signature, other)
+                if score >= self.threshold:
+                    matches.append(
+                        {
+                            "id": entry_id,
+                            "title": title,
+                            "slug": slug,
+                            "similarity": score,
+                        }
+                    )
+            if len(matches) > 0:
+                matches.sort(key=lambda m: (-m["similarity"], m["id"]))
+                duplicates[ii] = matches
+        return duplicates
+
+    def store_signatures(self, entries: Dict[int, Dict], replace: bool = True):
+        """
+        Store the signatures and LSH buckets of compendium entries, given as a
+        map from their ids to dictionaries with their "title", "year" and
+        "authors". Any signatures that the entries already had are replaced,
+        unless `replace` is False (e.g. for entries that were just created).
+        """
+        if len(entries) == 0:
+            return
+
+        if replace:
+            entry_ids = list(entries)
+            SignatureBucket.objects.filter(entry_id__in=entry_ids).delete()
+            EntrySignature.objects.filter(entry_id__in=entry_ids).delete()
+
+        signatures = []
+        buckets = []
+        for (entry_id, entry) in entries.items():
+            signature = self.hasher.signature(
+                entry.get("title"), entry.get("authors", []), entry.get("year")
+            )
+            if signature is None:
+                continue
+            signatures.append(
+                EntrySignature(entry_id=entry_id, signature=self.hasher.pack(signature))
+            )
+            buckets += [
+                SignatureBucket(entry_id=entry_id, bucket=bucket)
+                for bucket in set(self.hasher.buckets(signature))
+            ]
+
+        EntrySignature.objects.bulk_create(signatures)
+        SignatureBucket.objects.bulk_create(buckets)
+
+    def update_signatures(self, entry_ids: Iterable[int]):
+        """
+        Recompute the signatures of compendium entries from the database, e.g.
+        after their titles or authors have changed.
+        """
+        entries = {
+            pk: {"title": title, "year": year, "authors": []}
+            for (pk, title, year) in CompendiumEntry.objects.filter(
+                pk__in=list(entry_ids)
+            ).values_list("pk", "title", "year")
+        }
+        rows = CompendiumEntry.authors.through.objects.filter(
+            compendiumentry_id__in=list(entries)
+        ).values_list("compendiumentry_id", "author__authorname")
+        for (entry_id, name) in rows:
+            entries[entry_id]["authors"].append(name)
+        self.store_signatures(entries)
+
+
+"""
+Helper functions
+"""
+
+
+def shingles(
+    title: Optional[str], authors: Iterable[str], year: Optional[int]
+) -> Set[str]:
+    """
+    Get the shingles of an entry: the substrings of its normalized title of
+    length SHINGLE_LENGTH, along with the surnames of its authors and its year.
+    """
+    title = normalize(title)
+    result = {
+        title[ii : ii + SHINGLE_LENGTH]
+        for ii in range(max(len(title) - SHINGLE_LENGTH + 1, 1))
+        if title
+    }
+    for name in authors:
+        words = normalize(name).split()
+        if len(words) > 0:
+            result.add(f"author:{words[-1]}")
+    if year is not None:
+        result.add(f"year:{year}")
+    return result
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """
+    Estimate the Jaccard similarity of two entries from their signatures.
+    """
+    return sum(x == y for (x, y) in zip(a, b)) / len(a)
+
+
+def _chunks(items: List, size: int) -> Iterable[List]:
+    return (items[start : start + size] for start in range(0, len(items), size))
+
+
+# Hasher and detector used by the rest of the process
+minhasher = MinHasher()
+duplicate_detector = DuplicateDetector()
@@ -0,0 +1,111 @@
+"""
+Exact-match fingerprints of compendium entries.
+
+A fingerprint identifies the work that an entry refers to, so that importing
+the same library twice doesn't create the same entries twice. Entries that
+have a DOI (in their URL) are identified by it; otherwise, entries with a URL
+are identified by its canonical form, and entries without one are identified
+by their normalized title and year. Fingerprints are stored (hashed) in the
+indexed CompendiumEntry.fingerprint column, so that a whole batch of new
+entries can be checked with a single query.
+
+Migration 0004 computed the fingerprints of existing entries with a copy of
+these rules. Changing them means adding a migration that recomputes the
+fingerprints, since otherwise entries that are already in the compendium
+would no longer be found.
+"""
+
+import hashlib
+import re
+import unicodedata
+
+from typing import Optional
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+# Matches a DOI anywhere in a URL (e.g. https://doi.org/10.1145/359340.359342
+# or a publisher's page for the same article)
+_DOI = re.compile(r"\b(10\.\d{4,9}/[^\s?#]+)")
+
+# Query parameters that only track where a link came from
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref)$")
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Normalize text for comparison: remove accents, BibTeX braces, punctuation,
+    and case, and collapse whitespace.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]|_", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def find_doi(url: Optional[str]) -> Optional[str]:
+    """
+    Extract the DOI from a URL, if it contains one. DOIs are case-insensitive,
+    so the DOI is returned in lowercase.
+    """
+    if not url:
+        return None
+    match = _DOI.search(unquote(url))
+    if match is None:
+        return None
+    return match.group(1).rstrip(".,;/").lower()
+
+
+def canonical_url(url: Optional[str]) -> Optional[str]:
+    """
+    Canonicalize a URL, so that different links to the same page compare
+    equal: the scheme, "www.", default ports, trailing slashes, fragments and
+    tracking parameters are removed, the host is lowercased, and the query
+    parameters are sorted.
+    """
+    if not url or not url.strip():
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        # The host can't be parsed (e.g. the port is out of range, which
+        # URLValidator still accepts), so the URL is only matched as it is
+        return url.strip()
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[len("www.") :]
+    if port is not None and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/+", "/", parts.path).rstrip("/")
+    query = sorted(
+        (k, v)
+        for (k, v) in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    )
+    canonical = host + path
+    if len(query) > 0:
+        canonical += "?" + urlencode(query)
+    return canonical
+
+
+def entry_fingerprint(
+    url: Optional[str], title: Optional[str], year: Optional[int]
+) -> Optional[str]:
+    """
+    Compute the fingerprint of a compendium entry, as "<kind>:<sha1>" where
+    <kind> is "doi", "url" or "title". Returns None for entries that don't have
+    a URL or a title.
+    """
+    doi = find_doi(url)
+    if doi is not None:
+        (kind, key) = ("doi", doi)
+    elif canonical_url(url):
+        (kind, key) = ("url", canonical_url(url))
+    elif normalize(title):
+        (kind, key) = ("title", f"{normalize(title)}|{year or ''}")
+    else:
+        return None
+    return f"{kind}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
@@ -23,9 +23,10 @@ class CompendiumEntryForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
 
         # Display the tags sorted by their tag names
-        self.fields["tags"].widget.choices.queryset = self.fields[
-            "tags"
-        ].widget.choices.queryset.order_by("tagname")
+        if "tags" in self.fields:
+            self.fields["tags"].widget.choices.queryset = self.fields[
+                "tags"
+            ].widget.choices.queryset.order_by("tagname")
 
     class Meta:
         model = CompendiumEntry
@@ -143,6 +144,19 @@ class CompendiumEntryForm(forms.ModelForm):
         return cleaned_data
 
 
+class EntryFieldsForm(CompendiumEntryForm):
+    """
+    EntryFieldsForm validates the fields of a compendium entry in the same way
+    as CompendiumEntryForm, except for its tags. Since it doesn't have to look
+    up any tags, validating the form never queries the database. This is used
+    to validate imported entries in bulk (see entries.validation), whose tags
+    are given by name rather than by id.
+    """
+
+    class Meta(CompendiumEntryForm.Meta):
+        fields = tuple(f for f in CompendiumEntryForm.Meta.fields if f != "tags")
+
+
 class NewTagForm(forms.ModelForm):
     """
     NewTagForm allows the creation of new tags. It is a ModelForm based off
@@ -0,0 +1,262 @@
+"""
+Bulk import of compendium entries, e.g. from uploaded BibTeX.
+
+Creating entries one at a time with CompendiumEntry.objects.create() takes
+several queries per entry (plus a few more for each of its authors and tags),
+which adds up to tens of thousands of queries for a large upload. The
+importer here inserts entries in batches instead, so that the number of
+queries only grows with the number of batches.
+
+Entries that are already in the compendium (by their fingerprints; see
+entries.fingerprints) are skipped, so importing the same library twice only
+adds its entries once.
+"""
+
+import itertools
+import logging
+
+from django.db import connection, transaction
+from entries.duplicates import duplicate_detector
+from entries.fingerprints import entry_fingerprint
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag, Publisher
+from entries.signals import entries_imported
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+from users.models import User
+from utils.articles_slug import unique_slugs
+
+
+class EntryImporter:
+    """
+    Inserts compendium entries in bulk, along with their authors, tags, and
+    publishers.
+
+    Every batch of entries takes a fixed number of queries:
+
+    - one query to find the entries in the batch that are already in the
+      compendium, by their fingerprints;
+    - one query to look up the authors, tags, and publishers (each) used by
+      the batch, plus two more to insert and look up any that are missing;
+    - one query to find the slugs that are already taken;
+    - one query to insert the entries (plus one to find their ids, on
+      databases that can't return them from a bulk insert);
+    - one query each to insert the rows of the authors and tags through
+      tables;
+    - two queries to insert the entries' near-duplicate signatures and their
+      LSH buckets (see entries.duplicates); and
+    - one query to add the entries to the search index outbox.
+
+    Parameters
+    ----------
+    owner : Optional[User]
+        The user who owns the imported entries.
+
+    batch_size : int
+        The number of entries to insert at a time.
+    """
+
+    import_logger = logging.getLogger("compendium")
+
+    def __init__(self, owner: Optional[User] = None, batch_size: int = 500):
+        self.owner = owner
+        self.batch_size = batch_size
+
+    def import_entries(
+        self, records: Iterable[Dict], skip_existing: bool = True
+    ) -> List[int]:
+        """
+        Insert compendium entries, returning the ids of the new entries. All of
+        the entries are inserted in a single transaction, so either every entry
+        is imported or none of them are.
+
+        Entries that are already in the compendium, or that repeat an earlier
+        entry in the same batch, are skipped unless `skip_existing` is False
+        (e.g. for records that were already checked with find_new).
+
+        Each record is a dictionary with the following keys:
+
+        entry : dict
+            The fields of the entry (e.g. the cleaned data of a
+            CompendiumEntryForm). Many-to-many fields are ignored.
+
+        authors : List[str]
+            The names of the entry's authors.
+
+        tags : List[str]
+            The names of the entry's tags.
+        """
+        entry_ids = []
+        with transaction.atomic():
+            for batch in batches(records, self.batch_size):
+                if skip_existing:
+                    batch = [batch[ii] for ii in self.find_new(batch)]
+                if len(batch) > 0:
+                    entry_ids += self._import_batch(batch)
+        return entry_ids
+
+    def find_new(self, records: Sequence[Dict]) -> List[int]:
+        """
+        Find the records (in the same format as for import_entries) of entries
+        that aren't in the compendium yet, with a single query. Returns their
+        indices; only the first of several records with the same fingerprint is
+        counted as new.
+        """
+        fingerprints = [_record_fingerprint(r) for r in records]
+        existing = set(
+            CompendiumEntry.objects.filter(
+                fingerprint__in={fp for fp in fingerprints if fp}
+            ).values_list("fingerprint", flat=True)
+        )
+
+        new = []
+        for (ii, fingerprint) in enumerate(fingerprints):
+            if fingerprint is None:
+                new.append(ii)
+            elif fingerprint not in existing:
+                existing.add(fingerprint)
+                new.append(ii)
+        return new
+
+    """
+    Internal API
+    """
+
+    def _import_batch(self, records: List[Dict]) -> List[int]:
+        authors = resolve_names(
+            Author, "authorname", (a for r in records for a in r.get("authors", []))
+        )
+        tags = resolve_names(
+            CompendiumEntryTag,
+            "tagname",
+            (t for r in records for t in r.get("tags", [])),
+        )
+        publishers = resolve_names(
+            Publisher,
+            "publishername",
+            (r["entry"].get("publisher_text") for r in records),
+        )
+
+        fields = [_entry_fields(r["entry"]) for r in records]
+        slugs = unique_slugs(CompendiumEntry, [f["title"] for f in fields])
+        entries = [
+            CompendiumEntry(
+                owner=self.owner,
+                slug=slug,
+                publisher_id=publishers.get(f.get("publisher_text")),
+                fingerprint=entry_fingerprint(f.get("url"), f["title"], f.get("year")),
+                **f,
+            )
+            for (f, slug) in zip(fields, slugs)
+        ]
+        CompendiumEntry.objects.bulk_create(entries)
+        entry_ids = _inserted_ids(entries, slugs)
+
+        self._link(
+            CompendiumEntry.authors.through,
+            "author_id",
+            entry_ids,
+            [[authors[name] for name in r.get("authors", []) if name] for r in records],
+        )
+        self._link(
+            CompendiumEntry.tags.through,
+            "compendiumentrytag_id",
+            entry_ids,
+            [[tags[name] for name in r.get("tags", []) if name] for r in records],
+        )
+
+        duplicate_detector.store_signatures(
+            {
+                entry_id: {**f, "authors": r.get("authors", [])}
+                for (entry_id, f, r) in zip(entry_ids, fields, records)
+            },
+            replace=False,
+        )
+
+        entries_imported.send(sender=CompendiumEntry, entry_ids=entry_ids)
+        self.import_logger.info(
+            f"Imported {len(entry_ids)} compendium entries "
+            f"(ids={entry_ids[0]}..{entry_ids[-1]})"
+        )
+        return entry_ids
+
+    def _link(self, through, field: str, entry_ids: List[int], related_ids):
+        # Insert the rows of a many-to-many through table for every entry in a
+        # batch with a single query
+        rows = [
+            through(compendiumentry_id=entry_id, **{field: pk})
+            for (entry_id, pks) in zip(entry_ids, related_ids)
+            for pk in dict.fromkeys(pks)
+        ]
+        through.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+"""
+Helper functions
+"""
+
+
+def batches(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Split an iterable into lists of (at most) `size` items, without reading
+    more than one list's worth of items from it at a time.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def resolve_names(model, field: str, names: Iterable[Optional[str]]) -> Dict:
+    """
+    Map a collection of names (e.g. of authors) to the ids of the objects of a
+    model with those names in the given field, creating the objects that don't
+    exist yet. This takes one query if all of the objects already exist, and
+    three queries otherwise. Missing objects are created in the order in which
+    their names first appear; empty names are ignored.
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    if len(names) == 0:
+        return {}
+
+    ids = dict(model.objects.filter(**{f"{field}__in": names}).values_list(field, "pk"))
+    missing = [name for name in names if name not in ids]
+    if len(missing) > 0:
+        # Other imports may be creating the same objects at the same time, so
+        # we ignore conflicts and look up the ids afterwards.
+        model.objects.bulk_create(
+            [model(**{field: name}) for name in missing], ignore_conflicts=True
+        )
+        ids.update(
+            model.objects.filter(**{f"{field}__in": missing}).values_list(field, "pk")
+        )
+    return ids
+
+
+def _record_fingerprint(record: Dict) -> Optional[str]:
+    entry = record["entry"]
+    return entry_fingerprint(entry.get("url"), entry.get("title"), entry.get("year"))
+
+
+def _entry_fields(entry: Dict) -> Dict:
+    # Select the values of the entry's concrete fields, dropping many-to-many
+    # fields (e.g. the empty tags in the cleaned data of a CompendiumEntryForm)
+    concrete = {f.name for f in CompendiumEntry._meta.concrete_fields}
+    return {k: v for (k, v) in entry.items() if k in concrete}
+
+
+def _inserted_ids(entries: List[CompendiumEntry], slugs: List[str]) -> List[int]:
+    # PostgreSQL returns the ids of the new rows from the bulk insert. Other
+    # databases don't, so we look them up by their (unique) slugs instead,
+    # keeping the newest entry with each slug.
+    if connection.features.can_return_rows_from_bulk_insert:
+        return [entry.pk for entry in entries]
+
+    ids = dict(
+        CompendiumEntry.objects.filter(slug__in=slugs)
+        .order_by("pk")
+        .values_list("slug", "pk")
+    )
+    for (entry, slug) in zip(entries, slugs):
+        entry.pk = ids[slug]
+    return [entry.pk for entry in entries]
@@ -0,0 +1,54 @@
+"""
+Compute the near-duplicate signatures of compendium entries (see
+entries.duplicates).
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from entries.duplicates import duplicate_detector
+from entries.models import CompendiumEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the MinHash signatures used to detect near-duplicate "
+        "compendium entries, for the entries that don't have one yet (e.g. "
+        "entries created before signatures were introduced)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute the signatures of every entry, not only the missing ones.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of entries to compute signatures for at a time.",
+        )
+
+    def handle(self, *args, **options):
+        entries = CompendiumEntry.objects.order_by("pk")
+        if not options["all"]:
+            entries = entries.filter(signature__isnull=True)
+
+        # Page through the entries by their ids, since the signatures change
+        # while we're reading them
+        total = 0
+        last_id = 0
+        while True:
+            batch = list(
+                entries.filter(pk__gt=last_id).values_list("pk", flat=True)[
+                    : options["batch_size"]
+                ]
+            )
+            if len(batch) == 0:
+                break
+            with transaction.atomic():
+                duplicate_detector.update_signatures(batch)
+            total += len(batch)
+            last_id = batch[-1]
+
+        self.stdout.write(f"Computed signatures for {total} entries")
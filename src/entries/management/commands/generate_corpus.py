@@ -0,0 +1,107 @@
+"""
+Generate a reproducible synthetic corpus of compendium entries (see
+entries.corpus), for load and scaling tests.
+"""
+
+import contextlib
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from entries.corpus import BibTexWriter, CorpusGenerator, ZoteroJsonWriter
+from entries.importers import EntryImporter, batches
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic corpus of compendium entries, with authors, "
+        "tags, publishers, abstracts and publication dates, and insert it into "
+        "the database and/or write it out as BibTeX and Zotero JSON files. "
+        "Corpora with the same size and seed are identical, and entries that "
+        "are already in the compendium are skipped, so the command can be "
+        "re-run (e.g. to resume an interrupted run)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entries",
+            type=int,
+            default=10_000,
+            help="Number of entries to generate (default: 10000).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed for the random number generator."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help=(
+                "Number of entries to insert at a time, each batch in its own "
+                "transaction (default: 1000)."
+            ),
+        )
+        parser.add_argument(
+            "--owner",
+            help="Username of the researcher who owns the generated entries.",
+        )
+        parser.add_argument(
+            "--bibtex", metavar="PATH", help="Also write the corpus to a BibTeX file."
+        )
+        parser.add_argument(
+            "--json",
+            metavar="PATH",
+            help="Also write the corpus to a Zotero JSON file.",
+        )
+        parser.add_argument(
+            "--no-insert",
+            action="store_true",
+            help="Only write the corpus to files, without inserting it.",
+        )
+
+    def handle(self, *args, **options):
+        n_entries = options["entries"]
+        if n_entries < 1:
+            raise CommandError("--entries must be at least 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        if options["no_insert"] and not (options["bibtex"] or options["json"]):
+            raise CommandError("--no-insert requires --bibtex and/or --json")
+
+        owner = None
+        if options["owner"] is not None:
+            try:
+                owner = User.objects.get(username=options["owner"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['owner']!r}")
+
+        generator = CorpusGenerator(n_entries, seed=options["seed"])
+        importer = EntryImporter(owner=owner, batch_size=options["batch_size"])
+
+        n_generated = 0
+        n_inserted = 0
+        start = time.perf_counter()
+        with contextlib.ExitStack() as stack:
+            writers = []
+            if options["bibtex"]:
+                f = stack.enter_context(open(options["bibtex"], "w"))
+                writers.append(stack.enter_context(BibTexWriter(f)))
+            if options["json"]:
+                f = stack.enter_context(open(options["json"], "w"))
+                writers.append(stack.enter_context(ZoteroJsonWriter(f)))
+
+            for batch in batches(generator.records(), options["batch_size"]):
+                for writer in writers:
+                    writer.write(batch)
+                if not options["no_insert"]:
+                    n_inserted += len(importer.import_entries(batch))
+                n_generated += len(batch)
+                self.stdout.write(f"  {n_generated} / {n_entries}")
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f"Generated {n_generated} entries in {elapsed:.1f}s")
+        if not options["no_insert"]:
+            self.stdout.write(
+                f"Inserted {n_inserted} entries ({n_generated - n_inserted} were "
+                "already in the compendium)"
+            )
@@ -0,0 +1,22 @@
+# Generated by Django 3.1.14 on 2026-10-18 00:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("entries", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="compendiumentry",
+            name="last_modified",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.1.14 on 2026-10-18 00:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("entries", "0002_compendiumentry_last_modified"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EntrySignature",
+            fields=[
+                (
+                    "entry",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="entries.compendiumentry",
+                    ),
+                ),
+                ("signature", models.BinaryField()),
+            ],
+            options={"db_table": "entry_signatures",},
+        ),
+        migrations.CreateModel(
+            name="SignatureBucket",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.BigIntegerField(db_index=True)),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="signature_buckets",
+                        to="entries.compendiumentry",
+                    ),
+                ),
+            ],
+            options={"db_table": "signature_buckets",},
+        ),
+    ]
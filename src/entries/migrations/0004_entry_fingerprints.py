@@ -0,0 +1,102 @@
+# Generated by Django 3.1.14 on 2026-10-18 01:02
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit
+
+# The fingerprint rules of entries.fingerprints at the time of this migration.
+# They're copied here so that changes to those rules (which need their own
+# migration to recompute the fingerprints) don't change what this one does.
+
+_DOI = re.compile(r"\b(10\.\d{4,9}/[^\s?#]+)")
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref)$")
+
+
+def normalize(text):
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]|_", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def find_doi(url):
+    if not url:
+        return None
+    match = _DOI.search(unquote(url))
+    if match is None:
+        return None
+    return match.group(1).rstrip(".,;/").lower()
+
+
+def canonical_url(url):
+    if not url or not url.strip():
+        return None
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url.strip()
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[len("www.") :]
+    if port is not None and port not in (80, 443):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/+", "/", parts.path).rstrip("/")
+    query = sorted(
+        (k, v)
+        for (k, v) in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(k)
+    )
+    canonical = host + path
+    if len(query) > 0:
+        canonical += "?" + urlencode(query)
+    return canonical
+
+
+def entry_fingerprint(url, title, year):
+    doi = find_doi(url)
+    if doi is not None:
+        (kind, key) = ("doi", doi)
+    elif canonical_url(url):
+        (kind, key) = ("url", canonical_url(url))
+    elif normalize(title):
+        (kind, key) = ("title", f"{normalize(title)}|{year or ''}")
+    else:
+        return None
+    return f"{kind}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+
+def compute_fingerprints(apps, schema_editor):
+    CompendiumEntry = apps.get_model("entries", "CompendiumEntry")
+    entries = CompendiumEntry.objects.only("pk", "url", "title", "year").order_by("pk")
+    batch = []
+    for entry in entries.iterator(chunk_size=1000):
+        entry.fingerprint = entry_fingerprint(entry.url, entry.title, entry.year)
+        batch.append(entry)
+        if len(batch) == 1000:
+            CompendiumEntry.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    CompendiumEntry.objects.bulk_update(batch, ["fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("entries", "0003_entry_signatures"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="compendiumentry",
+            name="fingerprint",
+            field=models.CharField(blank=True, db_index=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(compute_fingerprints, migrations.RunPython.noop),
+    ]
@@ -4,12 +4,13 @@ Models related to the site's compendium entries.
 
 from datetime import date
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from users.models import User
 from utils.dates import month_name
 from utils.widgets import MonthWidget
 from django.db.models.signals import pre_save
+from entries.fingerprints import entry_fingerprint
 from utils.articles_slug import unique_slug_generator
 
 """
@@ -22,6 +23,7 @@ Configuration options
 MAX_TITLE_LENGTH = 500
 MAX_ABSTRACT_LENGTH = 10000
 MAX_URL_LENGTH = 500
+MAX_FINGERPRINT_LENGTH = 50
 
 """CompendiumEntryTag model"""
 MAX_TAG_LENGTH = 50
@@ -158,6 +160,16 @@ class CompendiumEntry(models.Model):
     day : django.db.models.PositiveSmallIntegerField
         An integer representing the day of the month in which a compendium entry
         was published.
+
+    last_modified : django.db.models.DateTimeField
+        The date and time at which the compendium entry was last changed. Used
+        to find the entries that need to be reindexed by Solr's delta-import.
+
+    fingerprint : django.db.models.CharField
+        An exact-match fingerprint of the work that the entry refers to, computed
+        from its DOI or URL, or else its title and year (see
+        entries.fingerprints). Used to skip entries that are already in the
+        compendium when importing a library.
     """
 
     title = models.CharField(max_length=MAX_TITLE_LENGTH, blank=False, null=False)
@@ -197,6 +209,11 @@ class CompendiumEntry(models.Model):
         validators=[MaxValueValidator(31), MinValueValidator(1)], blank=True, null=True
     )
 
+    last_modified = models.DateTimeField(auto_now=True, db_index=True)
+    fingerprint = models.CharField(
+        max_length=MAX_FINGERPRINT_LENGTH, blank=True, null=True, db_index=True
+    )
+
     """
     Class properties for use in templates.
     """
@@ -222,6 +239,13 @@ class CompendiumEntry(models.Model):
         else:
             return ", ".join(str(auth) for auth in authors)
 
+    def save(self, *args, **kwargs):
+        # Save the entry inside a transaction, so that anything written by
+        # signal handlers alongside it (e.g. the search index outbox) is
+        # committed or rolled back together with the entry.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         # Manually specify the table name for the database
         db_table = "compendium"
@@ -232,4 +256,61 @@ def slug_generator(sender, instance, *args, **kwargs):
         instance.slug = unique_slug_generator(instance)
 
 
+def fingerprint_generator(sender, instance, *args, **kwargs):
+    instance.fingerprint = entry_fingerprint(
+        instance.url, instance.title, instance.year
+    )
+
+
 pre_save.connect(slug_generator, sender=CompendiumEntry)
+pre_save.connect(fingerprint_generator, sender=CompendiumEntry)
+
+
+class EntrySignature(models.Model):
+    """
+    The MinHash signature of a compendium entry, which is used to find
+    near-duplicates of new entries (see entries.duplicates).
+
+    Fields
+    ------
+    entry : django.db.models.OneToOneField
+        The compendium entry that the signature belongs to.
+
+    signature : django.db.models.BinaryField
+        The values of the signature, packed as 32-bit integers.
+    """
+
+    entry = models.OneToOneField(
+        CompendiumEntry,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature",
+    )
+    signature = models.BinaryField()
+
+    class Meta:
+        db_table = "entry_signatures"
+
+
+class SignatureBucket(models.Model):
+    """
+    One of the locality-sensitive hashing buckets that the signature of a
+    compendium entry falls into (one per band of the signature). Entries that
+    share a bucket are candidate near-duplicates of each other.
+
+    Fields
+    ------
+    entry : django.db.models.ForeignKey
+        The compendium entry whose signature falls into the bucket.
+
+    bucket : django.db.models.BigIntegerField
+        The hash of one band of the entry's signature.
+    """
+
+    entry = models.ForeignKey(
+        CompendiumEntry, on_delete=models.CASCADE, related_name="signature_buckets"
+    )
+    bucket = models.BigIntegerField(db_index=True)
+
+    class Meta:
+        db_table = "signature_buckets"
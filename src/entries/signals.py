@@ -0,0 +1,93 @@
+"""
+Custom signals sent by the entries app, along with the signal handlers that
+keep the near-duplicate signatures of compendium entries up-to-date.
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import Signal, receiver
+from entries.duplicates import duplicate_detector
+from entries.models import Author, CompendiumEntry
+from typing import List
+
+# Sent after compendium entries have been inserted in bulk (see
+# entries.importers), which bypasses the post_save signal for each entry. The
+# signal is sent with the following keyword arguments:
+#
+#   entry_ids : List[int]
+#       The ids of the entries that were inserted.
+#
+entries_imported = Signal()
+
+
+@receiver(post_save, sender=CompendiumEntry)
+def update_saved_entry_signature(sender, instance, **kwargs):
+    """
+    Recompute the near-duplicate signature of a compendium entry whenever it's
+    added or modified.
+    """
+    duplicate_detector.update_signatures([instance.pk])
+
+
+@receiver(m2m_changed, sender=CompendiumEntry.authors.through)
+def update_author_signatures(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recompute the near-duplicate signatures of compendium entries whenever
+    their authors change.
+    """
+    if not reverse:
+        # instance is the CompendiumEntry whose authors changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            duplicate_detector.update_signatures([instance.pk])
+
+    elif action in ("post_add", "post_remove"):
+        # instance is an author, and pk_set contains the ids of the entries
+        # that it was added to or removed from
+        duplicate_detector.update_signatures(pk_set)
+
+    elif action == "pre_clear":
+        # pk_set isn't provided when clearing the relation, so we have to look
+        # up the affected entries before they're removed
+        instance._signature_entry_ids = _author_entry_ids(instance)
+
+    elif action == "post_clear":
+        duplicate_detector.update_signatures(
+            getattr(instance, "_signature_entry_ids", [])
+        )
+
+
+@receiver(post_save, sender=Author)
+def update_renamed_author_signatures(sender, instance, created, **kwargs):
+    """
+    Recompute the near-duplicate signatures of the compendium entries by an
+    author when the author's name changes.
+    """
+    if not created:
+        duplicate_detector.update_signatures(_author_entry_ids(instance))
+
+
+@receiver(pre_delete, sender=Author)
+def find_deleted_author_entries(sender, instance, **kwargs):
+    """
+    Find the compendium entries by an author before it's deleted (m2m_changed
+    isn't sent when relations are removed by a cascading delete), so that
+    their signatures can be recomputed once it's gone.
+    """
+    instance._signature_entry_ids = _author_entry_ids(instance)
+
+
+@receiver(post_delete, sender=Author)
+def update_deleted_author_signatures(sender, instance, **kwargs):
+    """
+    Recompute the near-duplicate signatures of the compendium entries by an
+    author after it's been deleted.
+    """
+    duplicate_detector.update_signatures(getattr(instance, "_signature_entry_ids", []))
+
+
+"""
+Helper functions
+"""
+
+
+def _author_entry_ids(author: Author) -> List[int]:
+    return list(author.compendiumentry_set.values_list("pk", flat=True))
@@ -0,0 +1,116 @@
+"""
+Tests for generating synthetic corpora of compendium entries
+"""
+
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from entries.corpus import CorpusGenerator
+from entries.models import CompendiumEntry
+from entries.validation import validate_entries
+from research_assistant.forms import BibTexUploadForm, JsonUploadForm
+from utils.test_utils import UnitTest
+
+
+class CorpusGeneratorTestCase(UnitTest):
+    """
+    Tests for CorpusGenerator
+    """
+
+    def test_corpora_are_reproducible(self):
+        records = list(CorpusGenerator(200, seed=1).records())
+        self.assertEqual(len(records), 200)
+        self.assertEqual(list(CorpusGenerator(200, seed=1).records()), records)
+        self.assertNotEqual(list(CorpusGenerator(200, seed=2).records()), records)
+
+        # Every entry has a URL of its own, so that none of them are skipped
+        # as duplicates when the corpus is imported
+        self.assertEqual(len({r["entry"]["url"] for r in records}), 200)
+
+    def test_records_are_valid(self):
+        records = list(CorpusGenerator(200, seed=3).records())
+        (cleaned, errors) = validate_entries([r["entry"] for r in records])
+        self.assertEqual(errors, {})
+
+        for record in records:
+            self.assertGreater(len(record["authors"]), 0)
+            self.assertGreater(len(record["tags"]), 0)
+            self.assertEqual(len(set(record["tags"])), len(record["tags"]))
+
+        # Some entries are missing optional fields
+        entries = [r["entry"] for r in records]
+        self.assertTrue(any(e["abstract"] is None for e in entries))
+        self.assertTrue(any(e["day"] is None for e in entries))
+        self.assertTrue(any(e["day"] is not None for e in entries))
+
+
+class GenerateCorpusTestCase(UnitTest):
+    """
+    Tests for the generate_corpus command
+    """
+
+    def setUp(self):
+        super().setUp(create_user=True)
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def generate(self, *args):
+        out = io.StringIO()
+        call_command("generate_corpus", *args, stdout=out)
+        return out.getvalue()
+
+    def test_insert_corpus(self):
+        output = self.generate(
+            "--entries=30", "--batch-size=8", f"--owner={self.user.username}"
+        )
+        self.assertIn("Inserted 30 entries", output)
+        self.assertEqual(CompendiumEntry.objects.filter(owner=self.user).count(), 30)
+
+        # Generating the same corpus again doesn't add any entries, while a
+        # different seed adds a new corpus
+        output = self.generate("--entries=30", "--batch-size=8")
+        self.assertIn("Inserted 0 entries (30 were already", output)
+        self.generate("--entries=30", "--seed=1")
+        self.assertEqual(CompendiumEntry.objects.count(), 60)
+
+        entry = CompendiumEntry.objects.order_by("id").first()
+        self.assertGreater(entry.authors.count(), 0)
+        self.assertGreater(entry.tags.count(), 0)
+
+    def test_write_corpus_to_files(self):
+        bibtex_path = os.path.join(self.tempdir.name, "corpus.bib")
+        json_path = os.path.join(self.tempdir.name, "corpus.json")
+        self.generate(
+            "--entries=40",
+            "--seed=5",
+            "--batch-size=16",
+            f"--bibtex={bibtex_path}",
+            f"--json={json_path}",
+            "--no-insert",
+        )
+        self.assertEqual(CompendiumEntry.objects.count(), 0)
+
+        # Both files can be uploaded, and have the same entries as the corpus
+        records = list(CorpusGenerator(40, seed=5).records())
+        with open(json_path) as f:
+            self.assertEqual(JsonUploadForm().parse(f), records)
+
+        with open(bibtex_path) as f:
+            uploaded = list(BibTexUploadForm().parse(f))
+        self.assertEqual(len(uploaded), 40)
+        for (record, upload) in zip(records, uploaded):
+            # BibTeX doesn't have a field for the day of publication
+            self.assertEqual(upload["entry"], {**record["entry"], "day": None})
+            self.assertEqual(upload["authors"], record["authors"])
+            self.assertEqual(upload["tags"], record["tags"])
+
+    def test_invalid_options(self):
+        with self.assertRaises(CommandError):
+            self.generate("--entries=0")
+        with self.assertRaises(CommandError):
+            self.generate("--no-insert")
+        with self.assertRaises(CommandError):
+            self.generate("--owner=nobody")
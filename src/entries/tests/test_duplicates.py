@@ -0,0 +1,230 @@
+"""
+Tests for detecting near-duplicate compendium entries
+"""
+
+from django.core.management import call_command
+from entries.duplicates import (
+    DUPLICATE_THRESHOLD,
+    duplicate_detector,
+    minhasher,
+    normalize,
+    shingles,
+    similarity,
+)
+from entries.importers import EntryImporter
+from entries.models import Author, CompendiumEntry, EntrySignature, SignatureBucket
+from io import StringIO
+from utils.test_utils import UnitTest
+
+
+class MinHashTestCase(UnitTest):
+    """
+    Tests for computing MinHash signatures
+    """
+
+    def test_normalize(self):
+        self.assertEqual(
+            normalize("  A {Flawed} Encryption-Policy: [Editorial] "),
+            "a flawed encryption policy editorial",
+        )
+        self.assertEqual(
+            normalize("Cryptographie à clé publique"),
+            normalize("CRYPTOGRAPHIE A CLE PUBLIQUE"),
+        )
+        self.assertEqual(normalize(None), "")
+
+    def test_shingles(self):
+        self.assertEqual(
+            shingles("RSA keys", ["Ron Rivest", "Adi Shamir"], 1977),
+            {
+                "rsa ",
+                "sa k",
+                "a ke",
+                " key",
+                "keys",
+                "author:rivest",
+                "author:shamir",
+                "year:1977",
+            },
+        )
+        self.assertEqual(shingles("RSA", [], None), {"rsa"})
+
+    def test_similarity(self):
+        title = "A Method for Obtaining Digital Signatures and Public-Key Cryptosystems"
+        authors = ["Ron Rivest", "Adi Shamir", "Leonard Adleman"]
+        signature = minhasher.signature(title, authors, 1978)
+        self.assertEqual(len(signature), 64)
+        self.assertEqual(signature, minhasher.signature(title, authors, 1978))
+
+        # Differences in case and punctuation are ignored
+        same = minhasher.signature(title.upper().replace("-", " "), authors, 1978)
+        self.assertEqual(similarity(signature, same), 1.0)
+
+        # Small typos are still likely duplicates
+        typo = minhasher.signature(
+            title.replace("Obtaining", "Obtianing"), authors, 1978
+        )
+        self.assertGreaterEqual(similarity(signature, typo), DUPLICATE_THRESHOLD)
+
+        other = minhasher.signature(
+            "New Directions in Cryptography",
+            ["Whitfield Diffie", "Martin Hellman"],
+            1976,
+        )
+        self.assertLess(similarity(signature, other), 0.2)
+
+        # Signatures can be stored and read back from the database
+        self.assertEqual(minhasher.unpack(minhasher.pack(signature)), signature)
+        self.assertEqual(len(minhasher.buckets(signature)), 16)
+
+
+class DuplicateDetectorTestCase(UnitTest):
+    """
+    Tests for finding near-duplicates of new entries in the compendium
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.rsa = CompendiumEntry.objects.create(
+            title="A Method for Obtaining Digital Signatures and Public-Key Cryptosystems",
+            year=1978,
+        )
+        self.rsa.authors.add(
+            Author.objects.create(authorname="Ron Rivest"),
+            Author.objects.create(authorname="Adi Shamir"),
+        )
+        self.dh = CompendiumEntry.objects.create(
+            title="New Directions in Cryptography", year=1976
+        )
+
+    def new_entries(self):
+        return [
+            {
+                "title": "A method for obtaining digital signatures and public key cryptosystems.",
+                "year": 1978,
+                "authors": ["R. Rivest", "A. Shamir"],
+            },
+            {"title": "The Code Book", "year": 1999, "authors": ["Simon Singh"]},
+            {"title": "New Directions in Cryptography", "year": 1976},
+        ]
+
+    def test_signatures_are_stored(self):
+        self.assertEqual(EntrySignature.objects.count(), 2)
+        self.assertEqual(SignatureBucket.objects.filter(entry=self.rsa).count(), 16)
+
+        # Signatures change along with the entry's title and authors
+        # (with a title that only has a single shingle, so that adding an author
+        # is all but certain to change the signature)
+        entry = CompendiumEntry.objects.create(title="RSA")
+        signature = EntrySignature.objects.get(entry=entry).signature
+        entry.authors.add(Author.objects.create(authorname="Leonard Adleman"))
+        self.assertNotEqual(
+            EntrySignature.objects.get(entry=entry).signature, signature
+        )
+
+        signature = EntrySignature.objects.get(entry=entry).signature
+        entry.title = "DSA"
+        entry.save()
+        self.assertNotEqual(
+            EntrySignature.objects.get(entry=entry).signature, signature
+        )
+
+        # Deleting an entry deletes its signature
+        self.dh.delete()
+        self.assertEqual(EntrySignature.objects.count(), 2)
+        self.assertFalse(SignatureBucket.objects.filter(entry_id=self.dh.pk).exists())
+
+    def test_entries_without_shingles(self):
+        # Entries with neither a title nor authors don't get a signature, so
+        # that they aren't all reported as duplicates of each other
+        self.assertIsNone(minhasher.signature("", [], None))
+        self.assertIsNone(minhasher.signature("...", [], 1999))
+        for _ in range(2):
+            entry = CompendiumEntry.objects.create(title="", year=1999)
+        self.assertFalse(EntrySignature.objects.filter(entry=entry).exists())
+        self.assertFalse(SignatureBucket.objects.filter(entry=entry).exists())
+        self.assertEqual(
+            duplicate_detector.find_duplicates([{"title": "", "year": 1999}]), {}
+        )
+
+    def test_author_changes(self):
+        entry = CompendiumEntry.objects.create(title="RSA")
+        author = Author.objects.create(authorname="Leonard Adleman")
+        entry.authors.add(author)
+        signature = EntrySignature.objects.get(entry=entry).signature
+
+        # Renaming an author, removing it from its entries and deleting it all
+        # update the signatures of its entries
+        author.authorname = "Whitfield Diffie"
+        author.save()
+        renamed = EntrySignature.objects.get(entry=entry).signature
+        self.assertNotEqual(renamed, signature)
+
+        author.compendiumentry_set.clear()
+        cleared = EntrySignature.objects.get(entry=entry).signature
+        self.assertNotEqual(cleared, renamed)
+
+        entry.authors.add(author)
+        author.delete()
+        self.assertEqual(EntrySignature.objects.get(entry=entry).signature, cleared)
+
+    def test_find_duplicates(self):
+        with self.assertNumQueries(2):
+            duplicates = duplicate_detector.find_duplicates(self.new_entries())
+
+        self.assertEqual(sorted(duplicates), [0, 2])
+        self.assertEqual(duplicates[0][0]["id"], self.rsa.pk)
+        self.assertEqual(duplicates[0][0]["slug"], self.rsa.slug)
+        self.assertGreaterEqual(duplicates[0][0]["similarity"], DUPLICATE_THRESHOLD)
+        self.assertEqual(
+            duplicates[2],
+            [
+                {
+                    "id": self.dh.pk,
+                    "title": self.dh.title,
+                    "slug": self.dh.slug,
+                    "similarity": 1.0,
+                }
+            ],
+        )
+
+        # Once an entry's title changes, it's no longer a duplicate
+        self.dh.title = "Something else entirely"
+        self.dh.save()
+        self.assertEqual(
+            sorted(duplicate_detector.find_duplicates(self.new_entries())), [0]
+        )
+
+    def test_imported_entries(self):
+        # Entries that are imported in bulk get signatures too (apart from the
+        # exact duplicates, which aren't imported at all)
+        EntryImporter().import_entries(
+            [
+                {
+                    "entry": {"title": e["title"], "year": e["year"]},
+                    "authors": e.get("authors", []),
+                }
+                for e in self.new_entries()
+            ]
+        )
+        self.assertEqual(EntrySignature.objects.count(), 3)
+        duplicates = duplicate_detector.find_duplicates(self.new_entries())
+        self.assertEqual(duplicates[1][0]["title"], "The Code Book")
+        self.assertEqual(len(duplicates[2]), 1)
+
+    def test_build_signatures(self):
+        EntrySignature.objects.all().delete()
+        SignatureBucket.objects.all().delete()
+        self.assertEqual(duplicate_detector.find_duplicates(self.new_entries()), {})
+
+        out = StringIO()
+        call_command("build_signatures", "--batch-size", "1", stdout=out)
+        self.assertIn("Computed signatures for 2 entries", out.getvalue())
+        self.assertEqual(
+            sorted(duplicate_detector.find_duplicates(self.new_entries())), [0, 2]
+        )
+
+        # Entries that already have signatures are skipped
+        out = StringIO()
+        call_command("build_signatures", stdout=out)
+        self.assertIn("Computed signatures for 0 entries", out.getvalue())
@@ -0,0 +1,133 @@
+"""
+Tests for the exact-match fingerprints of compendium entries
+"""
+
+from entries.fingerprints import canonical_url, entry_fingerprint, find_doi
+from entries.importers import EntryImporter
+from entries.models import CompendiumEntry
+from utils.test_utils import UnitTest
+
+
+class FingerprintTestCase(UnitTest):
+    """
+    Tests for computing fingerprints
+    """
+
+    def test_find_doi(self):
+        self.assertEqual(
+            find_doi("https://doi.org/10.1145/359340.359342"), "10.1145/359340.359342"
+        )
+        self.assertEqual(
+            find_doi("https://link.springer.com/article/10.1007/BF00196725?x=1"),
+            "10.1007/bf00196725",
+        )
+        self.assertEqual(
+            find_doi("http://dx.doi.org/10.1109%2FTIT.1976.1055638"),
+            "10.1109/tit.1976.1055638",
+        )
+        self.assertIsNone(find_doi("https://www.nytimes.com/2015/07/08/rsa.html"))
+        self.assertIsNone(find_doi(None))
+
+    def test_canonical_url(self):
+        url = "example.com/articles/rsa?id=1&page=2"
+        for variant in (
+            "https://example.com/articles/rsa?id=1&page=2",
+            "http://www.EXAMPLE.com:80/articles//rsa/?page=2&id=1",
+            "https://example.com/articles/rsa?id=1&page=2&utm_source=twitter#top",
+        ):
+            self.assertEqual(canonical_url(variant), url)
+
+        self.assertNotEqual(
+            canonical_url("https://example.com/articles/rsa?id=2"), canonical_url(url)
+        )
+        self.assertIsNone(canonical_url(""))
+
+        # URLs whose host can't be parsed are used as they are
+        url = "http://example.com:99999/x"
+        self.assertEqual(canonical_url(url), url)
+        self.assertEqual(canonical_url("http://[::1/x"), "http://[::1/x")
+
+    def test_entry_fingerprint(self):
+        title = "A Method for Obtaining Digital Signatures and Public-Key Cryptosystems"
+        doi = entry_fingerprint("https://doi.org/10.1145/359340.359342", title, 1978)
+        self.assertTrue(doi.startswith("doi:"))
+        self.assertLessEqual(len(doi), 50)
+
+        # Entries with the same DOI match, whatever their titles
+        self.assertEqual(
+            entry_fingerprint("https://dl.acm.org/doi/10.1145/359340.359342", "", None),
+            doi,
+        )
+
+        # Entries without a URL are matched by their title and year
+        fingerprint = entry_fingerprint(None, title, 1978)
+        self.assertTrue(fingerprint.startswith("title:"))
+        self.assertEqual(entry_fingerprint("", f" {title.upper()}.", 1978), fingerprint)
+        self.assertNotEqual(entry_fingerprint(None, title, 1977), fingerprint)
+
+        self.assertIsNone(entry_fingerprint(None, "", None))
+
+    def test_saved_entries_have_fingerprints(self):
+        entry = CompendiumEntry.objects.create(title="RSA", year=1978)
+        self.assertEqual(entry.fingerprint, entry_fingerprint(None, "RSA", 1978))
+
+        entry.url = "https://doi.org/10.1145/359340.359342"
+        entry.save()
+        entry.refresh_from_db()
+        self.assertTrue(entry.fingerprint.startswith("doi:"))
+
+    def test_out_of_range_port(self):
+        # Entries can be saved and imported with a URL that URLValidator
+        # accepts but urllib can't parse
+        url = "http://example.com:99999/x"
+        entry = CompendiumEntry.objects.create(title="RSA", url=url)
+        self.assertEqual(entry.fingerprint, entry_fingerprint(url, "", None))
+        self.assertTrue(entry.fingerprint.startswith("url:"))
+
+        importer = EntryImporter()
+        records = [{"entry": {"title": "RSA", "url": url}}]
+        self.assertEqual(importer.find_new(records), [])
+        self.assertEqual(importer.import_entries(records), [])
+
+
+class SkipExistingTestCase(UnitTest):
+    """
+    Tests for skipping entries that are already in the compendium when they're
+    imported
+    """
+
+    def records(self):
+        return [
+            {"entry": {"title": "RSA", "year": 1978}},
+            {
+                "entry": {
+                    "title": "Rivest, Shamir and Adleman (1978)",
+                    "url": "https://doi.org/10.1145/359340.359342",
+                }
+            },
+            {"entry": {"title": "DSA", "year": 1991}},
+            {"entry": {"title": "dsa", "year": 1991}},
+        ]
+
+    def test_find_new(self):
+        CompendiumEntry.objects.create(
+            title="RSA", year=1978, url="https://dl.acm.org/doi/10.1145/359340.359342",
+        )
+        CompendiumEntry.objects.create(title="RSA", year=1978)
+
+        importer = EntryImporter()
+        with self.assertNumQueries(1):
+            self.assertEqual(importer.find_new(self.records()), [2])
+
+    def test_reimport(self):
+        importer = EntryImporter(batch_size=2)
+        self.assertEqual(len(importer.import_entries(self.records())), 3)
+        self.assertEqual(importer.import_entries(self.records()), [])
+        self.assertEqual(CompendiumEntry.objects.count(), 3)
+
+        entry = CompendiumEntry.objects.get(title="DSA")
+        self.assertEqual(entry.fingerprint, entry_fingerprint(None, "DSA", 1991))
+
+        # Exact duplicates can still be imported on purpose
+        importer.import_entries(self.records(), skip_existing=False)
+        self.assertEqual(CompendiumEntry.objects.count(), 7)
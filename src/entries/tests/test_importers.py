@@ -0,0 +1,89 @@
+"""
+Tests for importing compendium entries in bulk
+"""
+
+from django.db import connection
+from entries.importers import EntryImporter
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag, Publisher
+from search.models import IndexUpdate
+from utils.test_utils import UnitTest
+
+
+class EntryImporterTestCase(UnitTest):
+    """
+    Test suite for EntryImporter
+    """
+
+    def setUp(self):
+        super().setUp(create_user=True)
+        Author.objects.create(authorname="Ron Rivest")
+        CompendiumEntryTag.objects.create(tagname="rsa")
+
+    def records(self, n, prefix=""):
+        return [
+            {
+                "entry": {
+                    "title": f"{prefix}Entry {ii}",
+                    "year": 1970 + ii % 50,
+                    "publisher_text": f"{prefix}Publisher {ii}",
+                },
+                "authors": [
+                    "Ron Rivest",
+                    f"{prefix}Author {ii}",
+                    f"{prefix}Author {ii + 1}",
+                ],
+                "tags": ["rsa", f"{prefix}tag {ii}"],
+            }
+            for ii in range(n)
+        ]
+
+    def test_import_entries(self):
+        importer = EntryImporter(owner=self.user, batch_size=4)
+        entry_ids = importer.import_entries(self.records(10))
+        self.assertEqual(len(entry_ids), 10)
+
+        entries = CompendiumEntry.objects.in_bulk(entry_ids)
+        entry = entries[entry_ids[3]]
+        self.assertEqual(entry.title, "Entry 3")
+        self.assertEqual(entry.owner, self.user)
+        self.assertEqual(entry.slug, "entry-3")
+        self.assertEqual(entry.publisher.publishername, "Publisher 3")
+        self.assertEqual(
+            sorted(a.authorname for a in entry.authors.all()),
+            ["Author 3", "Author 4", "Ron Rivest"],
+        )
+        self.assertEqual(sorted(t.tagname for t in entry.tags.all()), ["rsa", "tag 3"])
+
+        # Existing authors and tags are reused
+        self.assertEqual(Author.objects.count(), 12)
+        self.assertEqual(CompendiumEntryTag.objects.count(), 11)
+        self.assertEqual(Publisher.objects.count(), 10)
+
+        # The entries are added to the search index outbox
+        self.assertEqual(
+            set(IndexUpdate.objects.values_list("entry_id", flat=True)), set(entry_ids),
+        )
+
+    def test_queries_grow_with_batches(self):
+        # Every batch creates new authors, tags and publishers, so it takes the
+        # same number of queries no matter how many entries it has (plus two
+        # queries for the transaction's savepoint). The batches are small enough
+        # that SQLite doesn't have to split any of the bulk inserts up to stay
+        # under its limit on the number of query parameters.
+        per_batch = 17 if connection.features.can_return_rows_from_bulk_insert else 18
+
+        importer = EntryImporter(batch_size=30)
+        with self.assertNumQueries(per_batch + 2):
+            importer.import_entries(self.records(30, prefix="a"))
+        with self.assertNumQueries(2 * per_batch + 2):
+            importer.import_entries(self.records(60, prefix="b"))
+
+    def test_rollback(self):
+        # Nothing is imported if any of the entries can't be inserted
+        records = self.records(10)
+        records[7]["entry"]["title"] = None
+        with self.assertRaises(Exception):
+            EntryImporter(batch_size=4).import_entries(records)
+
+        self.assertEqual(CompendiumEntry.objects.count(), 0)
+        self.assertEqual(Author.objects.count(), 1)
@@ -48,6 +48,15 @@ class CompendiumEntryModelTestCase(UnitTest):
         self.assertEqual(entry.abstract, None)
         self.assertEqual(entry.url, None)
 
+    def test_last_modified(self):
+        entry = CompendiumEntry.objects.create(title=self.title)
+        created = entry.last_modified
+        self.assertTrue((timezone.now() - created).seconds < 10)
+
+        entry.abstract = self.abstract
+        entry.save()
+        self.assertGreater(entry.last_modified, created)
+
     def test_attempt_create_resource_with_invalid_fields(self):
         # TODO: empty title
         # TODO: URL not actually a URL
@@ -0,0 +1,82 @@
+"""
+Tests for validating compendium entries in bulk
+"""
+
+from entries.forms import CompendiumEntryForm
+from entries.models import CompendiumEntryTag
+from entries.validation import EntryValidator, validate_entries
+from utils.test_utils import UnitTest
+
+
+class EntryValidatorTestCase(UnitTest):
+    """
+    Test suite for EntryValidator
+    """
+
+    def setUp(self):
+        super().setUp()
+        CompendiumEntryTag.objects.create(tagname="rsa")
+
+    def entries(self, n):
+        return [
+            {"title": f"Entry {ii}", "year": 1970 + ii % 50, "month": 1 + ii % 12}
+            for ii in range(n)
+        ]
+
+    def test_validate_entries(self):
+        entries = self.entries(5)
+        entries[1]["title"] = ""
+        entries[3]["day"] = 31
+        entries[3]["month"] = 2
+        entries[4]["url"] = "not a url"
+
+        with self.assertNumQueries(0):
+            (cleaned, errors) = validate_entries(entries)
+
+        self.assertEqual(sorted(errors), [1, 3, 4])
+        self.assertEqual(list(errors[1]), ["title"])
+        self.assertEqual(list(errors[3]), ["day"])
+        self.assertEqual(list(errors[4]), ["url"])
+
+        self.assertIsNone(cleaned[1])
+        self.assertEqual(cleaned[0]["title"], "Entry 0")
+        self.assertEqual(cleaned[2]["year"], 1972)
+        self.assertNotIn("tags", cleaned[0])
+
+    def test_same_errors_as_compendium_entry_form(self):
+        # Entries are checked in the same way as when they're created through
+        # the site (apart from their tags)
+        entries = self.entries(3) + [
+            {"title": "x" * 1000},
+            {"title": "Entry", "day": 1},
+            {"title": "Entry", "year": "not a year"},
+        ]
+        (_, errors) = validate_entries(entries)
+        for (ii, entry) in enumerate(entries):
+            form = CompendiumEntryForm(data=entry)
+            form.is_valid()
+            self.assertEqual(errors.get(ii, {}), form.errors)
+
+    def test_parallel_validation(self):
+        entries = self.entries(100)
+        for ii in (7, 42, 99):
+            entries[ii]["title"] = ""
+
+        with EntryValidator(workers=2, chunk_size=10) as validator:
+            (cleaned, errors) = validator.validate(entries)
+            self.assertIsNotNone(validator._executor)
+        self.assertIsNone(validator._executor)
+
+        # Every invalid entry is reported, by its index in the input
+        self.assertEqual(sorted(errors), [7, 42, 99])
+        self.assertEqual(len(cleaned), 100)
+        self.assertEqual(
+            [ii for (ii, entry) in enumerate(cleaned) if entry is None], [7, 42, 99]
+        )
+        self.assertEqual(cleaned[50]["title"], "Entry 50")
+
+        # The results are the same as when validating in a single process
+        self.assertEqual(
+            EntryValidator(workers=1, chunk_size=10).validate(entries),
+            (cleaned, errors),
+        )
@@ -0,0 +1,157 @@
+"""
+Validation of compendium entries in bulk, e.g. for uploaded files.
+
+Validating a large upload with one CompendiumEntryForm per entry is CPU-bound,
+and stops at the first invalid entry. The validator here checks the entries
+in chunks across a pool of processes, using a form that never has to query the
+database (EntryFieldsForm), and reports every invalid entry along with its
+index.
+"""
+
+import django
+
+from concurrent.futures import ProcessPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from entries.forms import EntryFieldsForm
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# The errors of an invalid entry, as a map from its fields to their error
+# messages (errors that don't belong to a single field are under "__all__")
+EntryErrors = Dict[str, List[str]]
+
+# The number of invalid entries whose errors are reported when a file fails
+# validation
+MAX_REPORTED_ERRORS = 20
+
+
+class EntryValidator:
+    """
+    Validates the fields of compendium entries in parallel.
+
+    The validator starts its pool of processes the first time that it's given
+    enough entries to split between them, and should be closed (or used as a
+    context manager) to shut the pool down again.
+
+    Parameters
+    ----------
+    workers : Optional[int]
+        The number of processes to validate entries with. Defaults to
+        settings.IMPORT_VALIDATION_WORKERS. With fewer than two workers,
+        entries are validated in the current process.
+
+    chunk_size : int
+        The number of entries to send to a worker at a time.
+    """
+
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 100):
+        self._workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    @property
+    def workers(self) -> int:
+        if self._workers is None:
+            return settings.IMPORT_VALIDATION_WORKERS
+        return self._workers
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def validate(
+        self, entries: Sequence[Dict]
+    ) -> Tuple[List[Optional[Dict]], Dict[int, EntryErrors]]:
+        """
+        Validate the fields of a sequence of entries. Returns the cleaned data
+        of each entry (or None for entries that are invalid), and the errors of
+        each invalid entry, keyed by the entry's index in the sequence.
+        """
+        offsets = range(0, len(entries), self.chunk_size)
+        chunks = [entries[start : start + self.chunk_size] for start in offsets]
+        if self.workers < 2 or len(chunks) < 2:
+            results = map(validate_entries, chunks)
+        else:
+            results = self._pool().map(validate_entries, chunks)
+
+        cleaned = []
+        errors = {}
+        for (start, (chunk_cleaned, chunk_errors)) in zip(offsets, results):
+            cleaned += chunk_cleaned
+            errors.update((start + ii, err) for (ii, err) in chunk_errors.items())
+        return cleaned, errors
+
+    def close(self):
+        """
+        Shut down the validator's pool of processes, if it's been started.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    """
+    Internal API
+    """
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_setup_worker
+            )
+        return self._executor
+
+
+def validate_entries(
+    entries: Sequence[Dict],
+) -> Tuple[List[Optional[Dict]], Dict[int, EntryErrors]]:
+    """
+    Validate a chunk of entries in the current process, in the same way as
+    EntryValidator.validate.
+    """
+    cleaned = []
+    errors = {}
+    for (ii, entry) in enumerate(entries):
+        form = EntryFieldsForm(data=entry)
+        if form.is_valid():
+            cleaned.append(form.cleaned_data)
+        else:
+            cleaned.append(None)
+            errors[ii] = {
+                field: list(messages) for (field, messages) in form.errors.items()
+            }
+    return cleaned, errors
+
+
+def describe_errors(
+    errors: Dict[int, Tuple[Dict, EntryErrors]], n_invalid: int, n_entries: int
+) -> str:
+    """
+    Summarize the errors found while validating the entries of a file. The
+    errors are given as a map from the indices of (some of) the invalid entries
+    to the entry and its errors, and are reported numbering the entries from
+    one.
+    """
+    lines = [f"{n_invalid} of the {n_entries} entries in the file are invalid:"]
+    for (index, (entry, entry_errors)) in sorted(errors.items()):
+        messages = "; ".join(
+            f"{field}: {' '.join(messages)}"
+            for (field, messages) in entry_errors.items()
+        )
+        lines.append(f"- entry {index + 1} ({entry.get('title')!r}): {messages}")
+    if n_invalid > len(errors):
+        lines.append(f"- ...and {n_invalid - len(errors)} more")
+    return "\n".join(lines)
+
+
+"""
+Helper functions
+"""
+
+
+def _setup_worker():
+    # Processes that are spawned (rather than forked) from the main process
+    # have to set Django up before they can use any forms
+    if not apps.ready:
+        django.setup()
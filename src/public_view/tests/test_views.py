@@ -1,5 +1,9 @@
+from django.core.cache import caches
+from django.test import override_settings
 from django.urls import reverse
-from utils.test_utils import UnitTest
+from entries.models import CompendiumEntry
+from search.tests.test_cache import LOCMEM_CACHES
+from utils.test_utils import FakeSolrServer, UnitTest, empty_solr_response
 from unittest import skip
 
 
@@ -8,7 +12,148 @@ class LandingPageTestCase(UnitTest):
     Tests for the site's landing page.
     """
 
+    def respond(self, params):
+        results = empty_solr_response(params)
+        results["facet_counts"] = {
+            "facet_fields": {"tags": ["rsa", 3, "aes", 2, "key escrow", 1]}
+        }
+        return results
+
     def test_templates(self):
-        response = self.client.get(reverse("landing page"))
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("landing page"))
         self.assertTemplateUsed(response, "base.html")
         self.assertTemplateUsed(response, "landing_page.html")
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_tags_are_counted_by_solr(self):
+        caches["default"].clear()
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse("landing page"))
+            self.client.get(reverse("landing page"))
+
+        # The counts are cached between requests
+        self.assertEqual(len(solr.requests), 1)
+        params = solr.requests[0]["params"]
+        self.assertEqual(params["facet.field"], "tags")
+        self.assertEqual(params["facet.limit"], "40")
+        self.assertEqual(params["rows"], "0")
+
+        tags = response.context["tags"]
+        self.assertEqual([t["tagname"] for t in tags], ["aes", "key escrow", "rsa"])
+        self.assertEqual([t["count"] for t in tags], [2, 1, 3])
+        self.assertContains(response, "key escrow")
+
+    def test_solr_unavailable(self):
+        with FakeSolrServer(
+            respond=lambda params: (500, {})
+        ) as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("landing page"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["tags"], [])
+
+
+class AdvancedSearchTestCase(UnitTest):
+    """
+    Tests for the advanced search page.
+    """
+
+    def test_form_is_displayed_before_searching(self):
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("advanced search"))
+
+        self.assertTemplateUsed(response, "advanced_search.html")
+        self.assertEqual(len(solr.requests), 0)
+        self.assertNotIn("entries", response.context)
+
+    def test_filters_are_sent_as_filter_queries(self):
+        params = {
+            "search_string": "rsa",
+            "authors": "Rivest; Shamir",
+            "published_by": "ACM",
+            "published_after": "1977-01-01",
+            "page": 1,
+        }
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("advanced search"), params)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(solr.requests), 1)
+
+        # Only the search string is included in the main query
+        solr_params = solr.requests[0]["params"]
+        self.assertEqual(solr_params["q"], 'basic_search_ngram:"rsa"')
+        self.assertEqual(
+            solr_params["fq"],
+            [
+                'authors:"Rivest"',
+                'authors:"Shamir"',
+                'publisher:("ACM")',
+                "year:[1977 TO *]",
+            ],
+        )
+        self.assertEqual(solr_params["start"], "20")
+        self.assertNotIn("page=", response.context["search_params"])
+
+    def test_invalid_search(self):
+        params = {"published_after": "2000-01-01", "published_before": "1990-01-01"}
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("advanced search"), params)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(len(solr.requests), 0)
+
+
+class ArticleViewTestCase(UnitTest):
+    """
+    Tests for the pages displaying individual compendium entries.
+    """
+
+    def setUp(self):
+        super().setUp(create_user=True)
+        self.entry = CompendiumEntry.objects.create(title="The RSA cryptosystem")
+        self.url = f"/articles/{self.entry.slug}/"
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "article.html")
+        etag = response["ETag"]
+
+        # The validators are looked up with a single query, and the template
+        # isn't rendered
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertTemplateNotUsed(response, "article.html")
+
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        self.entry.abstract = "A method for obtaining digital signatures"
+        self.entry.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Users who are logged in see a different version of the page
+        etag = response["ETag"]
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.username)
+
+    def test_missing_article(self):
+        response = self.client.get("/articles/no-such-article/")
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
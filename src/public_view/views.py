@@ -2,12 +2,18 @@
 Views for the public-facing side of the site.
 """
 
-from django.db.models import Count
+import hashlib
+import requests
+
+from django.conf import settings
 from django.http import HttpResponse
 from django.shortcuts import render
 from django.views import View
-from django.views.decorators.http import require_http_methods
-from entries.models import CompendiumEntryTag, CompendiumEntry
+from django.views.decorators.http import condition, require_http_methods
+from entries.models import CompendiumEntry
+from search.forms import AdvancedSearchForm
+from search.solr import SolrQueryError
+from search.views import SearchView
 from search.views.mixins import BasicSearchMixin
 
 
@@ -23,21 +29,18 @@ class LandingPage(BasicSearchMixin, View):
     def get(self, request):
         search_form = self.create_search_form(request)
 
-        # Equivalent SQL query:
-        #
-        #   SELECT DISTINCT t.*, count(*)
-        #   FROM entries_compendiumentrytag as t, compendium_tags as c
-        #   WHERE t.id = c.compendiumentrytag_id
-        #   GROUP BY t.id
-        #   ORDER BY count DESC
-        #   LIMIT {n_tags};
-        #
-        tags = (
-            CompendiumEntryTag.objects.all()
-            .annotate(count=Count("compendiumentry"))
-            .order_by("-count")[: self.n_tags]
-        )
-        tags = sorted(tags, key=lambda tag: tag.tagname)
+        # The most common tags are counted by Solr as a facet of the whole
+        # compendium (which is cached along with search results), rather than
+        # by aggregating over every tag of every entry in the database. The
+        # page is still displayed, without tags, if Solr is unavailable.
+        try:
+            counts = self.search_engine.facet_counts("tags", self.n_tags)
+        except (requests.RequestException, SolrQueryError) as ex:
+            self.search_logger.warning(f"Unable to count tags: {ex!r}")
+            counts = []
+
+        tags = [{"tagname": tagname, "count": count} for (tagname, count) in counts]
+        tags = sorted(tags, key=lambda tag: tag["tagname"])
 
         return render(
             request,
@@ -56,12 +59,73 @@ def basic_search(request):
     return render(request, "landing_page.html")
 
 
-@require_http_methods(["POST"])
-def advanced_search(request):
-    return render(request, "advanced_search.html")
+class AdvancedSearch(SearchView):
+    """
+    Search the compendium by author, publisher, publication date and tags in
+    addition to a search string. Each of these filters is sent to Solr as its
+    own filter query, so the documents matching a filter are cached by Solr
+    and reused between searches.
+    """
+
+    search_form_class = AdvancedSearchForm
+    template_name = "advanced_search.html"
+    query_param = "search_string"
+
+    # The advanced search form has its own fields for refining the results,
+    # so we don't display any facets.
+    facet_labels = {}
+
+    def get(self, request):
+        # Only display the form until the user submits a search
+        if len(request.GET) == 0:
+            context = {"search_form": AdvancedSearchForm()}
+            return render(request, self.template_name, context)
+
+        search_form = self.create_search_form(request)
+        if not search_form.is_valid():
+            context = {"search_form": search_form}
+            return render(request, self.template_name, context, status=422)
+
+        results = self.search_engine.basic_search(search_form.cleaned_data)
+        context = self.get_results_context(request, results)
+        context["search_form"] = search_form
+        return render(request, self.template_name, context)
+
+
+def article_last_modified(request, slug_title):
+    """
+    Get the time at which an article was last modified, or None if there's no
+    article with the given slug.
+    """
+    # Django calls both the ETag and Last-Modified functions, so we remember
+    # the result on the request in order to look it up with a single query.
+    if not hasattr(request, "_article_last_modified"):
+        request._article_last_modified = (
+            CompendiumEntry.objects.filter(slug=slug_title)
+            .values_list("last_modified", flat=True)
+            .first()
+        )
+    return request._article_last_modified
+
+
+def article_etag(request, slug_title):
+    """
+    Compute the ETag of an article page. The ETag is more precise than the
+    Last-Modified header (which only has a resolution of one second), and also
+    depends on the user's session, since the page is rendered differently for
+    users who are logged in.
+    """
+    last_modified = article_last_modified(request, slug_title)
+    if last_modified is None:
+        return None
+
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME, "")
+    session = hashlib.sha1(session.encode("utf-8")).hexdigest()[:16]
+    return f"article-{last_modified.timestamp()}-{session}"
 
 
 @require_http_methods(["GET"])
+@condition(etag_func=article_etag, last_modified_func=article_last_modified)
 def articles(request, slug_title):
     article = CompendiumEntry.objects.filter(slug=slug_title)
     if article.exists():
@@ -0,0 +1,168 @@
+"""
+Incremental reading of large BibTeX files.
+
+bibtexparser parses an entire file at once, so uploads have to be held in
+memory as a string, as well as the list of every entry parsed from it. The
+reader here splits the file into its entries as it reads it, and parses them
+one at a time, so that only a single entry (and a small read buffer) is held
+in memory at once.
+"""
+
+import io
+import mmap
+import re
+
+from bibtexparser.bparser import BibTexParser
+from typing import BinaryIO, Iterator
+
+# Characters that start an entry, or delimit its contents. All of these are
+# ASCII, so they can be found in UTF-8 encoded text without decoding it first.
+_DELIMITERS = re.compile(rb'[@{}()"]')
+
+
+class BibTexSyntaxError(ValueError):
+    """
+    Raised when the entries in a BibTeX file can't be separated from each other.
+    """
+
+    pass
+
+
+class BibTexReader:
+    """
+    Reads the entries in a BibTeX file one at a time.
+
+    Entries are found by matching up the braces (or parentheses) that surround
+    them, and are then parsed separately with bibtexparser. String macros
+    (@string) apply to every entry after them, as they would if the file were
+    parsed all at once. Text between entries is ignored.
+
+    Parameters
+    ----------
+    chunk_size : int
+        The number of bytes to read from the file at a time.
+
+    use_mmap : bool
+        Whether to memory-map files that are stored on disk, rather than
+        reading them through a buffer.
+    """
+
+    def __init__(self, chunk_size: int = 1 << 16, use_mmap: bool = True):
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+
+    def read(self, bibtex_file: BinaryIO) -> Iterator[dict]:
+        """
+        Parse the entries in a BibTeX file, yielding the fields of each entry
+        as it's read (in the same format as bibtexparser's BibDatabase.entries).
+        Raises a BibTexSyntaxError if an entry isn't closed, or a pyparsing
+        ParseException if an entry can't be parsed.
+        """
+        parser = BibTexParser(common_strings=True)
+        database = parser.bib_database
+
+        for raw in _raw_entries(self._chunks(bibtex_file)):
+            parser.parse(raw.decode("utf-8"))
+            yield from database.entries
+
+            # Forget the entries we've already yielded, so that they don't
+            # pile up in the parser's database
+            del database.entries[:]
+            del database.comments[:]
+            del database.preambles[:]
+
+    """
+    Internal API
+    """
+
+    def _chunks(self, bibtex_file: BinaryIO) -> Iterator[bytes]:
+        fileno = _fileno(bibtex_file) if self.use_mmap else None
+        if fileno is None:
+            yield from iter(lambda: bibtex_file.read(self.chunk_size), b"")
+            return
+
+        # mmap can't map empty files
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(0, len(mapped), self.chunk_size):
+                yield mapped[start : start + self.chunk_size]
+
+
+"""
+Helper functions
+"""
+
+
+def _fileno(bibtex_file: BinaryIO):
+    # Find the file descriptor of a file that's stored on disk, or return None
+    # for in-memory (and empty) files, which can't be memory-mapped.
+    try:
+        fileno = bibtex_file.fileno()
+        if bibtex_file.seek(0, io.SEEK_END) == 0:
+            return None
+        bibtex_file.seek(0)
+        return fileno
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _raw_entries(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    # Split a stream of BibTeX into the text of each of its entries. An entry
+    # starts with an "@" and runs up to the brace (or parenthesis) that closes
+    # the one following it; braces inside of an entry are always balanced, and
+    # delimiters inside of a quoted field value don't close the entry. Each
+    # chunk is only scanned once, and the pieces of an entry that spans several
+    # chunks are only joined once the entry is closed.
+    pieces = []  # The pieces of the current entry from earlier chunks
+    start = None  # The offset of the current entry in this chunk
+    opener = None  # The character that opened the body of the current entry
+    depth = 0  # The number of braces that are currently open in the entry
+    quoted = False  # Whether we're inside of a quoted field value
+
+    for chunk in chunks:
+        if start is not None:
+            start = 0
+        for match in _DELIMITERS.finditer(chunk):
+            char = match.group()
+            if opener is None:
+                # We're looking for the start of an entry. Any "@" outside of
+                # an entry's body (e.g. in a comment) restarts the search.
+                if char == b"@":
+                    (pieces, start) = ([], match.start())
+                elif start is not None and char in (b"{", b"("):
+                    opener = char
+                    depth = 1 if char == b"{" else 0
+                    quoted = False
+                continue
+
+            # Quotes only delimit values at the top level of the entry's body;
+            # inside of braces they're part of the text
+            if char == b'"':
+                if depth == (1 if opener == b"{" else 0):
+                    quoted = not quoted
+                continue
+            elif char == b"{":
+                depth += 1
+                continue
+            elif char == b"}":
+                depth -= 1
+                closed = opener == b"{" and depth == 0
+            elif char == b")":
+                closed = opener == b"(" and depth == 0 and not quoted
+            else:
+                continue
+
+            if closed:
+                pieces.append(chunk[start : match.end()])
+                yield b"".join(pieces)
+                pieces = []
+                start = opener = None
+
+        # Keep the part of the chunk that belongs to the current entry
+        if start is not None:
+            pieces.append(chunk[start:])
+
+    # bibtexparser silently ignores entries that are cut off at the end of the
+    # file, so we report them ourselves
+    if opener is not None:
+        head = b"".join(pieces)[:50].decode("utf-8", errors="replace")
+        raise BibTexSyntaxError(f"Unterminated entry starting with {head!r}")
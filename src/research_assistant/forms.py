@@ -3,23 +3,116 @@ Custom forms for the research assistant app, when forms defined in other
 apps won't work.
 """
 
-import bibtexparser
+import abc
 import json
 import re
 
-from bibtexparser.bparser import BibTexParser
 from django import forms
 from django.utils.translation import gettext as _
-from entries.forms import CompendiumEntryForm
+from entries.validation import MAX_REPORTED_ERRORS, EntryValidator, describe_errors
+from research_assistant.bibtex import BibTexReader
+from typing import Dict, Iterable, Iterator, List, Optional
 from utils.dates import month_num
 
 
-class JsonUploadForm(forms.Form):
+class _EntryUploadFormMeta(type(forms.Form), abc.ABCMeta):
+    # Forms have a metaclass of their own (for their declared fields), which
+    # has to be combined with ABCMeta for abstract methods to be enforced
+    pass
+
+
+class EntryUploadForm(forms.Form, metaclass=_EntryUploadFormMeta):
+    """
+    Base class for forms that add new compendium entries by uploading a file.
+    The file is parsed into a list of records, and the cleaned data of the form
+    is the list of records, with the cleaned data of each entry (validated with
+    an EntryValidator, as for imports) along with the names of its authors and
+    tags.
+
+    Parameters
+    ----------
+    parse : bool
+        Whether to parse and validate the uploaded file. If False, the form only
+        checks that a file was uploaded, and its cleaned data contain the file
+        itself. This is used to queue the file to be imported in the background
+        (see research_assistant.imports).
+    """
+
+    # The name of the form's file field, and the format of the files it accepts
+    file_field = None
+    import_format = None
+
+    def __init__(self, *args, parse: bool = True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parse_upload = parse
+
+    @abc.abstractmethod
+    def parse(self, upload) -> Iterable[Dict]:
+        """
+        Parse an uploaded file into records. Each record is a dictionary with
+        the fields of an entry ("entry"), as well as the names of its authors
+        ("authors") and tags ("tags"). Raises a ValidationError if the file
+        can't be read.
+
+        Formats that can be read incrementally (e.g. BibTeX) return an iterator
+        over the records, in which case the ValidationError is only raised once
+        the iterator reaches the part of the file that couldn't be read.
+        """
+
+    def _extract_url(self, url: Optional[str], doi: Optional[str]) -> Optional[str]:
+        # Entries that only have a DOI link to it through doi.org, so that they
+        # can still be identified by their DOI (see entries.fingerprints)
+        if not url and doi:
+            doi = re.sub(r"^(https?://(dx\.)?doi\.org/|doi:)", "", doi.strip())
+            return f"https://doi.org/{doi}"
+        return url
+
+    """
+    Form validation
+    """
+
+    def _clean_upload(self):
+        upload = self.cleaned_data.get(self.file_field)
+        if not self.parse_upload:
+            return upload
+        return list(self.parse(upload))
+
+    def clean(self):
+        """
+        Validate the entries in the uploaded file, reporting the errors of
+        every invalid entry.
+        """
+
+        cleaned_data = super().clean()
+        if not self.parse_upload:
+            return cleaned_data
+
+        records = cleaned_data.get(self.file_field, [])
+        with EntryValidator() as validator:
+            (cleaned, errors) = validator.validate([r["entry"] for r in records])
+
+        if len(errors) > 0:
+            reported = {
+                ii: (records[ii]["entry"], errors[ii])
+                for ii in sorted(errors)[:MAX_REPORTED_ERRORS]
+            }
+            raise forms.ValidationError(
+                describe_errors(reported, len(errors), len(records)),
+                code="compendium_entry_form_error",
+            )
+
+        return [{**record, "entry": entry} for (record, entry) in zip(records, cleaned)]
+
+
+class JsonUploadForm(EntryUploadForm):
     """
     Form for exporting data from Zotero in JSON format and then uploading
     it to the site.
     """
 
+    file_field = "json_file"
+    import_format = "json"
+
     json_file = forms.FileField(required=True, max_length=5e6,)  # 5 Mb
 
     """
@@ -57,26 +150,44 @@ class JsonUploadForm(forms.Form):
                     authors.append(family)
                 elif given != "" and family == "":
                     authors.append(given)
+                elif author.get("literal"):
+                    # Institutional authors only have a single name
+                    authors.append(author["literal"])
 
         return authors
 
+    def _extract_tags(self, item):
+        # Zotero's own JSON format lists tags as {"tag": name} objects, while
+        # CSL JSON exports have a comma-separated string of keywords.
+        if "tags" in item:
+            tags = [t["tag"] if isinstance(t, dict) else t for t in item["tags"]]
+        elif "keyword" in item:
+            tags = item["keyword"].split(",")
+        else:
+            tags = []
+        return [t.strip() for t in tags if t.strip() != ""]
+
+    def _extract_publisher(self, item):
+        for key in ("container-title", "publisher"):
+            if key in item:
+                return item[key]
+        return None
+
     """
-    Form validation
+    Parsing and validation
     """
 
-    def clean_json_file(self):
-        json_file = self.cleaned_data.get("json_file")
+    def parse(self, json_file) -> List[Dict]:
         data = self._read_json_file(json_file)
 
         # Extract individual fields out of the file
         entries = []
         for item in data.get("items", []):
-            title = item.get("title")
-            abstract = item.get("abstract", None)
             new_entry = {
                 "title": item.get("title"),
                 "abstract": item.get("abstract"),
-                "url": item.get("URL"),
+                "publisher_text": self._extract_publisher(item),
+                "url": self._extract_url(item.get("URL"), item.get("DOI")),
             }
 
             # Convert date
@@ -85,39 +196,21 @@ class JsonUploadForm(forms.Form):
             new_entry["month"] = month
             new_entry["day"] = day
 
-            # Get all of the entry's authors
-            # new_entry["authors"] = self._extract_authors(item)
-
-            entries.append(new_entry)
+            entries.append(
+                {
+                    "entry": new_entry,
+                    "authors": self._extract_authors(item),
+                    "tags": self._extract_tags(item),
+                }
+            )
 
         return entries
 
-    def clean(self):
-        """
-        Pass cleaned data from multiple CompendiumEntryForms.
-        """
+    def clean_json_file(self):
+        return self._clean_upload()
 
-        cleaned_data = super().clean()
-        new_entry_forms = []
-
-        # Loop over every entry we're creating and ensure that it's valid
-        for entry in cleaned_data["json_file"]:
-            # TODO: add more descriptive error messages in the case where
-            # we're invalid.
-            new_entry_form = CompendiumEntryForm(data=entry)
-            if not new_entry_form.is_valid():
-                raise forms.ValidationError(
-                    _("There was an error validating the form: %(err)s"),
-                    params={"err": repr(new_entry_form.errors)},
-                    code="compendium_entry_form_error",
-                )
-            else:
-                new_entry_forms.append(new_entry_form)
-
-        return new_entry_forms
-
-
-class BibTexUploadForm(forms.Form):
+
+class BibTexUploadForm(EntryUploadForm):
     """
     BibTexUploadForm is an input form that allows adding new compendium entries
     to the site by uploading a .bib file.
@@ -128,6 +221,9 @@ class BibTexUploadForm(forms.Form):
         A form field that accepts a .bib file and parses BibTeX from that file.
     """
 
+    file_field = "bibtex_file"
+    import_format = "bibtex"
+
     # Form field that can be used to upload a .bib file
     bibtex_file = forms.FileField(required=True, max_length=5e6,)  # 5 Mb
 
@@ -135,11 +231,11 @@ class BibTexUploadForm(forms.Form):
     Helper functions
     """
 
-    def _read_bibtex_file(self, bibtex_file) -> dict:
-        parser = BibTexParser(common_strings=True)
-
+    def _read_bibtex_file(self, bibtex_file) -> Iterator[dict]:
+        # Entries are read from the file one at a time, so a parsing error is
+        # only raised once we reach the entry that it's in.
         try:
-            bib_db = parser.parse_file(bibtex_file)
+            yield from BibTexReader().read(bibtex_file)
         except Exception as ex:
             raise forms.ValidationError(
                 _("Error parsing BibTeX: %(msg)s"),
@@ -147,8 +243,6 @@ class BibTexUploadForm(forms.Form):
                 code="invalid_bibtex",
             )
 
-        return bib_db.entries_dict
-
     """
     Function for reading Zotero's BibTeX output
     """
@@ -193,65 +287,36 @@ class BibTexUploadForm(forms.Form):
             authors = []
         return authors
 
-    def reformat_bibtex(self, bibtex: dict):
+    def reformat_bibtex(self, bibtex: Iterable[dict]) -> Iterator[Dict]:
         """
         Reformat the BibTeX received by the form into a format that's more easily
-        digestible by other parts of the code.
+        digestible by other parts of the code. Entries are reformatted as
+        they're read.
         """
 
-        entries = []
-
-        for entry in bibtex.values():
+        for entry in bibtex:
             year, month, day = self._extract_date(entry)
-            entries.append(
-                {
-                    "entry": {
-                        "title": self._extract_title(entry),
-                        "abstract": entry.get("abstract"),
-                        "publisher_text": self._extract_publisher(entry),
-                        "year": year,
-                        "month": month,
-                        "day": day,
-                        "url": entry.get("url"),
-                    },
-                    "authors": self._extract_authors(entry),
-                    "tags": self._extract_tags(entry),
-                }
-            )
-
-        return entries
+            yield {
+                "entry": {
+                    "title": self._extract_title(entry),
+                    "abstract": entry.get("abstract"),
+                    "publisher_text": self._extract_publisher(entry),
+                    "year": year,
+                    "month": month,
+                    "day": day,
+                    "url": self._extract_url(entry.get("url"), entry.get("doi")),
+                },
+                "authors": self._extract_authors(entry),
+                "tags": self._extract_tags(entry),
+            }
 
     """
-    Validation functions
+    Parsing and validation
     """
 
-    def clean_bibtex_file(self):
-        bibfile = self.cleaned_data.get("bibtex_file")
-        bib_dict = self._read_bibtex_file(bibfile)
-        entries = self.reformat_bibtex(bib_dict)
-
-        return entries
+    def parse(self, bibtex_file) -> Iterator[Dict]:
+        entries = self._read_bibtex_file(bibtex_file)
+        return self.reformat_bibtex(entries)
 
-    def clean(self):
-        cleaned_data = super().clean()
-        entries = cleaned_data.get("bibtex_file", [])
-
-        # Loop over every entry we're creating and use CompendiumEntryForm
-        # to ensure that it's valid.
-        new_entry_forms = []
-        for entry in entries:
-            entry_data = entry.pop("entry")
-            form = CompendiumEntryForm(data=entry_data)
-            if not form.is_valid():
-                # TODO: improved error message
-                raise forms.ValidationError(
-                    _("There was an error validating the form: %(err)s"),
-                    params={"err": repr(form.errors)},
-                    code="compendium_entry_form_error",
-                )
-            else:
-                new_entry_forms.append(
-                    {**entry, "form": form,}
-                )
-
-        return new_entry_forms
+    def clean_bibtex_file(self):
+        return self._clean_upload()
@@ -0,0 +1,287 @@
+"""
+Background imports of uploaded BibTeX and Zotero JSON files.
+
+Large uploads take far longer to parse, validate and insert than a web worker
+should spend on a single request. Instead, uploads are saved to disk and
+queued as ImportJobs (see research_assistant.models), which are processed by
+the workers started by `manage.py process_import_jobs`. Progress is recorded
+on the job as it runs, so that the dashboard can poll it.
+"""
+
+import json
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.forms import ValidationError
+from django.utils import timezone
+from entries.duplicates import duplicate_detector
+from entries.importers import EntryImporter, batches
+from entries.validation import (
+    MAX_REPORTED_ERRORS,
+    EntryErrors,
+    EntryValidator,
+    describe_errors,
+)
+from research_assistant.forms import BibTexUploadForm, JsonUploadForm
+from research_assistant.models import ImportJob
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Forms used to parse each of the formats that can be imported
+IMPORT_FORMS = {
+    form_class.import_format: form_class
+    for form_class in (BibTexUploadForm, JsonUploadForm)
+}
+
+# The number of likely duplicates that are reported by a job
+MAX_REPORTED_DUPLICATES = 100
+
+
+class ImportJobError(Exception):
+    """
+    Raised when an uploaded file can't be imported.
+    """
+
+    pass
+
+
+class ImportWorker:
+    """
+    Processes the import jobs in the queue.
+
+    Parameters
+    ----------
+    batch_size : Optional[int]
+        The number of entries to validate and insert at a time. Defaults to
+        settings.IMPORT_BATCH_SIZE.
+    """
+
+    worker_logger = logging.getLogger("research_assistant.imports")
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self._batch_size = batch_size
+
+    @property
+    def batch_size(self) -> int:
+        if self._batch_size is None:
+            return settings.IMPORT_BATCH_SIZE
+        return self._batch_size
+
+    def process_job(self) -> Optional[ImportJob]:
+        """
+        Run the oldest queued job, if there is one. Returns the job, or None
+        if the queue was empty.
+        """
+        job = self.claim()
+        if job is None:
+            return None
+
+        self.worker_logger.info(f"Starting import job {job.id} ({job.filename})")
+        try:
+            self.run(job)
+        except Exception as ex:
+            job.status = ImportJob.FAILED
+            job.error = str(ex) if isinstance(ex, ImportJobError) else repr(ex)
+            self.worker_logger.warning(f"Import job {job.id} failed: {job.error}")
+        else:
+            job.status = ImportJob.DONE
+            self.worker_logger.info(
+                f"Finished import job {job.id}: inserted {job.n_inserted} entries "
+                f"(skipped {job.n_skipped}) "
+                f"in {job.elapsed.total_seconds():.1f}s"
+            )
+        finally:
+            job.finished = timezone.now()
+            job.save(update_fields=["status", "error", "finished"])
+            _remove(job.path)
+
+        return job
+
+    def drain(self) -> int:
+        """
+        Run jobs until the queue is empty. Returns the number of jobs that
+        were run.
+        """
+        total = 0
+        while self.process_job() is not None:
+            total += 1
+        return total
+
+    def fail_interrupted(self) -> int:
+        """
+        Mark the jobs that were left running (by an earlier pool of workers
+        that was shut down before they finished) as failed, and delete their
+        uploaded files. They may have inserted some of their entries already,
+        so rather than running them again (and inserting those entries twice)
+        they have to be uploaded again. Returns the number of jobs that failed.
+        """
+        jobs = list(ImportJob.objects.running())
+        for job in jobs:
+            job.status = ImportJob.FAILED
+            job.finished = timezone.now()
+            job.error = "The import was interrupted"
+            job.save(update_fields=["status", "error", "finished"])
+            _remove(job.path)
+            self.worker_logger.warning(f"Import job {job.id} was interrupted")
+        return len(jobs)
+
+    def claim(self) -> Optional[ImportJob]:
+        """
+        Take the oldest queued job off of the queue, and mark it as running.
+        """
+        with transaction.atomic():
+            # Lock the job that we're claiming, so that multiple workers can
+            # take jobs off of the queue at the same time.
+            job = (
+                ImportJob.objects.queued()
+                .select_for_update(skip_locked=True)
+                .order_by("id")
+                .first()
+            )
+            if job is None:
+                return None
+
+            job.status = ImportJob.RUNNING
+            job.started = timezone.now()
+            job.save(update_fields=["status", "started"])
+        return job
+
+    def run(self, job: ImportJob):
+        """
+        Import the entries from the file uploaded for a job. Every entry is
+        validated before any of them are inserted, so that a file with invalid
+        entries is rejected as a whole (with the errors of every invalid entry).
+
+        Records are streamed from the upload one batch at a time, and the
+        cleaned records are spooled to a temporary file (as JSON lines) until
+        they're inserted, so that only one batch is held in memory at once
+        (however large the upload is).
+
+        Before each batch is inserted, entries that are already in the
+        compendium (including those from earlier batches) are skipped, so that
+        uploading the same library again doesn't add its entries twice. The
+        rest are checked for likely duplicates of the entries in the
+        compendium, which are reported by the job but still imported.
+
+        Entries are inserted one batch per transaction, so that the progress of
+        the job is visible while it runs. If inserting a batch fails, the
+        batches before it remain in the compendium (as reported by the job's
+        n_inserted).
+        """
+        spool = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", dir=os.path.dirname(job.path)
+        )
+        with spool, EntryValidator() as validator:
+            # The errors of (up to MAX_REPORTED_ERRORS of) the invalid
+            # entries, keyed by their indices in the file
+            errors = {}
+            n_invalid = 0
+
+            for batch in batches(self.parse(job), self.batch_size):
+                offset = job.n_parsed
+                self._progress(job, n_parsed=offset + len(batch))
+
+                (cleaned, batch_errors) = self.validate(batch, validator)
+                n_invalid += len(batch_errors)
+                for (ii, entry_errors) in batch_errors.items():
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors[offset + ii] = (batch[ii]["entry"], entry_errors)
+
+                # Once we've found an invalid entry nothing will be inserted, so
+                # there's no need to keep the rest of the entries
+                if n_invalid == 0:
+                    spool.writelines(json.dumps(record) + "\n" for record in cleaned)
+                self._progress(job, n_validated=job.n_validated + len(batch))
+
+            if n_invalid > 0:
+                raise ImportJobError(
+                    describe_errors(errors, n_invalid, job.n_validated)
+                )
+
+            spool.seek(0)
+            importer = EntryImporter(owner=job.owner, batch_size=self.batch_size)
+            for batch in batches(map(json.loads, spool), self.batch_size):
+                offset = job.n_inserted + job.n_skipped
+                new = importer.find_new(batch)
+                records = [batch[ii] for ii in new]
+                duplicates = self.find_duplicates(
+                    records, [offset + ii + 1 for ii in new]
+                )
+                importer.import_entries(records, skip_existing=False)
+                self._progress(
+                    job,
+                    n_inserted=job.n_inserted + len(records),
+                    n_skipped=job.n_skipped + len(batch) - len(records),
+                    n_duplicates=job.n_duplicates + len(duplicates),
+                    duplicates=(job.duplicates + duplicates)[:MAX_REPORTED_DUPLICATES],
+                )
+
+    def parse(self, job: ImportJob) -> Iterator[Dict]:
+        """
+        Read the records from the file uploaded for a job, one at a time.
+        """
+        form = IMPORT_FORMS[job.format]()
+        try:
+            with open(job.path, "rb") as upload:
+                yield from form.parse(upload)
+        except FileNotFoundError:
+            raise ImportJobError(f"The uploaded file {job.filename} no longer exists")
+        except ValidationError as ex:
+            raise ImportJobError(" ".join(ex.messages))
+
+    def validate(
+        self, records: List[Dict], validator: EntryValidator
+    ) -> Tuple[List[Dict], Dict[int, EntryErrors]]:
+        """
+        Validate the entries of a batch of records. Returns the valid records
+        (with the cleaned data of their entries), and the errors of each
+        invalid record, keyed by its index in the batch.
+        """
+        (cleaned, errors) = validator.validate([r["entry"] for r in records])
+        valid = [
+            {**record, "entry": entry}
+            for (record, entry) in zip(records, cleaned)
+            if entry is not None
+        ]
+        return valid, errors
+
+    def find_duplicates(self, records: List[Dict], numbers: List[int]) -> List[Dict]:
+        """
+        Find the records in a batch that are likely duplicates of entries that
+        are already in the compendium, as they're reported by the job. The
+        records are reported by their numbers in the file.
+        """
+        found = duplicate_detector.find_duplicates(
+            [{**r["entry"], "authors": r.get("authors", [])} for r in records]
+        )
+        return [
+            {
+                "entry": numbers[ii],
+                "title": records[ii]["entry"].get("title"),
+                "duplicate_of": matches[0],
+            }
+            for (ii, matches) in sorted(found.items())
+        ]
+
+    """
+    Internal API
+    """
+
+    def _progress(self, job: ImportJob, **counts):
+        for (counter, value) in counts.items():
+            setattr(job, counter, value)
+        job.save(update_fields=list(counts))
+
+
+"""
+Helper functions
+"""
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
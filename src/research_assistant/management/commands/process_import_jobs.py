@@ -0,0 +1,103 @@
+"""
+Pool of workers that import uploaded BibTeX and Zotero JSON files in the
+background.
+"""
+
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from research_assistant.imports import ImportWorker
+from research_assistant.models import ImportJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the files of compendium entries that have been uploaded to the "
+        "site. By default a pool of workers runs until it's interrupted, "
+        "polling the database for new import jobs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run all of the queued jobs in this process and then exit.",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Print the number of queued and running jobs, and then exit.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMPORT_WORKERS,
+            help="Number of worker processes to start.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE,
+            help="Number of entries to validate and insert at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.IMPORT_POLL_INTERVAL,
+            help="Number of seconds to wait between checks for new jobs.",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.print_status()
+            return
+
+        if options["once"]:
+            n_jobs = ImportWorker(batch_size=options["batch_size"]).drain()
+            self.stdout.write(f"Ran {n_jobs} import jobs")
+            return
+
+        # Jobs that were left running are from an earlier pool that was shut
+        # down before they finished
+        n_interrupted = ImportWorker().fail_interrupted()
+        if n_interrupted > 0:
+            self.stdout.write(f"Marked {n_interrupted} interrupted jobs as failed")
+
+        # Every worker has to open its own database connection. The workers
+        # aren't daemonic, since they start their own pools of processes to
+        # validate entries with.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(
+                target=work, args=(options["batch_size"], options["poll_interval"]),
+            )
+            for _ in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+
+        self.stdout.write(
+            f"Started {len(workers)} import workers; waiting for import jobs..."
+        )
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            pass
+
+    def print_status(self):
+        self.stdout.write(f"Queued jobs: {ImportJob.objects.queued().count()}")
+        self.stdout.write(f"Running jobs: {ImportJob.objects.running().count()}")
+
+
+def work(batch_size: int, poll_interval: float):
+    worker = ImportWorker(batch_size=batch_size)
+    try:
+        while True:
+            if worker.process_job() is None:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
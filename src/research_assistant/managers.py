@@ -0,0 +1,48 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+"""
+---------------------------------------------------
+Manager for the queue of import jobs
+---------------------------------------------------
+"""
+
+
+class ImportJobQuerySet(models.QuerySet):
+    def queued(self):
+        """
+        Get the jobs that are waiting to be picked up by a worker.
+        """
+        return self.filter(status=self.model.QUEUED)
+
+    def running(self):
+        """
+        Get the jobs that a worker is currently processing.
+        """
+        return self.filter(status=self.model.RUNNING)
+
+    def unfinished(self):
+        """
+        Get the jobs that are either queued or running.
+        """
+        return self.filter(status__in=(self.model.QUEUED, self.model.RUNNING))
+
+
+class ImportJobManager(models.Manager.from_queryset(ImportJobQuerySet)):
+    def enqueue(self, owner, import_format: str, upload):
+        """
+        Save an uploaded file to settings.IMPORT_ROOT, and queue a job to import
+        the compendium entries in it.
+        """
+        os.makedirs(settings.IMPORT_ROOT, exist_ok=True)
+        path = os.path.join(settings.IMPORT_ROOT, f"{uuid.uuid4().hex}.{import_format}")
+        with open(path, "wb") as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+
+        return self.create(
+            owner=owner, format=import_format, filename=upload.name, path=path,
+        )
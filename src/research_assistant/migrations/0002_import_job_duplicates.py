@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-18 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("research_assistant", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="duplicates",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="importjob",
+            name="n_duplicates",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 01:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("research_assistant", "0002_import_job_duplicates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="importjob",
+            name="n_skipped",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
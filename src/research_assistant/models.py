@@ -0,0 +1,155 @@
+"""
+Models used by the research assistant app.
+"""
+
+from datetime import timedelta
+from django.db import models
+from django.utils import timezone
+from research_assistant.managers import ImportJobManager
+from typing import Dict, Optional
+from users.models import User
+
+"""
+---------------------------------------------------
+Models
+---------------------------------------------------
+"""
+
+
+class ImportJob(models.Model):
+    """
+    A file of compendium entries (in BibTeX or Zotero JSON format) that was
+    uploaded to the site and is waiting to be imported, or has been imported,
+    in the background. Jobs are picked up from the database by the workers
+    started by the process_import_jobs management command.
+
+    Fields
+    ------
+    owner : django.db.models.ForeignKey
+        The user who uploaded the file, and who owns the imported entries.
+
+    format : django.db.models.CharField
+        The format of the uploaded file.
+
+    filename : django.db.models.CharField
+        The name of the file that was uploaded.
+
+    path : django.db.models.CharField
+        The location that the file was saved to (in settings.IMPORT_ROOT) while
+        it's waiting to be imported.
+
+    status : django.db.models.CharField
+        Whether the job is queued, running, done, or failed.
+
+    created : django.db.models.DateTimeField
+        The time at which the file was uploaded.
+
+    started : django.db.models.DateTimeField
+        The time at which a worker started importing the file.
+
+    finished : django.db.models.DateTimeField
+        The time at which the job finished (or failed).
+
+    n_parsed, n_validated, n_inserted : django.db.models.PositiveIntegerField
+        The number of entries that have been read from the file, validated, and
+        inserted into the compendium so far.
+
+    n_skipped : django.db.models.PositiveIntegerField
+        The number of entries that were skipped because they were already in
+        the compendium (see entries.fingerprints), e.g. because the same
+        library was uploaded before.
+
+    n_duplicates : django.db.models.PositiveIntegerField
+        The number of inserted entries that are likely duplicates of entries
+        that were already in the compendium (see entries.duplicates).
+
+    duplicates : django.db.models.JSONField
+        The first few of the likely duplicates. Each one has the number of the
+        new entry in the file ("entry"), its "title", and the existing entry
+        that it's most similar to ("duplicate_of").
+
+    error : django.db.models.TextField
+        The reason that the job failed.
+    """
+
+    BIBTEX = "bibtex"
+    JSON = "json"
+    FORMAT_CHOICES = ((BIBTEX, "BibTeX"), (JSON, "Zotero JSON"))
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    format = models.CharField(max_length=6, choices=FORMAT_CHOICES)
+    filename = models.CharField(max_length=255)
+    path = models.CharField(max_length=500)
+    status = models.CharField(
+        max_length=7, choices=STATUS_CHOICES, default=QUEUED, db_index=True
+    )
+    created = models.DateTimeField(default=timezone.now)
+    started = models.DateTimeField(blank=True, null=True)
+    finished = models.DateTimeField(blank=True, null=True)
+    n_parsed = models.PositiveIntegerField(default=0)
+    n_validated = models.PositiveIntegerField(default=0)
+    n_inserted = models.PositiveIntegerField(default=0)
+    n_skipped = models.PositiveIntegerField(default=0)
+    n_duplicates = models.PositiveIntegerField(default=0)
+    duplicates = models.JSONField(default=list, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    objects = ImportJobManager()
+
+    def __str__(self):
+        return f"import of {self.filename} ({self.status})"
+
+    @property
+    def elapsed(self) -> Optional[timedelta]:
+        """
+        The amount of time that the job has been running for (or ran for, if
+        it's finished), or None if it hasn't started yet.
+        """
+        if self.started is None:
+            return None
+        return (self.finished or timezone.now()) - self.started
+
+    def progress(self) -> Dict:
+        """
+        Summarize the progress of the job. The throughput of each stage of the
+        import is the number of entries that have gone through it per second
+        since the job started.
+        """
+        elapsed = self.elapsed
+        seconds = None if elapsed is None else elapsed.total_seconds()
+        counts = {
+            "parsed": self.n_parsed,
+            "validated": self.n_validated,
+            "inserted": self.n_inserted,
+        }
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "format": self.format,
+            "status": self.status,
+            "created": self.created.isoformat(),
+            "elapsed": seconds,
+            **counts,
+            "throughput": {
+                stage: (count / seconds if seconds else None)
+                for (stage, count) in counts.items()
+            },
+            "skipped": self.n_skipped,
+            "duplicates": self.n_duplicates,
+            "likely_duplicates": self.duplicates,
+            "error": self.error,
+        }
+
+    class Meta:
+        db_table = "import_jobs"
@@ -0,0 +1,122 @@
+"""
+Tests for the incremental BibTeX reader.
+"""
+
+import io
+import os
+import tempfile
+
+from bibtexparser.bparser import BibTexParser
+from django.test import tag
+from research_assistant.bibtex import BibTexReader, BibTexSyntaxError
+from utils.test_utils import UnitTest
+
+
+class CountingReader(io.BytesIO):
+    """
+    An in-memory file that keeps track of how many bytes have been read from it.
+    """
+
+    n_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.n_read += len(data)
+        return data
+
+
+@tag("compendium-entries")
+class BibTexReaderTestCase(UnitTest):
+    """
+    Tests for reading the entries of a BibTeX file one at a time.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.test_filename = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "data", "test_data.bib"
+        )
+        with open(self.test_filename, "rb") as f:
+            self.bibtex = f.read()
+
+    def read(self, bibtex: bytes, **kwargs):
+        return list(BibTexReader(**kwargs).read(io.BytesIO(bibtex)))
+
+    def test_same_entries_as_bibtexparser(self):
+        expected = BibTexParser(common_strings=True).parse(self.bibtex.decode("utf-8"))
+        for chunk_size in (1, 7, 1 << 16):
+            self.assertEqual(
+                self.read(self.bibtex, chunk_size=chunk_size), expected.entries
+            )
+
+    def test_mmap(self):
+        # Files stored on disk are memory-mapped, and give the same entries as
+        # in-memory files
+        with tempfile.TemporaryFile() as f:
+            f.write(self.bibtex)
+            f.seek(0)
+            entries = list(BibTexReader(chunk_size=7).read(f))
+        self.assertEqual(entries, self.read(self.bibtex))
+
+        with tempfile.TemporaryFile() as f:
+            self.assertEqual(list(BibTexReader().read(f)), [])
+
+    def test_entries_are_read_incrementally(self):
+        bibtex = b"\n".join(
+            b"@misc{key%d, title = {Entry %d}}" % (ii, ii) for ii in range(100)
+        )
+        upload = CountingReader(bibtex)
+        entries = BibTexReader(chunk_size=64).read(upload)
+
+        self.assertEqual(next(entries)["title"], "Entry 0")
+        self.assertLessEqual(upload.n_read, 128)
+        self.assertEqual(len(list(entries)), 99)
+        self.assertEqual(upload.n_read, len(bibtex))
+
+    def test_delimiters(self):
+        bibtex = (
+            b"Text between entries (including an e-mail@address) is ignored\n"
+            b"@string{acm = {Association for {Computing} Machinery}}\n"
+            b"@article{first, title = {Nested {braces} and (parentheses)},"
+            b" note = {e-mail: alice@example.com}, publisher = acm}\n"
+            b"@misc(second, title = {Parentheses around {the} entry})\n"
+            b"@comment{ignored}\n"
+            b'@misc{third, title = "Quoted \xc3\xa9 title", year = 2000}'
+        )
+        entries = self.read(bibtex, chunk_size=5)
+        self.assertEqual(
+            [e["ID"] for e in entries], ["first", "second", "third"],
+        )
+        self.assertEqual(entries[0]["title"], "Nested {braces} and (parentheses)")
+        self.assertEqual(entries[0]["note"], "e-mail: alice@example.com")
+        self.assertEqual(
+            entries[0]["publisher"], "Association for {Computing} Machinery"
+        )
+        self.assertEqual(entries[1]["title"], "Parentheses around {the} entry")
+        self.assertEqual(entries[2]["title"], "Quoted \xe9 title")
+
+    def test_delimiters_in_values(self):
+        # Parentheses in quoted or braced values don't close an entry that's
+        # surrounded by parentheses, and quotes inside of braces are just text
+        bibtex = (
+            b'@misc(first, title = "Closing) parenthesis", note = {a) b})\n'
+            b'@misc(second, title = {A single " quote}, note = "c) {d)}")\n'
+            b'@misc{third, title = "Quoted {braces} and ) parenthesis"}'
+        )
+        for chunk_size in (1, 4, 1 << 16):
+            entries = self.read(bibtex, chunk_size=chunk_size)
+            self.assertEqual(
+                [e["ID"] for e in entries], ["first", "second", "third"],
+            )
+            self.assertEqual(entries[0]["title"], "Closing) parenthesis")
+            self.assertEqual(entries[0]["note"], "a) b")
+            self.assertEqual(entries[1]["title"], 'A single " quote')
+            self.assertEqual(entries[1]["note"], "c) {d)}")
+            self.assertEqual(entries[2]["title"], "Quoted {braces} and ) parenthesis")
+
+    def test_unterminated_entry(self):
+        bibtex = b"@misc{first, title = {First}}\n@misc{second, title = {"
+        entries = BibTexReader().read(io.BytesIO(bibtex))
+        self.assertEqual(next(entries)["ID"], "first")
+        with self.assertRaises(BibTexSyntaxError):
+            next(entries)
@@ -5,10 +5,14 @@ Tests for views that are used to modify the compendium.
 import datetime
 import os
 import random
+import shutil
+import tempfile
 
 from django.urls import reverse
-from django.test import tag
+from django.test import override_settings, tag
 from entries.models import CompendiumEntry, CompendiumEntryTag, Author
+from research_assistant.imports import ImportWorker
+from research_assistant.models import ImportJob
 from utils.test_utils import UnitTest, random_username
 
 
@@ -144,6 +148,113 @@ class UploadBibTexViewTestCase(UnitTest):
 
     def setUp(self):
         super().setUp(preauth=True)
+        self.new_entry_page = reverse("research new article")
+
+        # Uploads are saved to a temporary directory until they're imported
+        self.import_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_root)
+        self.settings_override = override_settings(IMPORT_ROOT=self.import_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
 
         # Load in a test .bib file
-        # self.test_filename = os.
+        self.test_filename = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "data", "test_data.bib"
+        )
+
+    def upload(self):
+        with open(self.test_filename, "rb") as f:
+            response = self.client.post(
+                self.new_entry_page, {"bibtex_file": f, "bibtex-upload": ""}
+            )
+        ImportWorker().drain()
+        return response
+
+    def test_upload_bibtex(self):
+        response = self.upload()
+        self.assertRedirects(response, reverse("research dashboard"))
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.format, ImportJob.BIBTEX)
+        self.assertEqual(job.n_inserted, 2)
+
+        entries = CompendiumEntry.objects.order_by("title")
+        self.assertEqual(len(entries), 2)
+        self.assertTrue(all(e.owner == self.user for e in entries))
+        self.assertTrue(all(e.slug for e in entries))
+
+        entry = entries[0]
+        self.assertTrue(entry.title.startswith("A Flawed Encryption Policy"))
+        self.assertEqual(entry.publisher.publishername, "New York Times")
+        self.assertEqual(entry.all_authors, "Anonymous")
+
+        entry = entries[1]
+        self.assertEqual(
+            sorted(a.authorname for a in entry.authors.all()),
+            ["Nicholas Weaver", "Susan Hennessey"],
+        )
+        self.assertEqual(
+            sorted(t.tagname for t in entry.tags.all()), ["2010s", "Child Exploitation"]
+        )
+
+    def test_upload_is_idempotent(self):
+        self.upload()
+        self.upload()
+
+        # Uploading the same file again doesn't add its entries (or their
+        # authors and tags) a second time
+        self.assertEqual(CompendiumEntry.objects.count(), 2)
+        self.assertEqual(Author.objects.count(), 3)
+        self.assertEqual(CompendiumEntryTag.objects.count(), 2)
+
+        job = ImportJob.objects.order_by("created").last()
+        self.assertEqual(job.n_inserted, 0)
+        self.assertEqual(job.n_skipped, 2)
+
+
+@tag("compendium-modification")
+class UploadJsonViewTestCase(UnitTest):
+    """
+    Test the view that's involved in handling Zotero JSON uploads to the site
+    for adding new compendium entries.
+    """
+
+    def setUp(self):
+        super().setUp(preauth=True)
+        self.new_entry_page = reverse("research new article")
+
+        # Uploads are saved to a temporary directory until they're imported
+        self.import_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_root)
+        self.settings_override = override_settings(IMPORT_ROOT=self.import_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        # Load in a test JSON file
+        self.test_filename = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "data", "test_data.json"
+        )
+
+    def test_upload_json(self):
+        with open(self.test_filename, "rb") as f:
+            response = self.client.post(
+                self.new_entry_page, {"json_file": f, "json-upload": ""}
+            )
+        self.assertRedirects(response, reverse("research dashboard"))
+
+        # Nothing is imported until the job runs
+        self.assertEqual(CompendiumEntry.objects.count(), 0)
+        ImportWorker().drain()
+
+        entries = CompendiumEntry.objects.order_by("pk")
+        self.assertEqual(len(entries), 3)
+        self.assertTrue(all(e.owner == self.user for e in entries))
+
+        self.assertEqual(entries[0].all_authors, "Jamie Tarabay")
+        self.assertEqual(entries[0].publisher.publishername, "The New York Times")
+        self.assertEqual(entries[0].day, 6)
+        self.assertEqual(
+            entries[1].all_authors, "Susan Hennessey, Nicholas Weaver",
+        )
+        self.assertIsNone(entries[2].publisher)
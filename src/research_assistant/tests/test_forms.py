@@ -6,7 +6,6 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import tag
 from research_assistant.forms import BibTexUploadForm, JsonUploadForm
 from utils.test_utils import UnitTest
-from unittest import skip
 
 """
 ---------------------------------------------------
@@ -38,7 +37,8 @@ class JsonUploadFormTestCase(UnitTest):
         # Check that JsonUploadForm is correctly validating the file
         self.form.is_valid()
         self.assertTrue(self.form.is_valid())
-        self.data = [subform.cleaned_data for subform in self.form.cleaned_data]
+        self.results = self.form.cleaned_data
+        self.data = [r["entry"] for r in self.results]
         self.assertEqual(len(self.data), 3)
 
     def test_titles(self):
@@ -73,14 +73,28 @@ class JsonUploadFormTestCase(UnitTest):
             "https://www.nytimes.com/2018/12/06/world/australia/encryption-bill-nauru.html",
         )
 
-    @skip("TODO")
     def test_authors(self):
-        self.assertEqual(self.data[0]["authors"], ["Jamie Tarabay"])
+        self.assertEqual(self.results[0]["authors"], ["Jamie Tarabay"])
+        self.assertEqual(
+            self.results[1]["authors"], ["Susan Hennessey", "Nicholas Weaver"]
+        )
+        self.assertEqual(
+            self.results[2]["authors"], ["National Security Agency"],
+        )
+
+    def test_publishers(self):
+        self.assertEqual(self.data[0]["publisher_text"], "The New York Times")
+        self.assertEqual(self.data[2]["publisher_text"], None)
+
+    def test_tags(self):
+        form = JsonUploadForm()
+        self.assertEqual(self.results[0]["tags"], [])
         self.assertEqual(
-            self.data[1]["authors"], ["Susan Hennessey", "Nicholas Weaver"]
+            form._extract_tags({"tags": [{"tag": "NSA"}, {"tag": "1990s"}]}),
+            ["NSA", "1990s"],
         )
         self.assertEqual(
-            self.data[2]["authors"], ["National Security Agency"],
+            form._extract_tags({"keyword": "NSA, 1990s"}), ["NSA", "1990s"]
         )
 
 
@@ -115,18 +129,34 @@ class BibTexCompendiumEntryUploadTestCase(UnitTest):
         self.assertEqual(len(self.results), 2)
 
         # Within the ith dictionary there should be the following:
-        # - A CompendiumEntryForm with data for the ith entry
+        # - The cleaned data of the ith entry
         # - A list of authors
         # - A list of tags
         self.assertTrue(all(len(r.keys()) == 3 for r in self.results))
-        for key in ("form", "authors", "tags"):
+        for key in ("entry", "authors", "tags"):
             self.assertTrue(all(key in r for r in self.results))
 
-        self.data = [r["form"].cleaned_data for r in self.results]
+        self.data = [r["entry"] for r in self.results]
 
-    def test_forms_are_validated(self):
-        """Each CompendiumEntryForm should be valid"""
-        self.assertTrue(all(r["form"].is_valid() for r in self.results))
+    def test_invalid_entries_are_reported(self):
+        """Every invalid entry is reported, not only the first"""
+        bibtex = (
+            self.bib + "\n@misc{third, title = {Third}, year = {0}}"
+            "\n@misc{fourth, title = {Fourth}, url = {not a url}}"
+        )
+        form = BibTexUploadForm(
+            data={"bibtex_file": self.test_filename},
+            files={
+                "bibtex_file": SimpleUploadedFile(
+                    self.test_filename, bibtex.encode("utf-8")
+                )
+            },
+        )
+        self.assertFalse(form.is_valid())
+        message = " ".join(form.non_field_errors())
+        self.assertIn("2 of the 4 entries in the file are invalid", message)
+        self.assertIn("entry 3 ('Third')", message)
+        self.assertIn("entry 4 ('Fourth')", message)
 
     def test_titles_are_parsed_correctly(self):
         self.assertTrue(self.data[0]["title"].startswith("A Judicial Framework"))
@@ -0,0 +1,238 @@
+"""
+Tests for the background imports of uploaded files.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings, tag
+from django.urls import reverse
+from entries.models import CompendiumEntry
+from io import StringIO
+from research_assistant.imports import ImportWorker
+from research_assistant.models import ImportJob
+from users.models import User
+from utils.test_utils import UnitTest, create_random_user
+
+
+@tag("compendium-modification")
+class ImportWorkerTestCase(UnitTest):
+    """
+    Tests for the workers that run import jobs, and for the views that report
+    their progress.
+    """
+
+    def setUp(self):
+        super().setUp(preauth=True)
+
+        self.import_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.import_root)
+        self.settings_override = override_settings(IMPORT_ROOT=self.import_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+
+        self.worker = ImportWorker(batch_size=2)
+
+    def enqueue_json(self, items, filename: str = "upload.json") -> ImportJob:
+        upload = SimpleUploadedFile(
+            filename, json.dumps({"items": items}).encode("utf-8")
+        )
+        return ImportJob.objects.enqueue(self.user, ImportJob.JSON, upload)
+
+    def item(self, ii: int) -> dict:
+        return {
+            "title": f"Entry {ii}",
+            "author": [{"given": "Alice", "family": "Smith"}],
+            "issued": {"date-parts": [[2000 + ii, 1, 1]]},
+            "tags": [{"tag": "rsa"}],
+        }
+
+    def test_process_job(self):
+        job = self.enqueue_json([self.item(ii) for ii in range(5)])
+        self.assertTrue(os.path.exists(job.path))
+        self.assertEqual(job.status, ImportJob.QUEUED)
+
+        self.assertEqual(self.worker.process_job(), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.error, "")
+        self.assertEqual(job.n_parsed, 5)
+        self.assertEqual(job.n_validated, 5)
+        self.assertEqual(job.n_inserted, 5)
+        self.assertIsNotNone(job.started)
+        self.assertIsNotNone(job.finished)
+
+        # The uploaded file is removed once it's been imported
+        self.assertFalse(os.path.exists(job.path))
+        self.assertEqual(CompendiumEntry.objects.filter(owner=self.user).count(), 5)
+
+        # The queue is now empty
+        self.assertIsNone(self.worker.process_job())
+
+    def test_entries_are_imported_intact(self):
+        # The cleaned records are spooled to disk between validating and
+        # inserting them, which shouldn't change any of their fields
+        items = [self.item(ii) for ii in range(3)]
+        items[1]["abstract"] = "Caf\u00e9 \u2192 \U0001f512\nwith a second line"
+        self.enqueue_json(items)
+        self.worker.process_job()
+
+        entries = CompendiumEntry.objects.filter(owner=self.user).order_by("year")
+        self.assertEqual(
+            [(e.title, e.year, e.month, e.day) for e in entries],
+            [(f"Entry {ii}", 2000 + ii, 1, 1) for ii in range(3)],
+        )
+        self.assertEqual(entries[1].abstract, items[1]["abstract"])
+        for entry in entries:
+            self.assertEqual(
+                list(entry.authors.values_list("authorname", flat=True)),
+                ["Alice Smith"],
+            )
+            self.assertEqual(
+                list(entry.tags.values_list("tagname", flat=True)), ["rsa"]
+            )
+
+    def test_drain(self):
+        for ii in range(3):
+            self.enqueue_json([self.item(ii)])
+        self.assertEqual(self.worker.drain(), 3)
+        self.assertEqual(ImportJob.objects.filter(status=ImportJob.DONE).count(), 3)
+        self.assertEqual(CompendiumEntry.objects.count(), 3)
+
+    def test_invalid_entries_fail_the_job(self):
+        # Entries must have a title. Every entry is validated before any of
+        # them are inserted, so none of the entries are imported, and the
+        # errors of every invalid entry are reported.
+        items = [self.item(ii) for ii in range(5)]
+        del items[1]["title"]
+        items[3]["URL"] = "not a url"
+        job = self.enqueue_json(items)
+
+        self.worker.drain()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.n_parsed, 5)
+        self.assertEqual(job.n_validated, 5)
+        self.assertEqual(job.n_inserted, 0)
+        self.assertEqual(CompendiumEntry.objects.count(), 0)
+        self.assertFalse(os.path.exists(job.path))
+
+        self.assertIn("2 of the 5 entries in the file are invalid", job.error)
+        self.assertIn("entry 2 (None): title: This field is required.", job.error)
+        self.assertIn("entry 4 ('Entry 3'): url: Enter a valid URL.", job.error)
+
+    def test_likely_duplicates_are_reported(self):
+        self.enqueue_json([self.item(ii) for ii in range(3)])
+        self.worker.drain()
+
+        # Re-uploading an entry that's almost the same as an existing one (but
+        # has a URL, so it isn't an exact match) reports it as a likely
+        # duplicate, but still imports it
+        items = [self.item(ii) for ii in (5, 1, 2, 6)]
+        items[1]["title"] = "entry 1."
+        items[1]["URL"] = "https://example.com/entry-1"
+        job = self.enqueue_json(items)
+        self.worker.drain()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.n_inserted, 3)
+        self.assertEqual(job.n_skipped, 1)
+        self.assertEqual(job.n_duplicates, 1)
+        self.assertEqual([d["entry"] for d in job.duplicates], [2])
+        self.assertEqual(job.duplicates[0]["title"], "entry 1.")
+        self.assertEqual(job.duplicates[0]["duplicate_of"]["title"], "Entry 1")
+        self.assertEqual(job.progress()["duplicates"], 1)
+
+        response = self.client.get(reverse("research dashboard"))
+        self.assertContains(response, "Entry 2 (entry 1.) looks like")
+
+    def test_reimports_are_skipped(self):
+        self.enqueue_json([self.item(ii) for ii in range(3)])
+        self.worker.drain()
+
+        # Uploading the same library again doesn't add any entries, and neither
+        # does repeating an entry within the same file
+        job = self.enqueue_json([self.item(ii) for ii in (0, 1, 2, 3, 3)])
+        self.worker.drain()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.n_inserted, 1)
+        self.assertEqual(job.n_skipped, 4)
+        self.assertEqual(job.n_duplicates, 0)
+        self.assertEqual(job.progress()["skipped"], 4)
+        self.assertEqual(CompendiumEntry.objects.count(), 4)
+
+    def test_missing_upload_fails_the_job(self):
+        job = self.enqueue_json([self.item(0)], filename="missing.json")
+        os.remove(job.path)
+
+        self.worker.drain()
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("missing.json", job.error)
+
+    def test_interrupted_jobs(self):
+        # Jobs left running by a pool that was shut down are failed, and their
+        # uploads are deleted
+        job = self.enqueue_json([self.item(0)])
+        queued = self.enqueue_json([self.item(1)])
+        self.worker.claim()
+
+        self.assertEqual(self.worker.fail_interrupted(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("interrupted", job.error)
+        self.assertFalse(os.path.exists(job.path))
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, ImportJob.QUEUED)
+        self.assertTrue(os.path.exists(queued.path))
+
+    def test_command(self):
+        self.enqueue_json([self.item(0)])
+
+        out = StringIO()
+        call_command("process_import_jobs", "--status", stdout=out)
+        self.assertIn("Queued jobs: 1", out.getvalue())
+
+        out = StringIO()
+        call_command("process_import_jobs", "--once", stdout=out)
+        self.assertIn("Ran 1 import jobs", out.getvalue())
+        self.assertEqual(CompendiumEntry.objects.count(), 1)
+
+    def test_import_status(self):
+        job = self.enqueue_json([self.item(ii) for ii in range(3)])
+        url = reverse("research import status", args=(job.id,))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        progress = response.json()
+        self.assertEqual(progress["status"], ImportJob.QUEUED)
+        self.assertEqual(progress["inserted"], 0)
+        self.assertIsNone(progress["elapsed"])
+
+        self.worker.drain()
+        progress = self.client.get(url).json()
+        self.assertEqual(progress["status"], ImportJob.DONE)
+        self.assertEqual(progress["filename"], "upload.json")
+        self.assertEqual(progress["inserted"], 3)
+        self.assertIn("inserted", progress["throughput"])
+
+        # Users can only see the progress of their own jobs
+        username, email, password = create_random_user(self.rd)
+        User.objects.create_user(username=username, email=email, password=password)
+        self.client.force_login(User.objects.get(username=username))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_dashboard_lists_jobs(self):
+        job = self.enqueue_json([self.item(0)], filename="my_upload.json")
+        response = self.client.get(reverse("research dashboard"))
+        self.assertContains(response, "my_upload.json")
+        self.assertContains(response, reverse("research import status", args=(job.id,)))
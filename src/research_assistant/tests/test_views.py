@@ -3,7 +3,9 @@ import random
 from django.contrib.auth import get_user
 from django.conf import settings
 from django.core import mail
+from django.db import connection
 from django.test import tag
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from utils.test_utils import (
     random_email,
@@ -11,11 +13,13 @@ from utils.test_utils import (
     random_password,
     UnitTest,
 )
+from entries.importers import EntryImporter
 from entries.models import (
     CompendiumEntry,
     CompendiumEntryTag,
     Author,
 )
+from research_assistant.views.research_interface_views import ENTRIES_PER_PAGE
 from unittest import skip
 from users.models import User, SignupToken
 
@@ -594,3 +598,83 @@ class UserProfilePageTestCase(UnitTest):
             self.assertEqual(entry["title"], tags[i])
             self.assertEqual(entry["tags"], tags[i])
             self.assertEqual(entry["url"], "https://www.example.com")
+
+
+class EntryListQueriesTestCase(UnitTest):
+    """
+    Tests for the number of queries made by the pages that list a user's
+    compendium entries
+    """
+
+    def setUp(self):
+        super().setUp(preauth=True)
+        self.n_entries = 0
+
+    def add_entries(self, n):
+        EntryImporter(owner=self.user).import_entries(
+            {
+                "entry": {
+                    "title": f"Entry {ii}",
+                    "url": f"https://www.example.com/{ii}",
+                },
+                "authors": [f"Author {ii}", f"Author {ii + 1}"],
+                "tags": ["rsa", f"tag {ii}"],
+            }
+            for ii in range(self.n_entries, self.n_entries + n)
+        )
+        self.n_entries += n
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_dont_grow_with_entries(self):
+        urls = [
+            reverse(name)
+            for name in ("research dashboard", "list my entries", "research profile")
+        ]
+        self.add_entries(2)
+        expected = [self.count_queries(url) for url in urls]
+
+        # Neither more entries on a page nor more pages of entries take any more
+        # queries
+        for n in (20, 2 * ENTRIES_PER_PAGE):
+            self.add_entries(n)
+            self.assertEqual([self.count_queries(url) for url in urls], expected)
+            self.assertEqual(
+                [self.count_queries(url + "?page=2") for url in urls], expected
+            )
+
+    def test_pagination(self):
+        self.add_entries(ENTRIES_PER_PAGE + 3)
+
+        response = self.client.get(reverse("list my entries"))
+        entries = response.context["entries"]
+        self.assertEqual(len(entries), ENTRIES_PER_PAGE)
+        self.assertEqual(entries[0]["title"], "Entry 0")
+        self.assertEqual(entries[0]["tags"], "rsa, tag 0")
+        self.assertEqual(entries[0]["owner"], self.user)
+
+        response = self.client.get(reverse("research profile") + "?page=2")
+        self.assertEqual(
+            [e["title"] for e in response.context["entries"]],
+            [f"Entry {ii}" for ii in range(ENTRIES_PER_PAGE, ENTRIES_PER_PAGE + 3)],
+        )
+        self.assertEqual(
+            response.context["info"]["number_of_entries"], ENTRIES_PER_PAGE + 3
+        )
+        self.assertContains(response, "Page 2 of 2")
+
+        # Links to the other pages keep the rest of the query parameters
+        response = self.client.get(
+            reverse("list my entries"), {"page": 2, "sort": "title"}
+        )
+        self.assertContains(response, 'href="?page=1&amp;sort=title"')
+        response = self.client.get(reverse("list my entries"), {"sort": "title"})
+        self.assertContains(response, 'href="?sort=title&amp;page=2"')
+
+        # Pages that don't exist show the last page instead
+        response = self.client.get(reverse("research dashboard") + "?page=100")
+        self.assertEqual(len(response.context["entries"]), 3)
@@ -11,6 +11,9 @@ urlpatterns = [
     url(r"^logout", research_logout, name="research logout"),
     url(r"^new-article", NewCompendiumEntryView.as_view(), name="research new article"),
     url(r"^new-tag", research_add_tag, name="research add tag"),
+    path(
+        "imports/<int:job_id>", research_import_status, name="research import status",
+    ),
     path("list-my-entries/", research_list_my_entries, name="list my entries"),
     url(r"edit-entries$", EditCompendiumEntryView.as_view(), name="edit my entries"),
     url(
@@ -3,6 +3,10 @@ from django.shortcuts import render, redirect
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth import authenticate
 from entries.models import CompendiumEntry, CompendiumEntryTag
+from research_assistant.views.research_interface_views import (
+    entry_summaries,
+    paginate_entries,
+)
 from users.forms import PasswordChangeForm
 from users.models import User
 
@@ -51,23 +55,16 @@ def researcher_profile(request):
     """
     Display the user's profile information to them.
     """
-    context = {"info": {}, "entries": []}
-    my_entries = CompendiumEntry.objects.filter(owner=request.user.id)
-    context["info"]["username"] = (
-        User.objects.values("username")
-        .filter(username=request.user)
-        .first()["username"]
-    )
-    context["info"]["email"] = (
-        User.objects.values("email").filter(username=request.user).first()["email"]
-    )
-    context["info"]["number_of_entries"] = my_entries.count()
-    for entry in my_entries:
-        entry_dict = {"id": entry.id, "url": entry.url, "title": entry.title}
-        tags_query_set = entry.tags.all()
-        tags = []
-        for tag in tags_query_set:
-            tags.append(tag.tagname)
-        entry_dict["tags"] = ", ".join(tags)
-        context["entries"].append(entry_dict)
+    my_entries = CompendiumEntry.objects.filter(owner=request.user)
+    page = paginate_entries(request, my_entries.prefetch_related("tags"))
+    context = {
+        "info": {
+            "username": request.user.username,
+            "email": request.user.email,
+            # The paginator already counts the user's entries
+            "number_of_entries": page.paginator.count,
+        },
+        "entries": entry_summaries(page.object_list),
+        "page_obj": page,
+    }
     return render(request, "research_profile.html", context)
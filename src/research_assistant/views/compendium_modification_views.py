@@ -8,6 +8,7 @@ import logging
 
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
 from django.http import HttpResponseForbidden
 from django.shortcuts import render, redirect
 from django.views import View
@@ -15,13 +16,16 @@ from django.views.decorators.http import require_http_methods
 from django.views.generic.base import ContextMixin
 from django.utils.decorators import method_decorator
 from research_assistant.forms import BibTexUploadForm, JsonUploadForm
+from research_assistant.models import ImportJob
 from entries.forms import CompendiumEntryForm, NewTagForm
+from entries.importers import resolve_names
 from entries.models import (
     CompendiumEntry,
     CompendiumEntryTag,
     Publisher,
     Author,
 )
+from typing import Optional
 
 
 @login_required
@@ -85,113 +89,80 @@ class AbstractCompendiumEntryModificationView(
 
         is_valid = new_entry_form.is_valid()
         if is_valid:
-            article = new_entry_form.save()
-
-            if not Publisher.objects.filter(
-                publishername=article.publisher_text
-            ).exists():
-                Publisher.objects.create(publishername=article.publisher_text)
-            publisher = Publisher.objects.filter(
-                publishername=article.publisher_text
-            ).first()
-            article.publisher = publisher
-
-            authors_list = []
-            for author in request.POST.getlist("authors_text"):
-                if not Author.objects.filter(authorname=author).exists():
-                    Author.objects.create(authorname=author)
-                authors_list.append(Author.objects.filter(authorname=author).first())
-            article.authors.set(authors_list)
-
-            article.owner = request.user
-            article.save()
+            self._save_entry(request, new_entry_form, owner=request.user)
 
         return is_valid, new_entry_form
 
-    def _create_entries_from_json(self, request):
+    def _save_entry(self, request, form, owner=None) -> CompendiumEntry:
         """
-        Create one or more new compendium entries via the JSON upload form.
+        Save the entry of a valid CompendiumEntryForm, along with its publisher
+        and its authors (from the request's "authors_text" fields).
+
+        The publisher and authors are looked up (and created, if they don't
+        exist yet) with a fixed number of queries, however many authors the
+        entry has, and the entry itself is only saved once.
         """
+        with transaction.atomic():
+            article = form.save(commit=False)
+            if owner is not None:
+                article.owner = owner
 
-        json_form = JsonUploadForm(request.POST, request.FILES)
-        is_valid = json_form.is_valid()
+            publisher_ids = resolve_names(
+                Publisher, "publishername", [article.publisher_text]
+            )
+            article.publisher_id = publisher_ids.get(article.publisher_text)
+            article.save()
+            form.save_m2m()
 
-        if is_valid:
-            for compendium_form in json_form.cleaned_data:
-                entry = compendium_form.cleaned_data
-                fields = {
-                    "title": entry.get("title"),
-                    "url": entry.get("url"),
-                    "abstract": entry.get("abstract"),
-                    "year": entry.get("year"),
-                    "month": entry.get("month"),
-                    "day": entry.get("day"),
-                }
-                compendium_entry = CompendiumEntry.objects.create(**fields)
-                compendium_entry.owner = request.user
-                compendium_entry.save()
-
-                self.compendium_logger.info(
-                    f"Created new compendium entry (id={compendium_entry.id})"
-                )
+            names = request.POST.getlist("authors_text")
+            author_ids = resolve_names(Author, "authorname", names)
+            article.authors.set([author_ids[name] for name in names if name])
 
-        return is_valid, json_form
+        return article
 
-    def _create_entries_from_bibtex(self, request):
+    def _owned_entry(self, request, entry_id) -> Optional[CompendiumEntry]:
+        """
+        Get the entry with the given id if it's owned by the user making the
+        request (who is the only one allowed to edit it), or None otherwise.
         """
-        Create one or more new compendium entries using BibTeX that was uploaded
-        to the site.
+        if entry_id is None:
+            return None
+        entry = CompendiumEntry.objects.filter(id=entry_id).first()
+        if entry is None or entry.owner_id != request.user.id:
+            return None
+        return entry
+
+    def _queue_import(self, request, form_class):
+        """
+        Queue a file of compendium entries that was uploaded with one of the
+        upload forms to be imported in the background (see
+        research_assistant.imports).
         """
 
-        bibtex_form = BibTexUploadForm(request.POST, request.FILES)
-        is_valid = bibtex_form.is_valid()
+        upload_form = form_class(request.POST, request.FILES, parse=False)
+        is_valid = upload_form.is_valid()
 
         if is_valid:
-            # TODO: bulk insert of authors, tags, and compendium entries
-            for result in bibtex_form.cleaned_data:
-                compendium_form = result["form"]
-                entry = compendium_form.cleaned_data
-
-                # Get the authors of the compendium entry
-                authors = []
-                for name in result.get("authors", []):
-                    author = Author.objects.filter(authorname=name)
-                    if not author.exists():
-                        author = Author.objects.create(authorname=name)
-                    else:
-                        author = author.first()
-                    authors.append(author)
-
-                # Get the tags for the compendium entry
-                tags = []
-                for tagname in result.get("tags", []):
-                    tag = CompendiumEntryTag.objects.filter(tagname=tagname)
-                    if not tag.exists():
-                        tag = CompendiumEntryTag.objects.create(tagname=tagname)
-                    else:
-                        tag = tag.first()
-                    tags.append(tag)
-
-                compendium_entry = CompendiumEntry.objects.create(
-                    owner=request.user, **entry
-                )
-                compendium_entry.authors.set(authors)
-                compendium_entry.tags.set(tags)
-                compendium_entry.save()
-
-                self.compendium_logger.info(
-                    f"Created new compendium entry (id={compendium_entry.id})"
-                )
+            job = ImportJob.objects.enqueue(
+                request.user,
+                upload_form.import_format,
+                upload_form.cleaned_data[upload_form.file_field],
+            )
+            self.compendium_logger.info(
+                f"Queued import job (id={job.id}, file={job.filename})"
+            )
 
-        return is_valid, bibtex_form
+        return is_valid, upload_form
 
 
 class NewCompendiumEntryView(AbstractCompendiumEntryModificationView):
     """
     A view for creating new compendium entries on the site. This view presents
-    two forms to users:
+    three forms to users:
     - A form that allows users to create new compendium entries by hand.
-    - A form for creating compendium entries en masse using BibTeX.
+    - Forms for creating compendium entries en masse by uploading BibTeX or
+      Zotero JSON. Uploaded files are imported in the background, and their
+      progress is displayed on the dashboard.
     """
 
     def get(self, request):
@@ -221,14 +192,14 @@ class NewCompendiumEntryView(AbstractCompendiumEntryModificationView):
 
         if "bibtex-upload" in request.POST:
             # User uploaded BibTeX to the site
-            is_valid, bibtex_form = self._create_entries_from_bibtex(request)
+            is_valid, bibtex_form = self._queue_import(request, BibTexUploadForm)
             context["bibtex_upload_active"] = True
         else:
             bibtex_form = BibTexUploadForm()
 
         if "json-upload" in request.POST:
             # User uploaded JSON to the site
-            is_valid, json_form = self._create_entries_from_json(request)
+            is_valid, json_form = self._queue_import(request, JsonUploadForm)
             context["json_upload_active"] = True
         else:
             json_form = JsonUploadForm()
@@ -248,15 +219,10 @@ class EditCompendiumEntryView(AbstractCompendiumEntryModificationView):
     """
 
     def get(self, request, **kwargs):
-        get_id = kwargs.get("id", None)
-
         # Only authorized users are allowed to edit the entry
-        if get_id and CompendiumEntry.objects.get(id=get_id).owner == request.user:
-            entry = CompendiumEntry.objects.get(id=get_id)
-
-            authors = []
-            for author in entry.authors.all():
-                authors.append(author.authorname)
+        entry = self._owned_entry(request, kwargs.get("id", None))
+        if entry is not None:
+            authors = list(entry.authors.values_list("authorname", flat=True))
 
             form = CompendiumEntryForm(instance=entry)
             return render(
@@ -274,40 +240,15 @@ class EditCompendiumEntryView(AbstractCompendiumEntryModificationView):
             return HttpResponseForbidden()
 
     def post(self, request, **kwargs):
-        get_id = kwargs.get("id", None)
-
         # Only authorized users are allowed to edit the entry
-        if get_id and CompendiumEntry.objects.get(id=get_id).owner == request.user:
-            entry = CompendiumEntry.objects.get(id=get_id)
-
-            authors = []
-            for author in entry.authors.all():
-                authors.append(author.authorname)
+        entry = self._owned_entry(request, kwargs.get("id", None))
+        if entry is not None:
+            authors = list(entry.authors.values_list("authorname", flat=True))
 
             form = CompendiumEntryForm(request.POST, instance=entry)
 
             if form.is_valid():
-                article = form.save()
-
-                if not Publisher.objects.filter(
-                    publishername=article.publisher_text
-                ).exists():
-                    Publisher.objects.create(publishername=article.publisher_text)
-                publisher = Publisher.objects.filter(
-                    publishername=article.publisher_text
-                ).first()
-                article.publisher = publisher
-
-                authors_list = []
-                for author in request.POST.getlist("authors_text"):
-                    if not Author.objects.filter(authorname=author).exists():
-                        Author.objects.create(authorname=author)
-                    authors_list.append(
-                        Author.objects.filter(authorname=author).first()
-                    )
-                article.authors.set(authors_list)
-
-                article.save()
+                self._save_entry(request, form)
                 return redirect("research dashboard")
 
             else:
@@ -5,10 +5,23 @@ lists of entries that they've added, and so on.
 """
 
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.core.paginator import Page, Paginator
+from django.db.models import QuerySet
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.views.decorators.http import require_http_methods
 from entries.forms import EntryDeleteForm
 from entries.models import CompendiumEntry
+from research_assistant.models import ImportJob
+
+from typing import Dict, List
+
+# Number of the user's most recent import jobs to display on the dashboard
+N_DASHBOARD_IMPORT_JOBS = 5
+
+# Number of the user's entries to display per page on the dashboard, the
+# profile page, and the list of entries to edit
+ENTRIES_PER_PAGE = 50
 
 
 @login_required
@@ -18,10 +31,27 @@ def research_dashboard(request):
     View for the user's homepage.
     """
     owned_entries = CompendiumEntry.objects.filter(owner=request.user)
-    context = {"entries": owned_entries}
+    page = paginate_entries(request, owned_entries.prefetch_related("authors", "tags"))
+    import_jobs = ImportJob.objects.filter(owner=request.user).order_by("-id")
+    context = {
+        "entries": page.object_list,
+        "page_obj": page,
+        "import_jobs": import_jobs[:N_DASHBOARD_IMPORT_JOBS],
+    }
     return render(request, "dashboard.html", context=context)
 
 
+@login_required
+@require_http_methods(["GET"])
+def research_import_status(request, job_id):
+    """
+    Report the progress of one of the user's import jobs as JSON, so that the
+    dashboard can poll it while the job runs.
+    """
+    job = get_object_or_404(ImportJob, id=job_id, owner=request.user)
+    return JsonResponse(job.progress())
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def research_list_my_entries(request):
@@ -36,22 +66,48 @@ def research_list_my_entries(request):
         if CompendiumEntry.objects.get(id=entry_id).owner == request.user:
             CompendiumEntry.objects.get(id=entry_id).delete()
 
-    context = {"entries": []}
-    my_entries = CompendiumEntry.objects.filter(owner=request.user.id)
+    my_entries = CompendiumEntry.objects.filter(owner=request.user)
+    page = paginate_entries(request, my_entries.prefetch_related("tags"))
+    context = {
+        "entries": [
+            {**entry_dict, "owner": request.user}
+            for entry_dict in entry_summaries(page.object_list)
+        ],
+        "page_obj": page,
+    }
+
+    return render(request, "list_my_entries.html", context=context)
+
+
+"""
+Helper functions
+"""
+
+
+def paginate_entries(request, entries: QuerySet) -> Page:
+    """
+    Get the page of a queryset of compendium entries requested by the "page"
+    GET parameter (defaulting to the first page), oldest entry first.
+
+    Only the entries on the page are fetched (along with anything prefetched
+    for them), so that the number of queries it takes to display them doesn't
+    grow with the number of entries the user has.
+    """
+    paginator = Paginator(entries.order_by("id"), ENTRIES_PER_PAGE)
+    return paginator.get_page(request.GET.get("page"))
 
-    for entry in my_entries:
-        entry_dict = {
+
+def entry_summaries(entries) -> List[Dict]:
+    """
+    Summarize compendium entries (with their tags prefetched) for the tables of
+    a user's entries, listing their tags in a single string.
+    """
+    return [
+        {
             "id": entry.id,
             "url": entry.url,
             "title": entry.title,
-            "owner": entry.owner,
+            "tags": ", ".join(tag.tagname for tag in entry.tags.all()),
         }
-        tags_query_set = entry.tags.all()
-        tags = []
-
-        for tag in tags_query_set:
-            tags.append(tag.tagname)
-        entry_dict["tags"] = ", ".join(tags)
-        context["entries"].append(entry_dict)
-
-    return render(request, "list_my_entries.html", context=context)
+        for entry in entries
+    ]
@@ -0,0 +1,231 @@
+"""
+Caching for the results of search queries, so that popular queries don't need
+to be sent to Solr every time they're made.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from typing import Dict, Optional
+
+
+class SearchResultCache:
+    """
+    A cache for search results, stored in one of the site's Django caches
+    (memcached in production).
+
+    Rather than deleting cached results when the compendium changes, every key
+    includes a generation number. Invalidating the cache simply increments the
+    generation, after which stale results are never read again and eventually
+    fall out of the cache on their own. This means that we never need to scan
+    or track the keys that we've written.
+
+    Parameters
+    ----------
+    alias : str
+        The name of the Django cache (from settings.CACHES) to store results in.
+
+    timeout : Optional[int]
+        The number of seconds for which results are kept. Defaults to
+        settings.SEARCH_CACHE_TIMEOUT.
+    """
+
+    cache_logger = logging.getLogger("search.cache")
+
+    generation_key = "search:generation"
+    key_prefix = "search:results"
+
+    def __init__(self, alias: str = "default", timeout: Optional[int] = None):
+        self.alias = alias
+        self._timeout = timeout
+        self._generation = ChangeCounter(self.generation_key, alias=alias)
+
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "sets": 0, "invalidations": 0}
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def timeout(self) -> int:
+        if self._timeout is None:
+            return settings.SEARCH_CACHE_TIMEOUT
+        return self._timeout
+
+    """
+    Reading and writing results
+    """
+
+    def get(self, query: dict) -> Optional[dict]:
+        """
+        Retrieve the cached results for a query, or None if the results aren't
+        in the cache.
+        """
+        results = self.cache.get(self.key(query))
+        self._count("hits" if results is not None else "misses")
+        return results
+
+    def set(self, query: dict, results: dict):
+        """
+        Store the results of a query in the cache.
+        """
+        self.cache.set(self.key(query), results, self.timeout)
+        self._count("sets")
+
+    def invalidate(self):
+        """
+        Invalidate all of the results that are currently cached.
+        """
+        self._generation.incr()
+        self._count("invalidations")
+        self.cache_logger.debug("Invalidated cached search results")
+
+    def key(self, query: dict) -> str:
+        """
+        Compute the cache key for a query. Queries that only differ in the
+        order, capitalization, or repetition of their tokens share the same
+        key, since Solr returns the same results for them.
+        """
+        normalized = json.dumps(self.normalize(query), sort_keys=True, default=str)
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{self.generation()}:{digest}"
+
+    def normalize(self, query: dict) -> dict:
+        """
+        Normalize the cleaned data from BasicSearchForm into the parameters
+        that uniquely determine the results of a search.
+        """
+        tokens = list(query.get("quoted_substrings", []))
+        tokens += query.get("words", [])
+        tokens = sorted(set(T.casefold().strip() for T in tokens))
+
+        normalized = {"tokens": tokens, "page": 0, "rows": 20}
+        for (key, value) in query.items():
+            if key in ("quoted_substrings", "words"):
+                continue
+            if isinstance(value, (list, tuple, set)):
+                # Filters (e.g. selected tags) are applied regardless of the
+                # order in which they're given
+                value = sorted(set(value))
+            normalized[key] = value
+
+        return normalized
+
+    def generation(self) -> int:
+        """
+        Get the current generation of cached results.
+        """
+        return self._generation.value()
+
+    """
+    Statistics
+    """
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """
+        Return statistics about the cache. The hit, miss, set and invalidation
+        counters are for the current process, while the eviction count is
+        read from the cache backend (when it's available; otherwise it's
+        returned as None).
+        """
+        with self._lock:
+            stats = dict(self._counters)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups > 0 else None
+        stats["evictions"] = self._backend_evictions()
+        return stats
+
+    """
+    Internal API
+    """
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _backend_evictions(self) -> Optional[int]:
+        # Only memcached (through pylibmc) reports how many items it has
+        # evicted.
+        client = getattr(self.cache, "_cache", None)
+        if not hasattr(client, "get_stats"):
+            return None
+
+        try:
+            return sum(int(s.get("evictions", 0)) for (_, s) in client.get_stats())
+        except Exception as ex:
+            self.cache_logger.warning(f"Unable to read cache stats: {ex!r}")
+            return None
+
+
+class ChangeCounter:
+    """
+    A counter, stored in one of the site's Django caches, that's incremented
+    whenever something changes. Reading the counter is a single cache lookup,
+    which makes it a cheap way to find out whether anything has changed since
+    the last time it was read.
+
+    Parameters
+    ----------
+    key : str
+        The cache key that the counter is stored under.
+
+    alias : str
+        The name of the Django cache (from settings.CACHES) to store the
+        counter in.
+    """
+
+    def __init__(self, key: str, alias: str = "default"):
+        self.key = key
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def value(self) -> int:
+        """
+        Get the current value of the counter.
+        """
+        value = self.cache.get(self.key)
+        if value is None:
+            value = self._restart()
+        return value
+
+    def incr(self):
+        """
+        Increment the counter.
+        """
+        try:
+            self.cache.incr(self.key)
+        except ValueError:
+            # The counter doesn't exist (e.g. because it was evicted), so we
+            # start a new one.
+            self._restart()
+
+    """
+    Internal API
+    """
+
+    def _restart(self) -> int:
+        # Start the counter from the current time, so that a counter that was
+        # evicted from the cache can't restart at an old value that's still in
+        # use somewhere (e.g. in a cache key, or in a client's ETag).
+        value = int(time.time() * 1000)
+        if not self.cache.add(self.key, value, None):
+            value = self.cache.get(self.key, value)
+        return value
+
+
+# Cache shared by every SearchEngine in the process
+search_cache = SearchResultCache()
+
+# Counter that's incremented whenever a compendium entry (or its tags, authors
+# or publisher) changes
+corpus_version = ChangeCounter("corpus:version")
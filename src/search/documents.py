@@ -0,0 +1,104 @@
+"""
+Conversion between compendium entries and the documents stored in Solr.
+
+Documents are created both by the DataImportHandler (see docker/solr/setup.sh)
+and by build_document. The two must produce identical documents, so any change
+to the fields here needs to be mirrored in the DIH queries (and vice versa).
+"""
+
+from django.db.models import QuerySet
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag
+from typing import Iterable
+
+# Fields returned by Solr for search results
+RESULT_FIELDS = (
+    "id",
+    "title",
+    "abstract",
+    "slug",
+    "url",
+    "year",
+    "month",
+    "day",
+    "publisher",
+    "tags",
+    "authors",
+)
+
+
+def index_queryset(queryset: QuerySet = None) -> QuerySet:
+    """
+    Add the related objects needed by build_document to a queryset of
+    compendium entries, so that building their documents doesn't require any
+    further database queries.
+    """
+    if queryset is None:
+        queryset = CompendiumEntry.objects.all()
+    return queryset.select_related("publisher").prefetch_related("tags", "authors")
+
+
+def build_document(entry: CompendiumEntry) -> dict:
+    """
+    Construct the Solr document for a compendium entry.
+    """
+    # Equivalent to coalesce(publisher.publishername, publisher_text)
+    publisher = None
+    if entry.publisher_id is not None:
+        publisher = entry.publisher.publishername
+    if publisher is None:
+        publisher = entry.publisher_text
+
+    doc = {
+        "id": str(entry.pk),
+        "title": entry.title,
+        "abstract": entry.abstract,
+        "slug": entry.slug,
+        "url": entry.url,
+        "year": entry.year,
+        "month": entry.month,
+        "day": entry.day,
+        "publisher": publisher or None,
+        # Tags and authors are sorted by codepoint, which is the same order
+        # that the DIH query sorts them in (using the "C" collation).
+        "tags": sorted(tag.tagname for tag in entry.tags.all()) or None,
+        "authors": sorted(author.authorname for author in entry.authors.all()) or None,
+    }
+
+    # The DataImportHandler leaves NULL columns out of the document
+    return {field: value for (field, value) in doc.items() if value is not None}
+
+
+def entry_from_document(doc: dict) -> CompendiumEntry:
+    """
+    Construct an (unsaved) CompendiumEntry from a document returned by Solr,
+    e.g. to display it in a list of search results. The entry's tags and
+    authors are populated from the document, so displaying them doesn't
+    require any database queries.
+    """
+    entry = CompendiumEntry(
+        id=int(doc["id"]),
+        title=doc.get("title"),
+        abstract=doc.get("abstract"),
+        slug=doc.get("slug"),
+        url=doc.get("url"),
+        year=doc.get("year"),
+        month=doc.get("month"),
+        day=doc.get("day"),
+        publisher_text=doc.get("publisher"),
+    )
+
+    tags = [CompendiumEntryTag(tagname=name) for name in doc.get("tags", [])]
+    authors = [Author(authorname=name) for name in doc.get("authors", [])]
+    entry._prefetched_objects_cache = {
+        "tags": _prefetched(CompendiumEntryTag.objects.all(), tags),
+        "authors": _prefetched(Author.objects.all(), authors),
+    }
+    return entry
+
+
+def _prefetched(queryset: QuerySet, objects: Iterable) -> QuerySet:
+    # Mark a queryset as having already been evaluated, the same way that
+    # prefetch_related does, so that it never hits the database.
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    return queryset
@@ -0,0 +1,272 @@
+"""
+Bulk export of compendium entries.
+
+Entries can be exported in flat formats (JSON, NDJSON, CSV and BibTeX)
+containing only a selection of their fields. Unlike the Django serializer,
+the fields are projected in the database with values_list(), so only the
+selected columns are ever read, and rows are written out one at a time as
+they're read.
+"""
+
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import Serializer as PythonSerializer
+from django.db.models import QuerySet
+from django.db.models.functions import Coalesce
+from typing import Dict, Iterable, Iterator, List, Optional
+from utils.dates import month_name
+
+# Columns that can be exported, along with the expressions used to select
+# them. The publisher is the same as in the documents sent to Solr (see
+# search.documents.build_document).
+EXPORT_COLUMNS = {
+    "id": "id",
+    "title": "title",
+    "slug": "slug",
+    "abstract": "abstract",
+    "url": "url",
+    "year": "year",
+    "month": "month",
+    "day": "day",
+    "publisher": Coalesce("publisher__publishername", "publisher_text"),
+    "date_added": "date_added",
+    "last_modified": "last_modified",
+}
+
+# Many-to-many fields that can be exported, along with the lookup of the values
+# that are exported for them. These are exported as lists of values.
+EXPORT_RELATIONS = {
+    "tags": "tags__tagname",
+    "authors": "authors__authorname",
+}
+
+EXPORT_FIELDS = (*EXPORT_COLUMNS, *EXPORT_RELATIONS)
+
+# Separator between the values of many-to-many fields in CSV exports
+CSV_VALUE_SEPARATOR = "|"
+
+# Fields included in BibTeX exports
+BIBTEX_FIELDS = [
+    "id",
+    "title",
+    "authors",
+    "year",
+    "month",
+    "publisher",
+    "url",
+    "tags",
+    "abstract",
+]
+
+
+def export_rows(
+    queryset: QuerySet, fields: Iterable[str], chunk_size: int = 1000
+) -> Iterator[Dict]:
+    """
+    Read the selected fields of every entry in a QuerySet, returning a
+    dictionary for each entry (in order of primary key).
+
+    The QuerySet is read in chunks of `chunk_size` entries. Every chunk takes
+    one query, plus one query for each selected many-to-many field.
+    """
+    fields = list(fields)
+    columns = [f for f in fields if f in EXPORT_COLUMNS]
+    relations = [f for f in fields if f in EXPORT_RELATIONS]
+
+    # The primary key is always selected, since it's used to find the next
+    # chunk of entries (which stays fast no matter how deep into the table
+    # the chunk is, unlike an offset).
+    rows = queryset.order_by("pk").values_list(
+        "pk", *(EXPORT_COLUMNS[f] for f in columns)
+    )
+
+    last_pk = None
+    while True:
+        chunk = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if len(chunk) == 0:
+            return
+
+        pks = [row[0] for row in chunk]
+        related = {
+            name: _related_values(queryset.model, pks, EXPORT_RELATIONS[name])
+            for name in relations
+        }
+
+        for (pk, *values) in chunk:
+            row = dict(zip(columns, values))
+            for name in relations:
+                row[name] = related[name].get(pk, [])
+            yield {f: row[f] for f in fields}
+
+        last_pk = pks[-1]
+
+
+def validate_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated list of fields to export. Returns all of the
+    exportable fields if `fields` is empty. Raises a ValueError if any of the
+    fields can't be exported.
+    """
+    if not fields:
+        return list(EXPORT_FIELDS)
+
+    fields = [f.strip() for f in fields.split(",") if f.strip() != ""]
+    unknown = [f for f in fields if f not in EXPORT_FIELDS]
+    if len(unknown) > 0:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)} "
+            f"(available fields: {', '.join(EXPORT_FIELDS)})"
+        )
+
+    # Remove duplicates while preserving the order of the fields
+    return list(dict.fromkeys(fields))
+
+
+def serialize_json(queryset: QuerySet, chunk_size: int = 500) -> Iterator[str]:
+    """
+    Serialize a QuerySet to JSON in chunks of `chunk_size` objects. The
+    output is the same as that of serializers.serialize("json", queryset)
+    (with the objects ordered by primary key), but only one chunk of the
+    QuerySet is held in memory at a time.
+    """
+    # Unlike QuerySet.iterator(), reading the QuerySet in chunks lets us
+    # prefetch the many-to-many fields of each chunk (which the serializer
+    # would otherwise query for every object).
+    m2m_fields = [field.name for field in queryset.model._meta.many_to_many]
+    queryset = queryset.order_by("pk").prefetch_related(*m2m_fields)
+
+    yield "["
+    separator = ""
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if len(chunk) == 0:
+            break
+
+        objects = _PrefetchedSerializer().serialize(chunk)
+        yield separator + ", ".join(
+            json.dumps(obj, cls=DjangoJSONEncoder) for obj in objects
+        )
+        separator = ", "
+        last_pk = chunk[-1].pk
+    yield "]"
+
+
+"""
+Output formats
+"""
+
+
+def to_json(rows: Iterable[Dict]) -> Iterator[str]:
+    """
+    Write rows as a JSON array of objects.
+    """
+    yield "["
+    separator = ""
+    for row in rows:
+        yield separator + json.dumps(row, cls=DjangoJSONEncoder)
+        separator = ", "
+    yield "]"
+
+
+def to_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    """
+    Write rows as newline-delimited JSON (one object per line).
+    """
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder) + "\n"
+
+
+def to_csv(rows: Iterable[Dict], fields: List[str]) -> Iterator[str]:
+    """
+    Write rows as CSV, with a header row containing the names of the fields.
+    Many-to-many fields are written as a single column, with their values
+    separated by CSV_VALUE_SEPARATOR.
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[f]) for f in fields])
+
+
+def to_bibtex(rows: Iterable[Dict]) -> Iterator[str]:
+    """
+    Write rows (containing the BIBTEX_FIELDS) as BibTeX entries, in the same
+    format that's read when BibTeX is uploaded to the site.
+    """
+    for row in rows:
+        fields = [
+            ("title", "{" + _bibtex_value(row["title"]) + "}"),
+            (
+                "author",
+                " and ".join("{" + _bibtex_value(a) + "}" for a in row["authors"]),
+            ),
+            ("year", row["year"]),
+            ("month", month_name(row["month"]) if row["month"] else None),
+            ("publisher", _bibtex_value(row["publisher"])),
+            ("url", row["url"]),
+            ("keywords", ", ".join(_bibtex_value(t) for t in row["tags"])),
+            ("abstract", _bibtex_value(row["abstract"])),
+        ]
+        lines = [f"@misc{{compendium{row['id']},"]
+        lines += [f"  {key} = {{{value}}}," for (key, value) in fields if value]
+        lines.append("}\n\n")
+        yield "\n".join(lines)
+
+
+"""
+Helper functions
+"""
+
+
+class _PrefetchedSerializer(PythonSerializer):
+    # Django's serializer reads many-to-many fields with .iterator(), which
+    # ignores prefetch_related and makes a query per object. Reading them
+    # with .all() uses the prefetched objects instead.
+    def handle_m2m_field(self, obj, field):
+        if field.remote_field.through._meta.auto_created:
+            self._current[field.name] = [
+                self._value_from_field(related, related._meta.pk)
+                for related in getattr(obj, field.name).all()
+            ]
+
+
+def _related_values(model, pks: List[int], lookup: str) -> Dict[int, List[str]]:
+    # Find the values of a many-to-many field for a chunk of entries with a
+    # single query. Values are sorted by codepoint, as in the documents sent
+    # to Solr.
+    values = {}
+    pairs = model.objects.filter(pk__in=pks, **{f"{lookup}__isnull": False})
+    for (pk, value) in pairs.values_list("pk", lookup):
+        values.setdefault(pk, []).append(value)
+    return {pk: sorted(v) for (pk, v) in values.items()}
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, list):
+        return CSV_VALUE_SEPARATOR.join(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+class _Echo:
+    # File-like object that returns what's written to it, so that csv.writer
+    # can be used to write one row at a time to a streaming response.
+    def write(self, value):
+        return value
+
+
+def _bibtex_value(value: Optional[str]) -> Optional[str]:
+    # Braces delimit values in BibTeX, so unbalanced braces would break the
+    # file. The site doesn't use them for anything, so we simply drop them.
+    if value is None:
+        return None
+    return value.replace("{", "").replace("}", "")
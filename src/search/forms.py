@@ -5,45 +5,56 @@ to perform search.
 
 import re
 from django import forms
-from typing import List, Tuple
-from utils.widgets import SearchInput
+from django.conf import settings
+from search.solr import decode_cursor
+from typing import List, Optional, Tuple
+from utils.widgets import SearchInput, SeparatedValuesInput
 
 
-class BasicSearchForm(forms.Form):
+class MultipleValueField(forms.Field):
     """
-    Form for performing basic search queries. The form will validate
-    its input and split it into tokens that can be used when querying
-    Solr.
+    A field that accepts any number of (string) values for the same parameter,
+    e.g. ?tags=a&tags=b. Used for the facets that search results are refined
+    by.
+
+    If a separator is given, each value is also split on the separator, so
+    that multiple values can be entered in a single text input.
     """
 
-    query = forms.CharField(
-        widget=SearchInput(
-            attrs={
-                "class": "searchbar uk-input uk-form-large",
-                "type": "search",
-                "placeholder": "Search...",
-            }
-        ),
-        required=False,
-    )
+    widget = forms.MultipleHiddenInput
 
-    rows = forms.IntegerField(initial=20, widget=forms.HiddenInput(), required=False,)
+    def __init__(self, *args, separator: Optional[str] = None, **kwargs):
+        self.separator = separator
+        if separator is not None:
+            kwargs.setdefault("widget", SeparatedValuesInput(separator=separator))
+        kwargs.setdefault("required", False)
+        super().__init__(*args, **kwargs)
 
-    page = forms.IntegerField(initial=0, widget=forms.HiddenInput(), required=False,)
+    def to_python(self, value) -> List[str]:
+        if value in self.empty_values:
+            return []
+        if isinstance(value, str):
+            value = [value]
+        if self.separator is not None:
+            value = [v for item in value for v in str(item).split(self.separator)]
+        values = (str(v).strip() for v in value)
+        return [v for v in values if v != ""]
 
-    def clean_query(self):
+
+class QueryTokenizerMixin:
+    """
+    Mixin for forms that split a search string into the quoted substrings and
+    words that we query Solr for.
+    """
+
+    def tokenize(self, query: Optional[str]) -> dict:
         """
-        Validate the query string and break it into multiple pieces before
-        sending it off to Solr.
+        Break a query string into multiple pieces before sending it off to
+        Solr.
         """
-        query = self.cleaned_data.get("query", None)
-
         if query is None:
-            return []
+            return {"quoted_substrings": [], "words": []}
 
-        # Otherwise, we break the query into pieces and then construct
-        # a query out of all of those pieces.
-        #
         # Start by removing any characters from the substring that we
         # will be ignoring anyways
         query = self._strip_unused_characters(query)
@@ -57,26 +68,6 @@ class BasicSearchForm(forms.Form):
             "words": words,
         }
 
-    def clean_rows(self):
-        rows = self.cleaned_data.get("rows")
-        if rows is None:
-            return 20
-        else:
-            return rows
-
-    def clean_page(self):
-        page = self.cleaned_data.get("page")
-        if page is None:
-            return 0
-        else:
-            return page
-
-    def clean(self):
-        cleaned_data = super().clean()
-        query_params = cleaned_data.pop("query", {})
-        cleaned_data.update(query_params)
-        return cleaned_data
-
     """
     Internal API
     """
@@ -123,16 +114,162 @@ class BasicSearchForm(forms.Form):
         return words, remainder
 
 
-class AdvancedSearchForm(forms.Form):
+class PaginationMixin:
+    """
+    Mixin for forms with `rows` and `page` fields for paging through search
+    results.
+    """
+
+    default_rows = 20
+
+    def clean_rows(self):
+        """
+        Validate the number of results per page, which is capped at
+        settings.SEARCH_MAX_ROWS.
+        """
+        rows = self.cleaned_data.get("rows")
+        if rows is None:
+            return self.default_rows
+        if rows < 1:
+            raise forms.ValidationError("rows must be a positive integer")
+        return min(rows, settings.SEARCH_MAX_ROWS)
+
+    def clean_page(self):
+        page = self.cleaned_data.get("page")
+        if page is None:
+            return 0
+        if page < 0:
+            raise forms.ValidationError("page must be a non-negative integer")
+        return page
+
+
+class BasicSearchForm(PaginationMixin, QueryTokenizerMixin, forms.Form):
+    """
+    Form for performing basic search queries. The form will validate
+    its input and split it into tokens that can be used when querying
+    Solr.
+
+    Search results can also be refined by the facets returned by Solr (tags,
+    publisher, and year of publication), which are sent to Solr as filter
+    queries.
+    """
+
+    query = forms.CharField(
+        widget=SearchInput(
+            attrs={
+                "class": "searchbar uk-input uk-form-large",
+                "type": "search",
+                "placeholder": "Search...",
+            }
+        ),
+        required=False,
+    )
+
+    rows = forms.IntegerField(initial=20, widget=forms.HiddenInput(), required=False,)
+
+    page = forms.IntegerField(initial=0, widget=forms.HiddenInput(), required=False,)
+
+    # Cursor for paging through results with Solr's cursorMark (see
+    # SearchEngine._basic_search_params). Used by the API instead of `page`.
+    cursor = forms.CharField(widget=forms.HiddenInput(), required=False)
+
+    # Facets selected to refine the search results
+    tags = MultipleValueField()
+    publisher = MultipleValueField()
+    year = MultipleValueField()
+
+    def clean_query(self):
+        """
+        Validate the query string and break it into multiple pieces before
+        sending it off to Solr.
+        """
+        return self.tokenize(self.cleaned_data.get("query", None))
+
+    def clean_cursor(self):
+        """
+        Convert the cursor given by an API client back into a cursorMark for
+        Solr. Searches without a cursor are paged by offset instead.
+        """
+        cursor = self.cleaned_data.get("cursor")
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise forms.ValidationError("Invalid cursor")
+
+    def clean_year(self):
+        """
+        Validate the selected year ranges, which are identified by the first
+        year in the range.
+        """
+        years = self.cleaned_data.get("year", [])
+        if not all(year.isdigit() for year in years):
+            raise forms.ValidationError("Years must be integers")
+        return [int(year) for year in years]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        query_params = cleaned_data.pop("query", {})
+        cleaned_data.update(query_params)
+        return cleaned_data
+
+
+class AdvancedSearchForm(PaginationMixin, QueryTokenizerMixin, forms.Form):
     """
     Form for performing advanced search.
+
+    Only the search string is matched against the text of the entries; every
+    other field is a filter on the results, which the search engine sends to
+    Solr as a separate filter query (see SearchEngine.filter_queries).
     """
 
-    search_string = forms.CharField()
+    search_string = forms.CharField(
+        widget=SearchInput(attrs={"class": "uk-input", "type": "search"}),
+        required=False,
+    )
+
+    authors = MultipleValueField(
+        separator=";", help_text="Separate multiple authors with semicolons."
+    )
+    published_by = forms.CharField(
+        widget=forms.TextInput(attrs={"class": "uk-input"}), required=False,
+    )
+    published_after = forms.DateField(
+        widget=forms.DateInput(attrs={"class": "uk-input", "type": "date"}),
+        required=False,
+    )
+    published_before = forms.DateField(
+        widget=forms.DateInput(attrs={"class": "uk-input", "type": "date"}),
+        required=False,
+    )
+
+    tags = MultipleValueField(
+        separator=",", help_text="Separate multiple tags with commas."
+    )
+
+    rows = forms.IntegerField(initial=20, widget=forms.HiddenInput(), required=False,)
+
+    page = forms.IntegerField(initial=0, widget=forms.HiddenInput(), required=False,)
 
-    authors = forms.MultipleChoiceField()
-    published_by = forms.ChoiceField()
-    published_before = forms.DateField()
-    published_after = forms.DateField()
+    def clean_search_string(self):
+        return self.tokenize(self.cleaned_data.get("search_string", None))
 
-    tags = forms.MultipleChoiceField()
+    def clean(self):
+        cleaned_data = super().clean()
+        query_params = cleaned_data.pop("search_string", {})
+        cleaned_data.update(query_params)
+
+        # Publishers are filtered the same way as the publisher facet
+        publisher = cleaned_data.pop("published_by", "")
+        cleaned_data["publisher"] = [publisher.strip()] if publisher.strip() else []
+
+        after = cleaned_data.get("published_after")
+        before = cleaned_data.get("published_before")
+        if after is not None and before is not None and after > before:
+            raise forms.ValidationError(
+                "The 'published after' date must come before the "
+                "'published before' date"
+            )
+
+        return cleaned_data
@@ -0,0 +1,308 @@
+"""
+Code for pushing changes to compendium entries into the Solr index.
+"""
+
+import logging
+
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from entries.models import CompendiumEntry
+from search.cache import search_cache
+from search.documents import build_document, index_queryset
+from search.models import IndexUpdate
+from search.solr import SolrConnectionPool, get_connection_pool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SolrIndexer:
+    """
+    Sends documents for compendium entries to Solr's update handler.
+
+    Parameters
+    ----------
+    solr_url : Optional[str]
+        The URL of the Solr core to update. Defaults to settings.SOLR_URL.
+
+    pool : Optional[SolrConnectionPool]
+        The pool of connections to use to send updates to Solr. Defaults to
+        the connection pool shared by the rest of the process.
+
+    commit_within : Optional[int]
+        The maximum number of milliseconds that Solr may wait before making
+        updates visible to searches. Defaults to settings.SOLR_COMMIT_WITHIN.
+
+    batch_size : Optional[int]
+        The maximum number of documents to send to Solr in a single request.
+        Defaults to settings.SEARCH_INDEX_BATCH_SIZE.
+    """
+
+    indexer_logger = logging.getLogger("search.indexing")
+
+    def __init__(
+        self,
+        solr_url: Optional[str] = None,
+        pool: Optional[SolrConnectionPool] = None,
+        commit_within: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self._solr_url = solr_url
+        self._pool = pool
+        self._commit_within = commit_within
+        self._batch_size = batch_size
+
+    @property
+    def solr_url(self) -> str:
+        return settings.SOLR_URL if self._solr_url is None else self._solr_url
+
+    @property
+    def pool(self) -> SolrConnectionPool:
+        if self._pool is None:
+            self._pool = get_connection_pool()
+        return self._pool
+
+    @property
+    def commit_within(self) -> int:
+        if self._commit_within is None:
+            return settings.SOLR_COMMIT_WITHIN
+        return self._commit_within
+
+    @property
+    def batch_size(self) -> int:
+        if self._batch_size is None:
+            return settings.SEARCH_INDEX_BATCH_SIZE
+        return self._batch_size
+
+    def add(self, entries: Iterable[CompendiumEntry]):
+        """
+        Add (or replace) the documents for a collection of entries in the index.
+        """
+        batch = []
+        for entry in entries:
+            batch.append(build_document(entry))
+            if len(batch) >= self.batch_size:
+                self._update(batch)
+                batch = []
+        if len(batch) > 0:
+            self._update(batch)
+
+    def delete(self, entry_ids: Iterable[int]):
+        """
+        Remove the documents for a collection of entries from the index.
+        """
+        entry_ids = [str(pk) for pk in entry_ids]
+        for start in range(0, len(entry_ids), self.batch_size):
+            self._update({"delete": entry_ids[start : start + self.batch_size]})
+
+    def commit(self):
+        """
+        Make all of the changes sent to Solr so far visible to searches.
+        """
+        params = {"softCommit": "true"}
+        req = self.pool.post(f"{self.solr_url}/update", params=params)
+        req.raise_for_status()
+
+    """
+    Internal API
+    """
+
+    def _update(self, payload):
+        params = {"commitWithin": self.commit_within}
+        req = self.pool.post(f"{self.solr_url}/update", json=payload, params=params)
+        req.raise_for_status()
+
+        n_docs = len(payload) if isinstance(payload, list) else len(payload["delete"])
+        self.indexer_logger.debug(
+            f"Sent {n_docs} documents to Solr (status={req.status_code})"
+        )
+
+
+class OutboxWorker:
+    """
+    Sends the changes recorded in the search index outbox (see
+    search.models.IndexUpdate) to Solr.
+
+    Parameters
+    ----------
+    indexer : Optional[SolrIndexer]
+        The indexer used to send updates to Solr.
+
+    batch_size : Optional[int]
+        The maximum number of outbox rows to process at once. Defaults to
+        settings.SEARCH_INDEX_BATCH_SIZE.
+
+    max_backoff : Optional[float]
+        The maximum number of seconds to wait before retrying an update that
+        couldn't be sent to Solr. Defaults to settings.SEARCH_OUTBOX_MAX_BACKOFF.
+    """
+
+    worker_logger = logging.getLogger("search.indexing")
+
+    # Number of seconds to wait before retrying an update for the first time.
+    # The wait doubles after every subsequent failure, up to max_backoff.
+    backoff_base = 1
+
+    # Number of seconds for which the rows claimed by a worker are hidden from
+    # other workers while it sends them to Solr
+    claim_timeout = 120
+
+    def __init__(
+        self,
+        indexer: Optional[SolrIndexer] = None,
+        batch_size: Optional[int] = None,
+        max_backoff: Optional[float] = None,
+    ):
+        self.indexer = SolrIndexer() if indexer is None else indexer
+        self._batch_size = batch_size
+        self._max_backoff = max_backoff
+
+        # The amount of time that the oldest change in the most recent batch
+        # spent waiting in the outbox.
+        self.last_lag: Optional[timedelta] = None
+
+    @property
+    def batch_size(self) -> int:
+        if self._batch_size is None:
+            return settings.SEARCH_INDEX_BATCH_SIZE
+        return self._batch_size
+
+    @property
+    def max_backoff(self) -> float:
+        if self._max_backoff is None:
+            return settings.SEARCH_OUTBOX_MAX_BACKOFF
+        return self._max_backoff
+
+    def process_batch(self) -> int:
+        """
+        Send a batch of pending changes to Solr. Returns the number of outbox
+        rows that were processed.
+
+        The rows are claimed in a short transaction of their own, so that no
+        transaction (or row lock) is held open while we wait on Solr. Changes
+        become visible to searches within the indexer's commit_within.
+        """
+        rows = self._claim()
+        if len(rows) == 0:
+            return 0
+
+        # Only the most recent change to each entry matters
+        actions = {row.entry_id: row.action for row in rows}
+
+        try:
+            n_updated, n_deleted = self._push(actions)
+        except Exception as ex:
+            self._back_off(rows, ex)
+            return 0
+
+        # Mark the batch as processed, along with any older changes to the
+        # same entries that were superseded by it.
+        now = timezone.now()
+        n_processed = (
+            IndexUpdate.objects.pending()
+            .filter(entry_id__in=actions.keys(), id__lte=rows[-1].id)
+            .update(processed=now)
+        )
+
+        # Cached search results may be out-of-date now that the index has
+        # changed
+        search_cache.invalidate()
+
+        self.last_lag = now - rows[0].created
+        self.worker_logger.info(
+            f"Indexed {n_updated} entries and removed {n_deleted} entries "
+            f"(outbox rows={n_processed} lag={self.last_lag.total_seconds():.2f}s)"
+        )
+        return n_processed
+
+    def drain(self) -> int:
+        """
+        Process batches until there are no changes left to send to Solr.
+        Returns the total number of outbox rows that were processed.
+        """
+        total = 0
+        while True:
+            n_processed = self.process_batch()
+            if n_processed == 0:
+                return total
+            total += n_processed
+
+    def prune(self, older_than: timedelta) -> int:
+        """
+        Delete changes that were sent to Solr more than `older_than` ago.
+        Returns the number of outbox rows that were deleted.
+
+        The latest deletion of each entry is kept, however old it is: it's the
+        tombstone that Solr's delta-import (see docker/solr/setup.sh) finds
+        deleted entries by, so pruning it would leave the entry in the index
+        if delta-imports stopped for longer than `older_than`.
+        """
+        cutoff = timezone.now() - older_than
+        tombstones = (
+            IndexUpdate.objects.filter(action=IndexUpdate.DELETE)
+            .values("entry_id")
+            .annotate(last_id=Max("id"))
+            .values("last_id")
+        )
+        n_deleted, _ = (
+            IndexUpdate.objects.filter(processed__lt=cutoff)
+            .exclude(id__in=tombstones)
+            .delete()
+        )
+        return n_deleted
+
+    """
+    Internal API
+    """
+
+    def _claim(self) -> List[IndexUpdate]:
+        # Lock the next batch of rows just long enough to push back their
+        # next attempt, so that other workers skip them while we send them to
+        # Solr. If this worker dies before it's done, the rows become due
+        # again once the claim expires.
+        with transaction.atomic():
+            rows = list(
+                IndexUpdate.objects.due()
+                .select_for_update(skip_locked=True)
+                .order_by("id")[: self.batch_size]
+            )
+            if len(rows) > 0:
+                IndexUpdate.objects.filter(id__in=[row.id for row in rows]).update(
+                    next_attempt=timezone.now() + timedelta(seconds=self.claim_timeout)
+                )
+        return rows
+
+    def _push(self, actions: Dict[int, str]) -> Tuple[int, int]:
+        updates = [
+            pk for (pk, action) in actions.items() if action == IndexUpdate.UPDATE
+        ]
+        deletes = [
+            pk for (pk, action) in actions.items() if action == IndexUpdate.DELETE
+        ]
+
+        # Entries that were deleted after they were updated should be removed
+        # from the index instead.
+        entries = list(index_queryset().filter(pk__in=updates))
+        found = set(entry.pk for entry in entries)
+        deletes += [pk for pk in updates if pk not in found]
+
+        self.indexer.add(entries)
+        self.indexer.delete(deletes)
+        return len(entries), len(deletes)
+
+    def _back_off(self, rows: List[IndexUpdate], ex: Exception):
+        now = timezone.now()
+        for row in rows:
+            delay = min(self.max_backoff, self.backoff_base * 2 ** row.attempts)
+            row.attempts += 1
+            row.next_attempt = now + timedelta(seconds=delay)
+            row.last_error = repr(ex)
+        IndexUpdate.objects.bulk_update(
+            rows, ["attempts", "next_attempt", "last_error"]
+        )
+
+        self.worker_logger.warning(
+            f"Unable to send {len(rows)} changes to Solr; retrying in up to "
+            f"{delay:.0f}s: {ex!r}"
+        )
@@ -0,0 +1,321 @@
+"""
+Benchmark the queries that SearchEngine sends to Solr against a synthetic
+corpus.
+"""
+
+import datetime
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+from entries.corpus import CorpusGenerator
+from entries.importers import batches
+from search.solr import SearchEngine
+from typing import Dict, List, Tuple
+
+
+class Command(BaseCommand):
+    help = (
+        "Index a synthetic corpus into Solr and compare the QTime of the "
+        "n-gram substring queries used by basic search against the "
+        "equivalent leading-wildcard queries, and/or measure how well Solr's "
+        "filterCache is reused by repeated combinations of search filters."
+    )
+
+    # Prefix for the ids of the documents indexed by the benchmark, so that
+    # they can be removed again afterwards.
+    id_prefix = "bench-"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entries",
+            type=int,
+            default=100_000,
+            help=(
+                "Number of synthetic entries to index (default: 100000). The "
+                "corpus is the same as the one that generate_corpus creates "
+                "with the same number of entries and seed."
+            ),
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=200,
+            help="Number of queries to time for each query form (default: 200).",
+        )
+        parser.add_argument(
+            "--benchmark",
+            choices=("ngram", "filters", "all"),
+            default="all",
+            help="Which benchmark to run (default: all).",
+        )
+        parser.add_argument(
+            "--filter-combinations",
+            type=int,
+            default=25,
+            help=(
+                "Number of distinct filter combinations that the filter "
+                "benchmark's queries are drawn from (default: 25)."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5_000,
+            help="Number of documents to send to Solr per request (default: 5000).",
+        )
+        parser.add_argument(
+            "--seed", type=int, default=0, help="Seed for the random number generator."
+        )
+        parser.add_argument(
+            "--skip-indexing",
+            action="store_true",
+            help="Reuse a synthetic corpus indexed by a previous run with --keep.",
+        )
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Don't remove the synthetic corpus from Solr when finished.",
+        )
+
+    def handle(self, *args, **options):
+        self.engine = SearchEngine()
+        self.corpus = CorpusGenerator(options["entries"], seed=options["seed"])
+        self.random = self.corpus.random
+        self.zipf_choices = self.corpus.zipf_choices
+        self.vocabulary = self.corpus.vocabulary
+        self.tags = self.corpus.tags
+        self.authors = self.corpus.authors
+        self.publishers = self.corpus.publishers
+
+        try:
+            if not options["skip_indexing"]:
+                self.index_corpus(options["entries"], options["batch_size"])
+            if options["benchmark"] in ("ngram", "all"):
+                self.compare_queries(options["queries"])
+            if options["benchmark"] in ("filters", "all"):
+                self.compare_filters(options["queries"], options["filter_combinations"])
+        finally:
+            if not options["keep"]:
+                self.remove_corpus()
+
+    """
+    Synthetic corpus
+    """
+
+    def index_corpus(self, n_entries: int, batch_size: int):
+        self.stdout.write(f"Indexing {n_entries} synthetic entries...")
+
+        n_indexed = 0
+        for batch in batches(self.corpus.records(), batch_size):
+            docs = []
+            for record in batch:
+                entry = record["entry"]
+                doc = {
+                    "id": f"{self.id_prefix}{n_indexed}",
+                    "slug": f"{self.id_prefix}{n_indexed}",
+                    "title": entry["title"],
+                    "abstract": entry["abstract"],
+                    "year": entry["year"],
+                    "tags": sorted(record["tags"]),
+                    "authors": sorted(record["authors"]),
+                    "publisher": entry["publisher_text"],
+                }
+                docs.append({k: v for (k, v) in doc.items() if v is not None})
+                n_indexed += 1
+            self.update(json=docs)
+            self.stdout.write(f"  {n_indexed} / {n_entries}")
+
+        self.update(params={"commit": "true"})
+
+    def remove_corpus(self):
+        self.stdout.write("Removing synthetic entries from Solr...")
+        self.update(
+            json={"delete": {"query": f"id:{self.id_prefix}*"}},
+            params={"commit": "true"},
+        )
+
+    """
+    Timing queries
+    """
+
+    def compare_queries(self, n_queries: int):
+        # Search for random substrings of words in the vocabulary. Every
+        # token is only used once per query form so that we don't simply
+        # measure Solr's queryResultCache.
+        min_size = self.engine.ngram_min_size
+        candidates = [w for w in self.vocabulary if len(w) >= min_size]
+        tokens = set()
+        while len(tokens) < n_queries:
+            word = self.random.choice(candidates)
+            length = self.random.randint(min_size, min(len(word), 8))
+            start = self.random.randint(0, len(word) - length)
+            tokens.add(word[start : start + length])
+        tokens = sorted(tokens)
+        self.random.shuffle(tokens)
+
+        forms = {
+            "wildcard": self.engine.wildcard_query,
+            "n-gram": self.engine.substring_query,
+        }
+        qtimes = {name: [] for name in forms}
+        mismatches = 0
+
+        # Warm up the searcher before taking any measurements
+        for build_query in forms.values():
+            self.select(build_query(tokens[0]))
+
+        for ii, token in enumerate(tokens):
+            # Alternate the order in which the two forms are run, so that
+            # neither one systematically benefits from the other warming
+            # Solr's caches.
+            names = list(forms) if ii % 2 == 0 else list(reversed(forms))
+            found = {}
+            for name in names:
+                results = self.select(forms[name](token))
+                qtimes[name].append(results["responseHeader"]["QTime"])
+                found[name] = results["response"]["numFound"]
+            if len(set(found.values())) > 1:
+                mismatches += 1
+
+        self.stdout.write(f"\nQTime (ms) over {len(tokens)} substring queries:")
+        self.stdout.write(
+            f"{'query':>10} {'mean':>8} {'median':>8} {'p95':>8} {'max':>8}"
+        )
+        for name, times in qtimes.items():
+            summary = self.summarize(times)
+            self.stdout.write(
+                f"{name:>10} {summary['mean']:8.1f} {summary['median']:8.1f} "
+                f"{summary['p95']:8.1f} {summary['max']:8.1f}"
+            )
+
+        wildcard_mean = statistics.mean(qtimes["wildcard"])
+        ngram_mean = statistics.mean(qtimes["n-gram"])
+        if ngram_mean > 0:
+            self.stdout.write(f"\nSpeedup (mean): {wildcard_mean / ngram_mean:.1f}x")
+        if mismatches > 0:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{mismatches} queries returned a different number of "
+                    "results for the two query forms."
+                )
+            )
+
+    def compare_filters(self, n_queries: int, n_combinations: int):
+        # Users tend to apply the same (popular) filters over and over with
+        # different search strings. We draw every query's filters from a small
+        # pool of combinations, and search for a different token each time so
+        # that Solr can't answer the query from its queryResultCache.
+        combinations = [self.make_filters() for _ in range(n_combinations)]
+        tokens = self.zipf_choices(self.vocabulary, n_queries)
+
+        strategies = {
+            # One fq per filter, as sent by SearchEngine
+            "separate": self.engine.filter_queries,
+            # A single fq for the whole combination
+            "combined": lambda query: [
+                " AND ".join(f"({fq})" for fq in self.engine.filter_queries(query))
+            ],
+        }
+
+        rows = {}
+        for name, build_filters in strategies.items():
+            # Start each strategy with an empty filterCache
+            self.new_searcher()
+            before = self.filter_cache_stats()
+
+            qtimes = []
+            for token in tokens:
+                query = self.zipf_choices(combinations, 1)[0]
+                results = self.select(
+                    self.engine.substring_query(token), build_filters(query)
+                )
+                qtimes.append(results["responseHeader"]["QTime"])
+
+            after = self.filter_cache_stats()
+            rows[name] = {
+                key: after.get(key, 0) - before.get(key, 0)
+                for key in ("lookups", "hits", "inserts", "evictions")
+            }
+            rows[name]["qtime"] = statistics.mean(qtimes)
+
+        self.stdout.write(
+            f"\nfilterCache usage over {n_queries} queries drawn from "
+            f"{n_combinations} filter combinations:"
+        )
+        self.stdout.write(
+            f"{'fq':>10} {'lookups':>8} {'hits':>8} {'hit ratio':>10} "
+            f"{'inserts':>8} {'evictions':>10} {'QTime':>8}"
+        )
+        for name, row in rows.items():
+            ratio = row["hits"] / row["lookups"] if row["lookups"] > 0 else 0
+            self.stdout.write(
+                f"{name:>10} {row['lookups']:8d} {row['hits']:8d} {ratio:10.1%} "
+                f"{row['inserts']:8d} {row['evictions']:10d} {row['qtime']:8.1f}"
+            )
+
+    def make_filters(self) -> dict:
+        # Create a random (non-empty) combination of search filters, in the
+        # same format as the cleaned data of AdvancedSearchForm.
+        while True:
+            query = {
+                "tags": self.zipf_choices(self.tags, self.random.randint(0, 2)),
+                "authors": self.zipf_choices(self.authors, self.random.randint(0, 1)),
+                "publisher": self.zipf_choices(
+                    self.publishers, self.random.randint(0, 1)
+                ),
+            }
+            if self.random.random() < 0.5:
+                year = self.random.choice(range(1970, 2020, 10))
+                query["published_after"] = datetime.date(year, 1, 1)
+                query["published_before"] = datetime.date(year + 9, 12, 31)
+            if len(self.engine.filter_queries(query)) > 0:
+                return query
+
+    def summarize(self, times: List[int]) -> Dict[str, float]:
+        times = sorted(times)
+        return {
+            "mean": statistics.mean(times),
+            "median": statistics.median(times),
+            "p95": times[min(len(times) - 1, int(0.95 * len(times)))],
+            "max": times[-1],
+        }
+
+    """
+    Solr requests
+    """
+
+    def select(self, query: str, filters: Tuple[str, ...] = ()) -> dict:
+        params = {"q": query, "rows": 0, "fq": [f"id:{self.id_prefix}*", *filters]}
+        req = self.engine.pool.get(f"{self.engine.solr_url}/select", params=params)
+        if req.status_code != 200:
+            raise CommandError(f"Solr returned {req.status_code}: {req.text}")
+        return req.json()
+
+    def update(self, **kwargs):
+        req = self.engine.pool.post(f"{self.engine.solr_url}/update", **kwargs)
+        if req.status_code != 200:
+            raise CommandError(f"Solr returned {req.status_code}: {req.text}")
+
+    def filter_cache_stats(self) -> Dict[str, int]:
+        params = {"cat": "CACHE", "key": "filterCache", "stats": "true", "wt": "json"}
+        req = self.engine.pool.get(
+            f"{self.engine.solr_url}/admin/mbeans", params=params
+        )
+        if req.status_code != 200:
+            raise CommandError(f"Solr returned {req.status_code}: {req.text}")
+
+        # Solr returns the categories as a flat list of alternating names and
+        # values, and prefixes the names of the statistics with the name of the
+        # cache, e.g. "CACHE.searcher.filterCache.hits".
+        mbeans = req.json()["solr-mbeans"]
+        caches = dict(zip(mbeans[::2], mbeans[1::2]))["CACHE"]
+        stats = caches["filterCache"]["stats"]
+        return {key.rsplit(".", 1)[-1]: value for (key, value) in stats.items()}
+
+    def new_searcher(self):
+        # Solr only opens a new searcher (with new, empty caches) when a
+        # commit includes changes to the index, so we delete a document that
+        # doesn't exist before committing.
+        self.update(
+            json={"delete": {"id": f"{self.id_prefix}none"}}, params={"commit": "true"}
+        )
@@ -0,0 +1,68 @@
+"""
+Write compressed snapshots of the full compendium, which are served as static
+files (see search.snapshots).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from search.snapshots import compendium_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Write versioned, compressed snapshots of the full compendium (as JSON, "
+        "NDJSON and BibTeX) if it has changed since the latest snapshot. With "
+        "--watch, keep running and rebuild the snapshots whenever the "
+        "compendium changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Write a new snapshot even if the compendium hasn't changed.",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running, rebuilding the snapshots when the compendium changes.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.SNAPSHOT_POLL_INTERVAL,
+            help="Number of seconds to wait between checks for changes.",
+        )
+
+    def handle(self, *args, **options):
+        self.build(force=options["force"])
+        if not options["watch"]:
+            return
+
+        self.stdout.write("Waiting for changes to the compendium...")
+        try:
+            while True:
+                time.sleep(options["poll_interval"])
+                self.build()
+        except KeyboardInterrupt:
+            pass
+
+    def build(self, force: bool = False):
+        start = time.monotonic()
+        manifest = compendium_snapshots.build(force=force)
+        if manifest is None:
+            self.stdout.write("Snapshots are up-to-date")
+            return
+
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            f"Wrote snapshot {manifest['version']} of "
+            f"{manifest['state']['entries']} entries in {elapsed:.1f}s"
+        )
+        for (export_format, files) in manifest["files"].items():
+            self.stdout.write(
+                f"  {export_format:>8}: {files['gz_size']} bytes (gzip), "
+                f"{files['br_size']} bytes (brotli)"
+            )
@@ -0,0 +1,80 @@
+"""
+Worker that sends changes to compendium entries from the search index outbox
+to Solr.
+"""
+
+import time
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from search.indexing import OutboxWorker
+from search.models import IndexUpdate
+
+
+class Command(BaseCommand):
+    help = (
+        "Send the changes recorded in the search index outbox to Solr. By "
+        "default the worker runs until it's interrupted, polling the outbox for "
+        "new changes."
+    )
+
+    # Number of seconds between prunes of processed changes from the outbox
+    prune_interval = 3600
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process all of the pending changes and then exit.",
+        )
+        parser.add_argument(
+            "--status",
+            action="store_true",
+            help="Print the depth of the outbox and the age of the oldest pending "
+            "change, and then exit.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.SEARCH_INDEX_BATCH_SIZE,
+            help="Maximum number of changes to send to Solr at once.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.SEARCH_OUTBOX_POLL_INTERVAL,
+            help="Number of seconds to wait between checks for new changes.",
+        )
+
+    def handle(self, *args, **options):
+        if options["status"]:
+            self.print_status()
+            return
+
+        worker = OutboxWorker(batch_size=options["batch_size"])
+        if options["once"]:
+            n_processed = worker.drain()
+            self.stdout.write(f"Processed {n_processed} changes")
+            self.print_status()
+            return
+
+        self.stdout.write("Waiting for changes to send to Solr...")
+        last_prune = 0
+        try:
+            while True:
+                if time.monotonic() - last_prune > self.prune_interval:
+                    retention = timedelta(days=settings.SEARCH_OUTBOX_RETENTION)
+                    worker.prune(retention)
+                    last_prune = time.monotonic()
+
+                if worker.process_batch() == 0:
+                    time.sleep(options["poll_interval"])
+        except KeyboardInterrupt:
+            pass
+
+    def print_status(self):
+        age = IndexUpdate.objects.oldest_pending_age()
+        age = "n/a" if age is None else f"{age.total_seconds():.1f}s"
+        self.stdout.write(f"Outbox depth: {IndexUpdate.objects.depth()}")
+        self.stdout.write(f"Oldest pending change: {age}")
@@ -0,0 +1,89 @@
+"""
+Trigger a DataImportHandler import in Solr and monitor it until it finishes.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from search.solr import SearchEngine
+from typing import Dict
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a delta-import with Solr's DataImportHandler, which only reindexes "
+        "entries that were modified or deleted since the last import, and "
+        "report how quickly rows were processed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help=(
+                "Run a full-import instead, which reindexes every entry and "
+                "removes every other document from the index."
+            ),
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1,
+            help="Number of seconds to wait between checks on the import's status.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=3600,
+            help="Maximum number of seconds to wait for the import to finish.",
+        )
+
+    def handle(self, *args, **options):
+        self.engine = SearchEngine()
+        command = "full-import" if options["full"] else "delta-import"
+
+        # A full-import replaces the whole index, so that documents for
+        # entries whose deletion was never recorded (or whose tombstone was
+        # pruned) are removed as well. Delta-imports only touch the entries
+        # that changed, and must keep every other document.
+        clean = "true" if options["full"] else "false"
+        status = self.dataimport(command=command, clean=clean, commit="true")
+        start = time.monotonic()
+        self.stdout.write(f"Started {command}")
+
+        while status.get("status") == "busy":
+            if time.monotonic() - start > options["timeout"]:
+                raise CommandError(f"{command} did not finish within the timeout")
+            time.sleep(options["poll_interval"])
+            status = self.dataimport(command="status")
+            self.report(status, time.monotonic() - start, final=False)
+
+        self.report(status, time.monotonic() - start, final=True)
+
+    def report(self, status: dict, elapsed: float, final: bool):
+        messages: Dict[str, str] = status.get("statusMessages", {})
+        fetched = int(messages.get("Total Rows Fetched", 0))
+        processed = int(messages.get("Total Documents Processed", 0))
+        rate = processed / elapsed if elapsed > 0 else 0
+
+        line = (
+            f"rows fetched={fetched} documents processed={processed} "
+            f"elapsed={elapsed:.1f}s rate={rate:.1f} rows/s"
+        )
+        if not final:
+            self.stdout.write(f"  {line}")
+            return
+
+        # The summary message has an empty key, e.g. "Indexing completed.
+        # Added/Updated: 10 documents. Deleted 0 documents."
+        summary = messages.get("", "")
+        if "failed" in summary.lower() or "Aborted" in messages:
+            raise CommandError(f"Import failed: {summary} ({line})")
+        self.stdout.write(self.style.SUCCESS(f"{summary} {line}".strip()))
+
+    def dataimport(self, **params) -> dict:
+        params["wt"] = "json"
+        req = self.engine.pool.get(f"{self.engine.solr_url}/dataimport", params=params)
+        if req.status_code != 200:
+            raise CommandError(f"Solr returned {req.status_code}: {req.text}")
+        return req.json()
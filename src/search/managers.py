@@ -0,0 +1,51 @@
+from datetime import timedelta
+from django.db import models
+from django.utils import timezone
+from typing import Optional
+
+"""
+---------------------------------------------------
+Manager for the search index outbox
+---------------------------------------------------
+"""
+
+
+class IndexUpdateQuerySet(models.QuerySet):
+    def pending(self):
+        """
+        Get the updates that haven't been sent to Solr yet.
+        """
+        return self.filter(processed__isnull=True)
+
+    def due(self):
+        """
+        Get the pending updates that are ready to be (re)tried.
+        """
+        return self.pending().filter(next_attempt__lte=timezone.now())
+
+    def depth(self) -> int:
+        """
+        Get the number of updates waiting to be sent to Solr.
+        """
+        return self.pending().count()
+
+    def oldest_pending_age(self) -> Optional[timedelta]:
+        """
+        Get the amount of time that the oldest pending update has been waiting
+        to be sent to Solr, or None if there are no pending updates.
+        """
+        oldest = self.pending().aggregate(oldest=models.Min("created"))["oldest"]
+        if oldest is None:
+            return None
+        return timezone.now() - oldest
+
+
+class IndexUpdateManager(models.Manager.from_queryset(IndexUpdateQuerySet)):
+    def record(self, entry_ids, action: str):
+        """
+        Record that a collection of compendium entries needs to be updated in
+        (or deleted from) the Solr index.
+        """
+        return self.bulk_create(
+            [self.model(entry_id=pk, action=action) for pk in entry_ids]
+        )
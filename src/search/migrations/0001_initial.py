@@ -0,0 +1,54 @@
+# Generated by Django 3.1.14 on 2026-10-18 00:24
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexUpdate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("entry_id", models.IntegerField(db_index=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("update", "Update"), ("delete", "Delete")],
+                        default="update",
+                        max_length=6,
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "processed",
+                    models.DateTimeField(blank=True, db_index=True, null=True),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "next_attempt",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("last_error", models.TextField(blank=True, default="")),
+            ],
+            options={"db_table": "search_index_outbox",},
+        ),
+    ]
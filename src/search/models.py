@@ -0,0 +1,69 @@
+"""
+Models used to keep the Solr index in sync with the database.
+"""
+
+from django.db import models
+from django.utils import timezone
+from search.managers import IndexUpdateManager
+
+"""
+---------------------------------------------------
+Models
+---------------------------------------------------
+"""
+
+
+class IndexUpdate(models.Model):
+    """
+    An entry in the outbox of changes waiting to be sent to Solr. Changes to
+    compendium entries write an IndexUpdate in the same transaction as the
+    change itself, so that no change is lost if Solr is unavailable. The
+    updates are then sent to Solr in batches by the process_index_outbox
+    management command.
+
+    Fields
+    ------
+    entry_id : django.db.models.IntegerField
+        The id of the CompendiumEntry that changed. This is deliberately not
+        a foreign key, since the entry may since have been deleted.
+
+    action : django.db.models.CharField
+        Whether the entry should be updated in or deleted from the index.
+
+    created : django.db.models.DateTimeField
+        The time at which the change was made.
+
+    processed : django.db.models.DateTimeField
+        The time at which the change was sent to Solr, or None if it's still
+        pending.
+
+    attempts : django.db.models.PositiveSmallIntegerField
+        The number of failed attempts to send the change to Solr.
+
+    next_attempt : django.db.models.DateTimeField
+        The earliest time at which the change should next be sent to Solr.
+        Used to back off after failed attempts.
+
+    last_error : django.db.models.TextField
+        The error raised by the last failed attempt.
+    """
+
+    UPDATE = "update"
+    DELETE = "delete"
+    ACTION_CHOICES = ((UPDATE, "Update"), (DELETE, "Delete"))
+
+    entry_id = models.IntegerField(db_index=True)
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES, default=UPDATE)
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+    processed = models.DateTimeField(blank=True, null=True, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    objects = IndexUpdateManager()
+
+    def __str__(self):
+        return f"{self.action} entry {self.entry_id}"
+
+    class Meta:
+        db_table = "search_index_outbox"
@@ -0,0 +1,140 @@
+"""
+Signal handlers that keep search in sync with changes to the compendium.
+
+Changes to compendium entries are recorded in the search index outbox (see
+search.models.IndexUpdate). The handlers run inside the transaction that
+changes the entry, so the outbox row is committed (or rolled back) along with
+the change itself.
+
+Cached search results and the corpus version are only invalidated once that
+transaction commits. Otherwise a request made before the commit could cache
+(or receive an ETag for) the old data under the new generation, where it
+would stay until the next change.
+"""
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag, Publisher
+from entries.signals import entries_imported
+from search.cache import corpus_version, search_cache
+from search.models import IndexUpdate
+
+
+@receiver(post_save, sender=CompendiumEntry)
+@receiver(post_delete, sender=CompendiumEntry)
+def invalidate_search_cache(sender, **kwargs):
+    """
+    Invalidate cached search results whenever a compendium entry is added,
+    modified, or deleted.
+    """
+    transaction.on_commit(search_cache.invalidate)
+
+
+@receiver(post_save, sender=CompendiumEntry)
+@receiver(post_delete, sender=CompendiumEntry)
+def update_corpus_version(sender, **kwargs):
+    """
+    Increment the corpus version (used to validate cached copies of the full
+    compendium) whenever a compendium entry is added, modified, or deleted.
+    """
+    transaction.on_commit(corpus_version.incr)
+
+
+@receiver(post_save, sender=CompendiumEntry)
+def index_saved_entry(sender, instance, **kwargs):
+    """
+    Add new and modified compendium entries to the Solr index.
+    """
+    IndexUpdate.objects.record([instance.pk], IndexUpdate.UPDATE)
+
+
+@receiver(post_delete, sender=CompendiumEntry)
+def index_deleted_entry(sender, instance, **kwargs):
+    """
+    Remove deleted compendium entries from the Solr index.
+    """
+    IndexUpdate.objects.record([instance.pk], IndexUpdate.DELETE)
+
+
+@receiver(entries_imported, sender=CompendiumEntry)
+def index_imported_entries(sender, entry_ids, **kwargs):
+    """
+    Add compendium entries that were inserted in bulk to the Solr index.
+    """
+    IndexUpdate.objects.record(entry_ids, IndexUpdate.UPDATE)
+    transaction.on_commit(search_cache.invalidate)
+    transaction.on_commit(corpus_version.incr)
+
+
+@receiver(m2m_changed, sender=CompendiumEntry.tags.through)
+@receiver(m2m_changed, sender=CompendiumEntry.authors.through)
+def index_related_entries(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Reindex compendium entries whenever their tags or authors change.
+    """
+    if not reverse:
+        # instance is the CompendiumEntry whose tags or authors changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            _related_objects_changed([instance.pk])
+
+    elif action in ("post_add", "post_remove"):
+        # instance is a tag or author, and pk_set contains the ids of the
+        # entries that it was added to or removed from
+        _related_objects_changed(pk_set)
+
+    elif action == "pre_clear":
+        # pk_set isn't provided when clearing the relation, so we have to
+        # look up the affected entries before they're removed
+        field = "tags" if sender is CompendiumEntry.tags.through else "authors"
+        _related_objects_changed(_entry_ids(**{field: instance}))
+
+
+@receiver(post_save, sender=CompendiumEntryTag)
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Publisher)
+def index_renamed_related_object(sender, instance, created, **kwargs):
+    """
+    Reindex the compendium entries that use a tag, author or publisher when
+    its name changes.
+    """
+    if not created:
+        _related_objects_changed(_entry_ids(**{_entry_field(sender): instance}))
+
+
+@receiver(pre_delete, sender=CompendiumEntryTag)
+@receiver(pre_delete, sender=Author)
+@receiver(pre_delete, sender=Publisher)
+def index_deleted_related_object(sender, instance, **kwargs):
+    """
+    Reindex the compendium entries that use a tag, author or publisher before
+    it's deleted (m2m_changed isn't sent when relations are removed by a
+    cascading delete).
+    """
+    _related_objects_changed(_entry_ids(**{_entry_field(sender): instance}))
+
+
+def _related_objects_changed(entry_ids):
+    # The tags, authors and publisher are part of the Solr document for an
+    # entry, so changing them counts as modifying the entry (which is how
+    # Solr's delta-import finds it).
+    entry_ids = list(entry_ids)
+    if len(entry_ids) == 0:
+        return
+    CompendiumEntry.objects.filter(pk__in=entry_ids).update(
+        last_modified=timezone.now()
+    )
+    IndexUpdate.objects.record(entry_ids, IndexUpdate.UPDATE)
+    transaction.on_commit(search_cache.invalidate)
+    transaction.on_commit(corpus_version.incr)
+
+
+def _entry_ids(**filters):
+    return CompendiumEntry.objects.filter(**filters).values_list("pk", flat=True)
+
+
+def _entry_field(model) -> str:
+    # Get the name of the CompendiumEntry field that refers to a model
+    fields = {CompendiumEntryTag: "tags", Author: "authors", Publisher: "publisher"}
+    return fields[model]
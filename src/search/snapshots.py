@@ -0,0 +1,301 @@
+"""
+Precomputed, compressed snapshots of the entire compendium.
+
+Exporting the full compendium from the database is expensive, but the
+compendium only changes when an entry is edited. Snapshots of the full export
+are written ahead of time (see `manage.py build_snapshots`) to SNAPSHOT_ROOT,
+from which they're served as static files by nginx, and the bulk export API
+redirects clients to the latest snapshot.
+"""
+
+import brotli
+import gzip
+import json
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils import timezone
+from entries.models import CompendiumEntry
+from search.cache import corpus_version
+from search.export import (
+    BIBTEX_FIELDS,
+    EXPORT_FIELDS,
+    export_rows,
+    serialize_json,
+    to_bibtex,
+    to_ndjson,
+)
+from typing import Dict, Iterator, List, Optional
+
+# Formats in which snapshots are written, along with their file extensions.
+# These are the same formats as the bulk export API (see
+# search.views.mixins.ExportMixin).
+SNAPSHOT_FORMATS = {"json": "json", "ndjson": "ndjson", "bibtex": "bib"}
+
+
+class CompendiumSnapshots:
+    """
+    Writes versioned snapshots of the compendium, and finds the latest one.
+
+    Every snapshot is written in each of the SNAPSHOT_FORMATS, compressed with
+    both gzip (as e.g. compendium-<version>.json.gz) and brotli (as
+    compendium-<version>.json.br). A manifest describing the latest snapshot
+    is written to latest.json once all of its files have been written.
+
+    Parameters
+    ----------
+    root : Optional[str]
+        The directory to write snapshots to. Defaults to settings.SNAPSHOT_ROOT.
+
+    url : Optional[str]
+        The URL that the snapshots are served from. Defaults to
+        settings.SNAPSHOT_URL.
+
+    keep : Optional[int]
+        The number of versions of the snapshots to keep. Defaults to
+        settings.SNAPSHOT_KEEP.
+
+    chunk_size : int
+        The number of entries to read from the database at a time.
+    """
+
+    snapshot_logger = logging.getLogger("search.snapshots")
+
+    manifest_name = "latest.json"
+    file_prefix = "compendium-"
+
+    gzip_level = 9
+    brotli_quality = 9
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        url: Optional[str] = None,
+        keep: Optional[int] = None,
+        chunk_size: int = 1000,
+    ):
+        self._root = root
+        self._url = url
+        self._keep = keep
+        self.chunk_size = chunk_size
+
+    @property
+    def root(self) -> str:
+        return settings.SNAPSHOT_ROOT if self._root is None else self._root
+
+    @property
+    def url(self) -> str:
+        return settings.SNAPSHOT_URL if self._url is None else self._url
+
+    @property
+    def keep(self) -> int:
+        return settings.SNAPSHOT_KEEP if self._keep is None else self._keep
+
+    """
+    Reading snapshots
+    """
+
+    def latest(self) -> Optional[dict]:
+        """
+        Read the manifest of the latest snapshot, or return None if no
+        snapshot has been written yet.
+        """
+        try:
+            with open(os.path.join(self.root, self.manifest_name), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as ex:
+            self.snapshot_logger.warning(f"Unable to read snapshot manifest: {ex!r}")
+            return None
+
+    def latest_url(
+        self, export_format: str, accept_encoding: str = "", up_to_date: bool = True
+    ) -> Optional[str]:
+        """
+        Get the URL of the latest snapshot in a given format, or None if there
+        isn't one. Clients that accept brotli (according to their
+        Accept-Encoding header) are sent to the brotli-compressed file. Other
+        clients are sent to the uncompressed name of the snapshot, for which
+        nginx serves the gzipped file (decompressing it for clients that don't
+        accept gzip either).
+
+        Unless `up_to_date` is False, None is also returned if the corpus
+        version has changed since the latest snapshot was written, so that
+        edits are never hidden behind an old snapshot. Checking the version
+        is a single cache lookup, rather than a query over the whole
+        compendium (as is_stale makes). If the counter isn't shared between
+        processes (e.g. with the dummy cache), it never matches, and exports
+        are always streamed from the database.
+        """
+        latest = self.latest()
+        if latest is None or export_format not in latest["files"]:
+            return None
+        if up_to_date and latest.get("corpus_version") != corpus_version.value():
+            return None
+
+        files = latest["files"][export_format]
+        if "br" in _encodings(accept_encoding) and "br" in files:
+            return self.url + files["br"]
+        return self.url + files["name"]
+
+    def corpus_state(self) -> Dict:
+        """
+        Summarize the state of the compendium with a single query. The state
+        changes whenever an entry is added, edited or deleted, so snapshots
+        only need to be rebuilt when it does.
+        """
+        state = CompendiumEntry.objects.aggregate(
+            entries=Count("id"), last_modified=Max("last_modified")
+        )
+        return json.loads(json.dumps(state, cls=DjangoJSONEncoder))
+
+    def is_stale(self) -> bool:
+        """
+        Check whether the compendium has changed since the latest snapshot was
+        written.
+        """
+        latest = self.latest()
+        return latest is None or latest["state"] != self.corpus_state()
+
+    """
+    Writing snapshots
+    """
+
+    def build(self, force: bool = False) -> Optional[dict]:
+        """
+        Write a new snapshot of the compendium, unless the latest snapshot is
+        already up-to-date (and `force` is False). Returns the manifest of the
+        new snapshot, or None if no snapshot was written.
+
+        If the latest snapshot is up-to-date but the corpus version has
+        changed (e.g. because the counter was evicted from the cache), its
+        manifest is updated with the current version, so that the bulk export
+        API redirects to it again.
+        """
+        # The corpus version is read before the compendium, so that changes
+        # made while the snapshot is written make it out-of-date.
+        version_counter = corpus_version.value()
+        state = self.corpus_state()
+        latest = self.latest()
+        if not force and latest is not None and latest["state"] == state:
+            if latest.get("corpus_version") != version_counter:
+                self._write_manifest({**latest, "corpus_version": version_counter})
+            return None
+
+        os.makedirs(self.root, exist_ok=True)
+        created = timezone.now()
+        version = created.strftime("%Y%m%dT%H%M%S%fZ")
+
+        files = {}
+        for (export_format, extension) in SNAPSHOT_FORMATS.items():
+            name = f"{self.file_prefix}{version}.{extension}"
+            files[export_format] = {"name": name}
+            sizes = self._write(name, self._content(export_format))
+            for (encoding, size) in sizes.items():
+                files[export_format][encoding] = f"{name}.{encoding}"
+                files[export_format][f"{encoding}_size"] = size
+
+        manifest = {
+            "version": version,
+            "created": created.isoformat(),
+            "state": state,
+            "corpus_version": version_counter,
+            "files": files,
+        }
+        self._write_manifest(manifest)
+        self.snapshot_logger.info(
+            f"Wrote snapshot {version} of {state['entries']} entries"
+        )
+
+        self.prune()
+        return manifest
+
+    def prune(self) -> List[str]:
+        """
+        Delete all but the latest `keep` versions of the snapshots. Returns the
+        names of the files that were deleted.
+        """
+        patt = re.compile(re.escape(self.file_prefix) + r"(\w+)\.")
+        versions = {}
+        for name in os.listdir(self.root):
+            match = patt.match(name)
+            if match is not None:
+                versions.setdefault(match.group(1), []).append(name)
+
+        # Versions are timestamps, so they sort in the order they were written
+        deleted = []
+        for version in sorted(versions)[: -max(self.keep, 1)]:
+            for name in versions[version]:
+                os.remove(os.path.join(self.root, name))
+                deleted.append(name)
+        return deleted
+
+    """
+    Internal API
+    """
+
+    def _content(self, export_format: str) -> Iterator[str]:
+        queryset = CompendiumEntry.objects.all()
+        if export_format == "json":
+            return serialize_json(queryset, self.chunk_size)
+        if export_format == "bibtex":
+            rows = export_rows(queryset, BIBTEX_FIELDS, self.chunk_size)
+            return to_bibtex(rows)
+        return to_ndjson(export_rows(queryset, EXPORT_FIELDS, self.chunk_size))
+
+    def _write(self, name: str, content: Iterator[str]) -> Dict[str, int]:
+        # Compress the content with gzip and brotli at the same time, so that
+        # we only have to read it from the database once. Files are written
+        # under a temporary name, and then renamed so that they never appear
+        # half-written.
+        gz_path = os.path.join(self.root, f"{name}.gz")
+        br_path = os.path.join(self.root, f"{name}.br")
+        compressor = brotli.Compressor(quality=self.brotli_quality)
+
+        with gzip.open(gz_path + ".tmp", "wb", self.gzip_level) as gz_file, open(
+            br_path + ".tmp", "wb"
+        ) as br_file:
+            for chunk in content:
+                data = chunk.encode("utf-8")
+                gz_file.write(data)
+                br_file.write(compressor.process(data))
+            br_file.write(compressor.finish())
+
+        os.replace(gz_path + ".tmp", gz_path)
+        os.replace(br_path + ".tmp", br_path)
+        return {"gz": os.path.getsize(gz_path), "br": os.path.getsize(br_path)}
+
+    def _write_manifest(self, manifest: dict):
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        self._write_atomic(self.manifest_name, data)
+
+    def _write_atomic(self, name: str, data: bytes):
+        path = os.path.join(self.root, name)
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+
+"""
+Helper functions
+"""
+
+
+def _encodings(accept_encoding: str) -> List[str]:
+    # Parse the content codings in an Accept-Encoding header, ignoring any
+    # that the client explicitly refuses (q=0).
+    encodings = []
+    for item in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in item.split(";")]
+        if coding and not any(re.fullmatch(r"q=0(\.0*)?", p) for p in params):
+            encodings.append(coding.lower())
+    return encodings
+
+
+# Snapshots used by the rest of the process
+compendium_snapshots = CompendiumSnapshots()
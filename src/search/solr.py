@@ -2,21 +2,533 @@
 Code for integrating with Apache Solr for search on the site
 """
 
+import aiohttp
+import asyncio
+import base64
+import binascii
+import datetime
+import json
 import logging
+import os
+import re
 import requests
-from typing import Dict, List
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from search.cache import SearchResultCache, search_cache
+from search.documents import RESULT_FIELDS
+from typing import Dict, List, Optional, Tuple
+from urllib3.util.retry import Retry
+
+
+class SolrQueryError(Exception):
+    """
+    Raised when Solr rejects or fails to answer a query. `status_code` is the
+    HTTP status code of Solr's response, which is in the 4xx range if there
+    was something wrong with the query itself (e.g. an invalid cursorMark).
+    """
+
+    def __init__(self, msg: str, *args, status_code: int = 500, **kwargs):
+        super().__init__(msg, *args, **kwargs)
+        self.status_code = status_code
+
+    @classmethod
+    def from_response(cls, status_code: int, body: str) -> "SolrQueryError":
+        """
+        Create an exception from the status code and body of an error
+        response from Solr, using the error message that Solr included in the
+        response if there is one.
+        """
+        try:
+            msg = json.loads(body)["error"]["msg"]
+        except (ValueError, KeyError, TypeError):
+            msg = body
+        return cls(f"Solr returned {status_code}: {msg}", status_code=status_code)
+
+
+class SolrConnectionPool:
+    """
+    A pool of keep-alive HTTP connections to Solr. Each worker process keeps
+    a single pool (see get_connection_pool) so that searches reuse existing
+    TCP connections rather than opening a new connection for every query.
+
+    Parameters
+    ----------
+    pool_size : int
+        The maximum number of connections to keep open to Solr. Requests
+        block until a connection is free once this many connections are in
+        use.
+
+    connect_timeout : float
+        Number of seconds to wait while establishing a connection to Solr.
+
+    read_timeout : float
+        Number of seconds to wait for Solr to send a response.
+
+    max_retries : int
+        Number of times to retry a failed request. Only idempotent requests
+        (GET, HEAD, etc.) are retried.
+
+    backoff_factor : float
+        Backoff factor applied between retries (see urllib3's Retry class).
+    """
+
+    pool_logger = logging.getLogger("search.solr.pool")
+
+    # HTTP status codes indicating that Solr (or a proxy in front of it) was
+    # temporarily unable to handle a request.
+    retry_status_codes = (502, 503, 504)
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        max_retries: int = 2,
+        backoff_factor: float = 0.1,
+    ):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+        self._requests = 0
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Retrieve the requests.Session used to talk to Solr, creating it if it
+        doesn't exist yet. A new session is created after a fork so that
+        processes never share sockets.
+        """
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    self._session = self._create_session()
+                    self._session_pid = pid
+                    self._requests = 0
+        return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Make a GET request to Solr using one of the pool's connections.
+        """
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Make a POST request to Solr using one of the pool's connections.
+        """
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        session = self.session
+        with self._lock:
+            self._requests += 1
+        return session.request(method, url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return statistics about the connections held by the pool in the current
+        process.
+
+        Returns
+        -------
+        dict
+            A dictionary with the following keys:
+            - pool_size: the maximum number of connections per host.
+            - in_use: the number of connections currently checked out.
+            - idle: the number of open connections waiting to be reused.
+            - created: the total number of connections opened by the pool.
+            - requests: the total number of requests made through the pool.
+        """
+        stats = {
+            "pool_size": self.pool_size,
+            "in_use": 0,
+            "idle": 0,
+            "created": 0,
+            "requests": 0,
+        }
+
+        if self._session is None or self._session_pid != os.getpid():
+            return stats
+
+        stats["requests"] = self._requests
+
+        # The same adapter is mounted for both http:// and https://, so we
+        # deduplicate adapters to avoid counting connections twice.
+        adapters = {id(a): a for a in self._session.adapters.values()}
+        for adapter in adapters.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                conn_pool = pools.get(key)
+                if conn_pool is None or conn_pool.pool is None:
+                    continue
+                queue = conn_pool.pool
+                stats["created"] += conn_pool.num_connections
+                stats["idle"] += sum(
+                    1 for conn in list(queue.queue) if conn is not None
+                )
+                stats["in_use"] += max(0, queue.maxsize - queue.qsize())
+
+        return stats
+
+    def close(self):
+        """
+        Close all of the connections held by the pool.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+            self._session_pid = None
+
+    """
+    Internal API
+    """
+
+    def _create_session(self) -> requests.Session:
+        self.pool_logger.debug(
+            f"Creating Solr connection pool (pid={os.getpid()} "
+            f"pool_size={self.pool_size})"
+        )
+
+        # Retry idempotent requests (urllib3's default set of methods) on
+        # connection errors, read errors, and transient gateway errors.
+        retries = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=self.retry_status_codes,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            pool_block=True,
+            max_retries=retries,
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+
+_connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> SolrConnectionPool:
+    """
+    Get the connection pool to Solr that is shared by every SearchEngine in
+    the current process.
+    """
+    global _connection_pool
+
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                _connection_pool = SolrConnectionPool(
+                    pool_size=settings.SOLR_POOL_SIZE,
+                    connect_timeout=settings.SOLR_CONNECT_TIMEOUT,
+                    read_timeout=settings.SOLR_READ_TIMEOUT,
+                    max_retries=settings.SOLR_MAX_RETRIES,
+                )
+    return _connection_pool
+
+
+class AsyncSolrConnectionPool:
+    """
+    asyncio counterpart of SolrConnectionPool, used by AsyncSearchEngine. The
+    pool keeps a single aiohttp.ClientSession (and its keep-alive connections)
+    for the event loop that the process is running.
+
+    The parameters are the same as those accepted by SolrConnectionPool.
+    """
+
+    pool_logger = logging.getLogger("search.solr.pool")
+    retry_status_codes = SolrConnectionPool.retry_status_codes
+
+    def __init__(
+        self,
+        pool_size: int = 100,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 10,
+        max_retries: int = 2,
+        backoff_factor: float = 0.1,
+    ):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        self._lock = threading.Lock()
+        self._session = None
+        self._loop = None
+        self._created = 0
+        self._requests = 0
+        self._in_use = 0
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Retrieve the aiohttp.ClientSession used to talk to Solr from the
+        current event loop. Sessions can't be shared between event loops, so a
+        new session is created whenever the running loop changes (e.g. when an
+        async view is run from a WSGI worker).
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._loop is not loop:
+            await self._discard_session()
+            # (Another request may have created a session while we waited)
+            if self._session is None:
+                self._session = self._create_session()
+                self._loop = loop
+        return self._session
+
+    async def get(self, url: str, params: Optional[dict] = None) -> Tuple[dict, str]:
+        """
+        Make a GET request to Solr using one of the pool's connections. Returns
+        the decoded JSON response, as well as the URL that was queried. Raises
+        a SolrQueryError if Solr returns an error.
+        """
+        params = _flatten_params(params or {})
+
+        attempt = 0
+        while True:
+            try:
+                with self._lock:
+                    self._requests += 1
+                    self._in_use += 1
+                try:
+                    session = await self.get_session()
+                    async with session.get(url, params=params) as resp:
+                        if (
+                            resp.status in self.retry_status_codes
+                            and attempt < self.max_retries
+                        ):
+                            raise _RetryableStatus(resp.status)
+                        if resp.status >= 400:
+                            body = await resp.text()
+                            raise SolrQueryError.from_response(resp.status, body)
+                        return await resp.json(content_type=None), str(resp.url)
+                finally:
+                    with self._lock:
+                        self._in_use -= 1
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as ex:
+                if attempt >= self.max_retries:
+                    raise
+                error = ex
+            except _RetryableStatus as ex:
+                error = ex
+
+            delay = self.backoff_factor * (2 ** attempt)
+            attempt += 1
+            self.pool_logger.warning(
+                f"Retrying Solr request ({error!r}); attempt {attempt} in {delay}s"
+            )
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return statistics about the connections held by the pool. The keys of
+        the returned dictionary are the same as for SolrConnectionPool.stats,
+        except for `idle`: aiohttp doesn't report when it closes idle
+        connections, so we have no way of counting them. `in_use` is the
+        number of requests that are being made (each of which holds one of the
+        connections).
+        """
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_use": self._in_use,
+                "created": self._created,
+                "requests": self._requests,
+            }
+
+    async def close(self):
+        """
+        Close all of the connections held by the pool.
+        """
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    """
+    Internal API
+    """
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        self.pool_logger.debug(
+            f"Creating async Solr connection pool (pid={os.getpid()} "
+            f"pool_size={self.pool_size})"
+        )
+
+        async def on_connection_create_end(session, context, params):
+            with self._lock:
+                self._created += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+
+        connector = aiohttp.TCPConnector(limit=self.pool_size)
+        timeout = aiohttp.ClientTimeout(
+            connect=self.connect_timeout, sock_read=self.read_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector, timeout=timeout, trace_configs=[trace_config]
+        )
+
+    async def _discard_session(self):
+        """
+        Close and drop the session belonging to an event loop that is no longer
+        running.
+        """
+        session = self._session
+        self._session = None
+        if session is not None and not session.closed:
+            try:
+                await session.close()
+            except RuntimeError:
+                # The connections' transports belong to the old event loop,
+                # which may already be closed (in which case so are they)
+                pass
+
+
+class _RetryableStatus(Exception):
+    """
+    Raised by AsyncSolrConnectionPool when Solr returns a status code for which
+    the request should be retried.
+    """
+
+
+def _flatten_params(params: dict) -> List[Tuple[str, str]]:
+    """
+    Convert a dictionary of query parameters into a list of (key, value)
+    pairs, expanding list values into repeated parameters (the way requests
+    handles them).
+    """
+    pairs = []
+    for (key, value) in params.items():
+        values = value if isinstance(value, (list, tuple)) else [value]
+        pairs += [(key, str(v)) for v in values]
+    return pairs
+
+
+_async_connection_pool = None
+
+
+def get_async_connection_pool() -> AsyncSolrConnectionPool:
+    """
+    Get the asyncio connection pool to Solr that is shared by every
+    AsyncSearchEngine in the current process.
+    """
+    global _async_connection_pool
+
+    if _async_connection_pool is None:
+        _async_connection_pool = AsyncSolrConnectionPool(
+            pool_size=settings.SOLR_ASYNC_POOL_SIZE,
+            connect_timeout=settings.SOLR_CONNECT_TIMEOUT,
+            read_timeout=settings.SOLR_READ_TIMEOUT,
+            max_retries=settings.SOLR_MAX_RETRIES,
+        )
+    return _async_connection_pool
+
+
+def quote(value: str) -> str:
+    """
+    Quote a value (e.g. the name of a tag) for use in a Solr query.
+    """
+    value = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{value}"'
+
+
+def encode_cursor(cursor_mark: str) -> str:
+    """
+    Convert a cursorMark returned by Solr into the (opaque) cursor that we give
+    to API clients. The cursor is URL-safe, so that clients don't need to
+    escape it.
+    """
+    token = base64.urlsafe_b64encode(cursor_mark.encode("utf-8"))
+    return token.decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    """
+    Convert a cursor created by encode_cursor back into a cursorMark for Solr.
+    The cursor "*" starts at the beginning of the results. Raises a ValueError
+    if the cursor is invalid.
+    """
+    if cursor == "*":
+        return cursor
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        token = base64.b64decode(cursor + padding, altchars=b"-_", validate=True)
+        return token.decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError) as ex:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from ex
 
 
 class SearchEngine:
     """
-    Wrapper around the pysolr.Solr class to make it easier to connect
+    Wrapper around a pool of HTTP connections to make it easier to connect
     to and query Apache Solr.
     """
 
     solr_logger = logging.getLogger("search.solr")
 
-    def __init__(self):
-        self.solr_url = "http://tec-search:8983/solr/compendium"
+    # Range of n-gram lengths indexed in the basic_search_ngram field. These
+    # must match the minGramSize and maxGramSize of the text_ngram field type
+    # in the Solr schema (docker/solr/conf/managed-schema).
+    ngram_min_size = 2
+    ngram_max_size = 20
+
+    # Sort order used to page through results with a cursor. Solr requires
+    # the sort to include the uniqueKey field, to break ties between
+    # documents with the same score.
+    cursor_sort = "score desc,id asc"
+
+    # Facets returned alongside search results. facet_fields are counted
+    # value-by-value (up to facet_limit values each), while years are counted
+    # in ranges of year_facet_gap years.
+    facet_fields = ("tags", "publisher")
+    facet_limit = 20
+    year_facet_start = 1900
+    year_facet_gap = 10
+
+    def __init__(
+        self,
+        solr_url: Optional[str] = None,
+        pool: Optional[SolrConnectionPool] = None,
+        cache: Optional[SearchResultCache] = None,
+    ):
+        self._solr_url = solr_url
+        self._pool = pool
+        self.cache = search_cache if cache is None else cache
+
+    @property
+    def solr_url(self) -> str:
+        return settings.SOLR_URL if self._solr_url is None else self._solr_url
+
+    @property
+    def pool(self) -> SolrConnectionPool:
+        if self._pool is None:
+            self._pool = get_connection_pool()
+        return self._pool
+
+    def pool_stats(self) -> Dict[str, int]:
+        """
+        Get statistics about the connection pool used to query Solr.
+        """
+        return self.pool.stats()
 
     """
     Search functions
@@ -25,10 +537,62 @@ class SearchEngine:
     def basic_search(self, query: Dict[str, List[str]]):
         """
         Make a query for a string against multiple fields in the Solr schema using
-        a tokenized query string.
+        a tokenized query string. Raises a SolrQueryError if Solr returns an
+        error.
+        """
+        cacheable = self._cacheable(query)
+        if cacheable:
+            results = self.cache.get(query)
+            if results is not None:
+                return results
+
+        params, meta = self._basic_search_params(query)
+        req = self.pool.get(f"{self.solr_url}/spell", params=params)
+        if req.status_code >= 400:
+            raise SolrQueryError.from_response(req.status_code, req.text)
+        results = self._process_results(req.json(), params, meta, req.url)
+
+        if cacheable:
+            self.cache.set(query, results)
+        return results
+
+    def facet_counts(self, field: str, limit: int) -> List[Tuple[str, int]]:
+        """
+        Count the entries of the whole compendium for each value of a facet
+        field (e.g. tags), returning the `limit` most common values along with
+        their counts. Raises a SolrQueryError if Solr returns an error.
+        """
+        query = {"facet_counts": field, "limit": limit}
+        results = self.cache.get(query)
+        if results is None:
+            params = {
+                "q": "*:*",
+                "rows": 0,
+                "facet": "true",
+                "facet.field": field,
+                "facet.limit": limit,
+                "facet.mincount": 1,
+            }
+            req = self.pool.get(f"{self.solr_url}/select", params=params)
+            if req.status_code >= 400:
+                raise SolrQueryError.from_response(req.status_code, req.text)
+            results = req.json()
+            self.cache.set(query, results)
+
+        counts = results.get("facet_counts", {}).get("facet_fields", {}).get(field, [])
+        return list(zip(counts[::2], counts[1::2]))
+
+    """
+    Internal API
+    """
+
+    def _basic_search_params(self, query: Dict[str, List[str]]) -> Tuple[dict, dict]:
+        """
+        Construct the parameters for a basic search query to Solr. Returns the
+        parameters alongside metadata that should be added to the results.
         """
 
-        tokens = query.get("quoted_substrings", [])
+        tokens = list(query.get("quoted_substrings", []))
         tokens += query.get("words", [])
 
         # If tokens == [], we assume that we didn't receive any words at all,
@@ -37,33 +601,215 @@ class SearchEngine:
             tokens = [""]
 
         # Combine tokens into a single search query for Solr
-        query_str = " && ".join(f"basic_search:*{T}*" for T in tokens)
+        query_str = " && ".join(self.substring_query(T) for T in tokens)
+
+        params = {
+            "q": query_str,
+            "fq": self.filter_queries(query),
+            "fl": ",".join(RESULT_FIELDS),
+        }
 
         # Add pagination
         page = query.get("page", 0)
         rows = query.get("rows", 20)
-        start = page * rows
-        data = {
-            "q": query_str,
+        cursor = query.get("cursor")
+        params["rows"] = rows
+        meta = {
+            "page": page,
             "rows": rows,
-            "start": start,
-            "fl": "id,title,abstract,slug,year,month,day",
         }
 
-        req = requests.get(f"{self.solr_url}/spell", params=data)
-        results = req.json()
+        if cursor is None:
+            # Offset paging, used by the site's search pages. Solr has to
+            # sort the first (start + rows) results to find each page, so
+            # this gets slower the deeper we page.
+            params["start"] = page * rows
+            params.update(self.facet_params())
+        else:
+            # Cursor paging, used by the API. Solr only has to keep track of
+            # the next `rows` results after the cursor, no matter how deep
+            # into the results it is. Clients crawling through results don't
+            # need facets, so we skip counting them.
+            params["start"] = 0
+            params["cursorMark"] = cursor
+            params["sort"] = self.cursor_sort
+            meta["cursor"] = cursor
 
-        # Add some more useful data to the results dictionary
-        results["meta"] = {
-            "page": page,
-            "rows": rows,
+        return params, meta
+
+    def _cacheable(self, query: dict) -> bool:
+        # Pages of results requested with a cursor are only ever fetched once
+        # (e.g. by a crawler walking through the results), so caching them
+        # would only evict popular searches from the cache.
+        return query.get("cursor") is None
+
+    def filter_queries(self, query: dict) -> List[str]:
+        """
+        Construct the filter queries (fq) for the facets and filters selected
+        in a query.
+
+        Solr caches the set of documents matching each filter query in its
+        filterCache independently of the main query, so we use a separate
+        filter for every selection to make it easy to reuse between searches.
+        Tags and authors are combined with AND (results must have all of the
+        selected tags and authors), while publishers and years are combined
+        with OR.
+        """
+        fq = [f"tags:{quote(tag)}" for tag in sorted(set(query.get("tags", [])))]
+        fq += [
+            f"authors:{quote(author)}"
+            for author in sorted(set(query.get("authors", [])))
+        ]
+
+        publishers = sorted(set(query.get("publisher", [])))
+        if len(publishers) > 0:
+            fq.append("publisher:(" + " OR ".join(map(quote, publishers)) + ")")
+
+        years = sorted(set(query.get("year", [])))
+        if len(years) > 0:
+            ranges = (f"[{y} TO {y + self.year_facet_gap - 1}]" for y in years)
+            fq.append("year:(" + " OR ".join(ranges) + ")")
+
+        # Publication date range. Only the year is indexed, so the range is
+        # rounded out to whole years.
+        after = query.get("published_after")
+        before = query.get("published_before")
+        if after is not None or before is not None:
+            start = "*" if after is None else after.year
+            end = "*" if before is None else before.year
+            fq.append(f"year:[{start} TO {end}]")
+
+        return fq
+
+    def facet_params(self) -> dict:
+        """
+        Construct the parameters asking Solr to count the facets of the
+        search results.
+        """
+        # Count years up to the end of the current range (e.g. 2029 for gaps
+        # of 10 years in 2020)
+        gap = self.year_facet_gap
+        year_end = (datetime.date.today().year // gap + 1) * gap
+
+        return {
+            "facet": "true",
+            "facet.field": list(self.facet_fields),
+            "facet.limit": self.facet_limit,
+            "facet.mincount": 1,
+            "facet.range": "year",
+            "facet.range.start": self.year_facet_start,
+            "facet.range.end": year_end,
+            "facet.range.gap": gap,
         }
 
+    def substring_query(self, token: str) -> str:
+        """
+        Construct a Solr query matching all of the documents that contain
+        a token as a substring of their title or abstract.
+
+        Where possible we search for the token in the n-gram indexed
+        basic_search_ngram field, which only requires a (cheap) term or
+        phrase query. Tokens that are shorter or longer than the n-grams in
+        that field fall back to a wildcard query.
+
+        Tokens with multiple words (from quoted substrings) match more loosely
+        than a literal substring. Every n-gram of a word is indexed at the
+        word's position, so the phrase query matches consecutive words that
+        *contain* each of the token's words: "hello world" matches "Othello
+        worldwide" as well as "hello world". Tokens with a word outside of the
+        n-gram range match documents that contain each of the words anywhere.
+        Either way, every document that contains the token as a substring is
+        matched.
+        """
+        if token == "":
+            return "*:*"
+
+        # Quoted substrings may contain multiple words, which Solr will match
+        # as a phrase of words containing each of them (see above)
+        words = [w for w in re.split(r"[\s,]+", token) if w != ""]
+        if all(self.ngram_min_size <= len(w) <= self.ngram_max_size for w in words):
+            return f'basic_search_ngram:"{token}"'
+        if len(words) > 1:
+            return "(" + " && ".join(self.substring_query(w) for w in words) + ")"
+        return self.wildcard_query(token)
+
+    def wildcard_query(self, token: str) -> str:
+        """
+        Construct a query that matches the token as a substring of the
+        basic_search field using leading and trailing wildcards. This requires
+        Solr to scan the term dictionary, so it's much slower than
+        substring_query on a large index.
+        """
+        return f"basic_search:*{token}*"
+
+    def _process_results(
+        self, results: dict, params: dict, meta: dict, url: str
+    ) -> dict:
+        """
+        Add metadata to the results returned by Solr, and log the query.
+        """
+
+        # Add some more useful data to the results dictionary
+        results["meta"] = meta
+
+        # Solr returns the same cursorMark that it was given once there are
+        # no more results.
+        if "cursor" in meta:
+            next_cursor = results.get("nextCursorMark", meta["cursor"])
+            if next_cursor == meta["cursor"]:
+                meta["next_cursor"] = None
+            else:
+                meta["next_cursor"] = encode_cursor(next_cursor)
+
         # Do some logging to record the transaction
         qtime = results["responseHeader"]["QTime"]
-        self.solr_logger.info(f"Solr query: {query_str}")
-        self.solr_logger.debug(
-            f"Solr query metadata: qtime={qtime}ms queryurl={req.url}"
-        )
+        self.solr_logger.info(f"Solr query: {params['q']}")
+        self.solr_logger.debug(f"Solr query metadata: qtime={qtime}ms queryurl={url}")
+
+        return results
+
+
+class AsyncSearchEngine(SearchEngine):
+    """
+    asyncio variant of SearchEngine. Queries are made with the same parameters
+    as SearchEngine, but the search functions are coroutines that don't block
+    the event loop while waiting on Solr.
+    """
+
+    def __init__(
+        self,
+        solr_url: Optional[str] = None,
+        pool: Optional[AsyncSolrConnectionPool] = None,
+        cache: Optional[SearchResultCache] = None,
+    ):
+        super().__init__(solr_url=solr_url, pool=pool, cache=cache)
+
+    @property
+    def pool(self) -> AsyncSolrConnectionPool:
+        if self._pool is None:
+            self._pool = get_async_connection_pool()
+        return self._pool
+
+    """
+    Search functions
+    """
+
+    async def basic_search(self, query: Dict[str, List[str]]):
+        """
+        Coroutine version of SearchEngine.basic_search.
+        """
+        # The cache client (pylibmc) blocks while it waits on memcached, so
+        # cache lookups are made from a worker thread.
+        cacheable = self._cacheable(query)
+        if cacheable:
+            results = await sync_to_async(self.cache.get, thread_sensitive=False)(query)
+            if results is not None:
+                return results
+
+        params, meta = self._basic_search_params(query)
+        results, url = await self.pool.get(f"{self.solr_url}/spell", params=params)
+        results = self._process_results(results, params, meta, url)
 
+        if cacheable:
+            await sync_to_async(self.cache.set, thread_sensitive=False)(query, results)
         return results
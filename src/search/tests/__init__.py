@@ -1 +1,8 @@
 from .test_forms import *
+from .test_solr import *
+from .test_cache import *
+from .test_indexing import *
+from .test_documents import *
+from .test_api import *
+from .test_snapshots import *
+from .test_conditional import *
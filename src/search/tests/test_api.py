@@ -0,0 +1,140 @@
+"""
+Tests for the search app's JSON API
+"""
+
+import csv
+import io
+import json
+
+from django.core import serializers
+from django.test import tag
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag
+from search.export import EXPORT_FIELDS, export_rows
+from search.views import FullCompendiumView
+from utils.test_utils import UnitTest
+
+
+@tag("search")
+class FullCompendiumViewTestCase(UnitTest):
+    """
+    Tests for the endpoint that exports the entire compendium.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tags = [
+            CompendiumEntryTag.objects.create(tagname=f"tag{ii}") for ii in range(3)
+        ]
+        author = Author.objects.create(authorname="alice")
+        for ii in range(7):
+            entry = CompendiumEntry.objects.create(title=f"Entry {ii}", year=2000 + ii)
+            entry.tags.add(*tags[: ii % 4])
+            entry.authors.add(author)
+
+    def read(self, response) -> list:
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_export_matches_serializer(self):
+        response = self.client.get("/search_all")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/json")
+
+        expected = serializers.serialize("json", CompendiumEntry.objects.order_by("pk"))
+        self.assertEqual(self.read(response), json.loads(expected))
+
+    def test_export_is_read_in_chunks(self):
+        view = FullCompendiumView()
+        view.stream_chunk_size = 3
+        response = view.render_json(CompendiumEntry.objects.all())
+
+        # Every chunk takes one query for the entries and one query for each
+        # of their many-to-many fields, plus a final query that finds no more
+        # entries.
+        with self.assertNumQueries(3 * 3 + 1):
+            entries = self.read(response)
+        self.assertEqual(len(entries), 7)
+        self.assertEqual(entries[2]["fields"]["tags"], [1, 2])
+
+    def test_empty_compendium(self):
+        CompendiumEntry.objects.all().delete()
+        response = self.client.get("/search_all")
+        self.assertEqual(self.read(response), [])
+
+
+@tag("search")
+class ExportFormatTestCase(UnitTest):
+    """
+    Tests for exporting a subset of the compendium's fields as JSON, NDJSON,
+    or CSV.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.entries = [
+            CompendiumEntry.objects.create(
+                title=f"Entry {ii}", year=2000 + ii, publisher_text="ACM"
+            )
+            for ii in range(5)
+        ]
+        self.entries[1].tags.add(
+            CompendiumEntryTag.objects.create(tagname="signatures"),
+            CompendiumEntryTag.objects.create(tagname="encryption"),
+        )
+
+    def export(self, **params) -> str:
+        response = self.client.get("/search_all", params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_ndjson(self):
+        lines = self.export(format="ndjson", fields="id,title,tags").splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(
+            json.loads(lines[1]),
+            {
+                "id": self.entries[1].pk,
+                "title": "Entry 1",
+                "tags": ["encryption", "signatures"],
+            },
+        )
+        self.assertEqual(json.loads(lines[0])["tags"], [])
+
+    def test_csv(self):
+        content = self.export(format="csv", fields="title,year,publisher,tags")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ["title", "year", "publisher", "tags"])
+        self.assertEqual(rows[2], ["Entry 1", "2001", "ACM", "encryption|signatures"])
+        self.assertEqual(len(rows), 6)
+
+    def test_bibtex(self):
+        content = self.export(format="bibtex")
+        self.assertEqual(content.count("@misc{"), 5)
+        self.assertIn("keywords = {encryption, signatures}", content)
+
+        response = self.client.get("/search_all", {"format": "bibtex", "fields": "id"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_json_with_fields(self):
+        entries = json.loads(self.export(fields="id,year"))
+        self.assertEqual(entries[0], {"id": self.entries[0].pk, "year": 2000})
+
+    def test_all_fields(self):
+        entry = json.loads(self.export(format="ndjson").splitlines()[0])
+        self.assertEqual(list(entry), list(EXPORT_FIELDS))
+        self.assertNotIn("owner", entry)
+
+    def test_columns_are_projected(self):
+        rows = export_rows(CompendiumEntry.objects.all(), ["title", "tags"], 2)
+        # Chunks of 2 entries take one query for their titles and one for
+        # their tags, plus a final query that finds no more entries.
+        with self.assertNumQueries(3 * 2 + 1) as queries:
+            self.assertEqual(len(list(rows)), 5)
+        self.assertNotIn("abstract", queries.captured_queries[0]["sql"])
+
+    def test_invalid_params(self):
+        for params in ({"format": "xml"}, {"fields": "title,owner"}):
+            response = self.client.get("/search_all", params)
+            self.assertEqual(response.status_code, 422)
+            self.assertIn("error", response.json())
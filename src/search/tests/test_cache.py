@@ -0,0 +1,117 @@
+"""
+Tests for the search result cache
+"""
+
+from django.db import transaction
+from django.test import override_settings, tag
+from entries.models import CompendiumEntry
+from search.cache import SearchResultCache, corpus_version
+from search.solr import SearchEngine, SolrConnectionPool
+from utils.test_utils import FakeSolrServer, UnitTest
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "search-cache-tests",
+    }
+}
+
+
+@tag("search")
+@override_settings(CACHES=LOCMEM_CACHES)
+class SearchResultCacheTestCase(UnitTest):
+    """
+    Check that repeated searches are served from the cache, and that changes to
+    the compendium invalidate cached results.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache = SearchResultCache(timeout=60)
+        self.cache.cache.clear()
+        self.pool = SolrConnectionPool(max_retries=0)
+        self.query = {"quoted_substrings": [], "words": ["cryptography"]}
+
+    def tearDown(self):
+        self.pool.close()
+
+    def search(self, solr, query=None):
+        engine = SearchEngine(solr_url=solr.url, pool=self.pool, cache=self.cache)
+        return engine.basic_search(self.query if query is None else query)
+
+    def test_repeated_searches_are_cached(self):
+        with FakeSolrServer() as solr:
+            first = self.search(solr)
+            second = self.search(solr)
+
+        self.assertEqual(len(solr.requests), 1)
+        self.assertEqual(first, second)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["sets"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        self.assertIsNone(stats["evictions"])
+
+    def test_equivalent_queries_share_results(self):
+        query = {"quoted_substrings": [], "words": ["Cryptography", "cryptography"]}
+        with FakeSolrServer() as solr:
+            self.search(solr)
+            self.search(solr, query)
+            self.search(solr, {**self.query, "page": 1})
+
+        # Only the request for a different page should have reached Solr
+        self.assertEqual(len(solr.requests), 2)
+
+    def test_filters_are_part_of_key(self):
+        query = {**self.query, "tags": ["a", "b"]}
+        self.assertNotEqual(self.cache.key(self.query), self.cache.key(query))
+        self.assertEqual(
+            self.cache.key(query), self.cache.key({**self.query, "tags": ["b", "a"]})
+        )
+
+    def test_changing_an_entry_invalidates_results(self):
+        with FakeSolrServer() as solr:
+            self.search(solr)
+            with self.captureOnCommitCallbacks(execute=True):
+                entry = CompendiumEntry.objects.create(title="New entry")
+            self.search(solr)
+            self.search(solr)
+            with self.captureOnCommitCallbacks(execute=True):
+                entry.delete()
+            self.search(solr)
+
+        self.assertEqual(len(solr.requests), 3)
+
+    def test_invalidated_when_changes_commit(self):
+        generation = self.cache.generation()
+        version = corpus_version.value()
+
+        with FakeSolrServer() as solr:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    CompendiumEntry.objects.create(title="New entry")
+
+                    # A search made before the change is committed is cached
+                    # under the current generation, and the corpus version
+                    # doesn't change either
+                    self.search(solr)
+                    self.assertEqual(self.cache.generation(), generation)
+                    self.assertEqual(corpus_version.value(), version)
+
+            # Once the change is committed, the results cached during the
+            # transaction are no longer read
+            self.assertEqual(self.cache.generation(), generation + 1)
+            self.assertEqual(corpus_version.value(), version + 1)
+            self.search(solr)
+
+        self.assertEqual(len(solr.requests), 2)
+
+    def test_invalidate_without_generation(self):
+        # Invalidation should work even if the generation counter was evicted
+        self.cache.cache.delete(self.cache.generation_key)
+        self.cache.invalidate()
+        generation = self.cache.generation()
+        self.cache.invalidate()
+        self.assertEqual(self.cache.generation(), generation + 1)
@@ -0,0 +1,115 @@
+"""
+Tests for conditional requests to the search API
+"""
+
+from django.test import override_settings, tag
+from entries.models import CompendiumEntry, CompendiumEntryTag
+from search.cache import corpus_version
+from search.tests.test_cache import LOCMEM_CACHES
+from utils.test_utils import FakeSolrServer, UnitTest, empty_solr_response
+
+
+@tag("search")
+@override_settings(CACHES=LOCMEM_CACHES)
+class FullCompendiumETagTestCase(UnitTest):
+    """
+    Check that the full compendium is only sent to clients whose copy of it
+    is out-of-date.
+    """
+
+    def setUp(self):
+        super().setUp()
+        corpus_version.cache.clear()
+        self.entry = CompendiumEntry.objects.create(title="Entry")
+
+    def test_not_modified(self):
+        response = self.client.get("/search_all")
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        # Revalidating an up-to-date copy doesn't touch the database
+        with self.assertNumQueries(0):
+            response = self.client.get("/search_all", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_the_compendium(self):
+        etag = self.client.get("/search_all")["ETag"]
+
+        # Changes to related objects (which don't save the entry itself) also
+        # change the corpus version, once they're committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.tags.add(CompendiumEntryTag.objects.create(tagname="rsa"))
+            response = self.client.get("/search_all", HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+        response = self.client.get("/search_all", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.delete()
+        response = self.client.get("/search_all", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@tag("search")
+@override_settings(CACHES=LOCMEM_CACHES)
+class BasicSearchETagTestCase(UnitTest):
+    """
+    Check that search results can be revalidated without querying Solr.
+    """
+
+    def setUp(self):
+        super().setUp()
+        corpus_version.cache.clear()
+
+    def test_not_modified(self):
+        with FakeSolrServer(respond=empty_solr_response) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            response = self.client.get("/search_basic", {"query": "rsa"})
+            self.assertEqual(response.status_code, 200)
+            etag = response["ETag"]
+
+            response = self.client.get(
+                "/search_basic", {"query": "rsa"}, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(len(solr.requests), 1)
+
+            # Adding an entry changes the results
+            with self.captureOnCommitCallbacks(execute=True):
+                CompendiumEntry.objects.create(title="RSA")
+            response = self.client.get(
+                "/search_basic", {"query": "rsa"}, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(solr.requests), 2)
+
+    def test_related_objects_change_results(self):
+        tag = CompendiumEntryTag.objects.create(tagname="rsa")
+        with self.captureOnCommitCallbacks(execute=True):
+            CompendiumEntry.objects.create(title="Entry").tags.add(tag)
+
+        with FakeSolrServer(respond=empty_solr_response) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            etag = self.client.get("/search_basic", {"query": "rsa"})["ETag"]
+
+            # Tags are part of the documents in the index, so renaming one
+            # changes the results once the change is committed
+            with self.captureOnCommitCallbacks(execute=True):
+                tag.tagname = "RSA"
+                tag.save()
+                response = self.client.get(
+                    "/search_basic", {"query": "rsa"}, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+
+            response = self.client.get(
+                "/search_basic", {"query": "rsa"}, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(solr.requests), 2)
@@ -0,0 +1,140 @@
+"""
+Tests for converting between compendium entries and Solr documents
+"""
+
+import os
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings, tag
+from django.urls import reverse
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag, Publisher
+from search.documents import build_document, entry_from_document, index_queryset
+from search.solr import get_connection_pool
+from unittest import skipUnless
+from utils.test_utils import FakeSolrServer, UnitTest, empty_solr_response
+
+
+@tag("search")
+class SolrDocumentTestCase(UnitTest):
+    """
+    Tests for building the documents that are sent to Solr, and for
+    reconstructing entries from them.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.entry = CompendiumEntry.objects.create(
+            title="Entry", url="https://example.com", year=2020, publisher_text="ACM",
+        )
+        self.entry.tags.add(
+            CompendiumEntryTag.objects.create(tagname="encryption"),
+            CompendiumEntryTag.objects.create(tagname="Backdoors"),
+        )
+        self.entry.authors.add(
+            Author.objects.create(authorname="alice"),
+            Author.objects.create(authorname="Bob"),
+        )
+
+    def test_build_document(self):
+        entry = index_queryset().get(pk=self.entry.pk)
+        with self.assertNumQueries(0):
+            doc = build_document(entry)
+
+        self.assertEqual(doc["id"], str(entry.pk))
+        self.assertEqual(doc["title"], "Entry")
+        self.assertEqual(doc["url"], "https://example.com")
+        self.assertEqual(doc["year"], 2020)
+        self.assertEqual(doc["publisher"], "ACM")
+
+        # Tags and authors are sorted by codepoint
+        self.assertEqual(doc["tags"], ["Backdoors", "encryption"])
+        self.assertEqual(doc["authors"], ["Bob", "alice"])
+
+        # Fields without values are left out of the document
+        self.assertNotIn("abstract", doc)
+        self.assertNotIn("month", doc)
+
+    def test_publisher(self):
+        # The name of the Publisher takes precedence over publisher_text
+        self.entry.publisher = Publisher.objects.create(publishername="IACR")
+        self.entry.save()
+        self.assertEqual(build_document(self.entry)["publisher"], "IACR")
+
+        entry = CompendiumEntry.objects.create(title="Entry", publisher_text="")
+        self.assertNotIn("publisher", build_document(entry))
+
+    def test_entry_from_document(self):
+        doc = build_document(self.entry)
+        with self.assertNumQueries(0):
+            entry = entry_from_document(doc)
+            self.assertEqual(entry.pk, self.entry.pk)
+            self.assertEqual(entry.publisher_text, "ACM")
+            self.assertEqual(entry.all_authors, "Bob, alice")
+            self.assertEqual(
+                [tag.tagname for tag in entry.tags.all()], ["Backdoors", "encryption"]
+            )
+
+    def test_search_results_do_not_query_database(self):
+        doc = build_document(self.entry)
+
+        def respond(params):
+            results = empty_solr_response(params)
+            results["response"].update({"numFound": 1, "docs": [doc]})
+            return results
+
+        with FakeSolrServer(respond=respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse("search"), {"query": "entry"})
+
+        self.assertContains(response, "Bob, alice")
+        self.assertContains(response, "Backdoors")
+        self.assertEqual(
+            set(solr.requests[0]["params"]["fl"].split(",")),
+            {"id", "title", "abstract", "slug", "url", "year", "month", "day"}
+            | {"publisher", "tags", "authors"},
+        )
+
+    def test_related_changes_touch_entry(self):
+        # Changing an entry's tags should update its last_modified, so that
+        # the DataImportHandler's delta-import will reindex it
+        last_modified = self.entry.last_modified
+        self.entry.tags.clear()
+        self.entry.refresh_from_db()
+        self.assertGreater(self.entry.last_modified, last_modified)
+
+        last_modified = self.entry.last_modified
+        author = Author.objects.get(authorname="alice")
+        author.authorname = "Alice"
+        author.save()
+        self.entry.refresh_from_db()
+        self.assertGreater(self.entry.last_modified, last_modified)
+
+    @skipUnless(connection.vendor == "postgresql", "Requires PostgreSQL")
+    def test_dataimport_query_matches_build_document(self):
+        # Run the query used by the DataImportHandler, and check that it
+        # produces the same documents as build_document.
+        setup_script = os.path.join(
+            settings.BASE_DIR, os.pardir, "docker", "solr", "setup.sh"
+        )
+        with open(setup_script, "r") as f:
+            script = f.read()
+        query = re.search(r'ENTRIES_QUERY="(.*?)"\n', script, re.DOTALL).group(1)
+        query = query.replace("\\\n", "").replace("&quot;", '"')
+
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        for row in rows:
+            doc = {k: v for (k, v) in row.items() if v is not None}
+            doc["id"] = str(doc["id"])
+            for field in ("tags", "authors"):
+                if field in doc:
+                    doc[field] = doc[field].split("|")
+            entry = index_queryset().get(pk=row["id"])
+            self.assertEqual(doc, build_document(entry))
@@ -2,8 +2,11 @@
 Tests for forms in the search app
 """
 
-from django.test import tag
-from search.forms import BasicSearchForm
+import datetime
+
+from django.http import QueryDict
+from django.test import override_settings, tag
+from search.forms import AdvancedSearchForm, BasicSearchForm
 from utils.test_utils import UnitTest
 
 
@@ -37,3 +40,90 @@ class BasicSearchFormTest(UnitTest):
         self.assertTrue(form.is_valid())
         self.assertEqual(form.cleaned_data["quoted_substrings"], ["a cat"])
         self.assertEqual(form.cleaned_data["words"], ["a", "dog", "a", "horse"])
+
+    def test_facet_selections(self):
+        """The form should accept any number of values for each facet."""
+
+        data = QueryDict("query=crypto&tags=a&tags=b&publisher=ACM&year=1990")
+        form = BasicSearchForm(data=data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["tags"], ["a", "b"])
+        self.assertEqual(form.cleaned_data["publisher"], ["ACM"])
+        self.assertEqual(form.cleaned_data["year"], [1990])
+
+        form = BasicSearchForm(data={"query": "crypto"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["tags"], [])
+
+        form = BasicSearchForm(data=QueryDict("query=crypto&year=nineties"))
+        self.assertFalse(form.is_valid())
+
+    @override_settings(SEARCH_MAX_ROWS=50)
+    def test_rows_are_capped(self):
+        form = BasicSearchForm(data={"query": "crypto", "rows": 1000})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["rows"], 50)
+
+        for rows in (0, -1):
+            form = BasicSearchForm(data={"query": "crypto", "rows": rows})
+            self.assertFalse(form.is_valid())
+
+    def test_cursor(self):
+        form = BasicSearchForm(data={"query": "crypto"})
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.cleaned_data["cursor"])
+
+        form = BasicSearchForm(data={"query": "crypto", "cursor": "*"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["cursor"], "*")
+
+        form = BasicSearchForm(data={"query": "crypto", "cursor": "???"})
+        self.assertFalse(form.is_valid())
+
+
+@tag("search", "forms")
+class AdvancedSearchFormTest(UnitTest):
+    """
+    Check that AdvancedSearchForm separates the search string from the filters
+    applied to the results.
+    """
+
+    def setUp(self):
+        pass
+
+    def test_all_fields_are_optional(self):
+        form = AdvancedSearchForm(data={})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["words"], [])
+        self.assertEqual(form.cleaned_data["authors"], [])
+        self.assertEqual(form.cleaned_data["publisher"], [])
+        self.assertIsNone(form.cleaned_data["published_after"])
+        self.assertEqual(form.cleaned_data["rows"], 20)
+        self.assertEqual(form.cleaned_data["page"], 0)
+
+    def test_filters(self):
+        data = QueryDict(
+            "search_string=%22public+key%22+rsa"
+            "&authors=Diffie,+W.;+Hellman,+M.&authors=Rivest"
+            "&tags=encryption,+signatures"
+            "&published_by=+ACM+"
+            "&published_after=1976-01-01&published_before=1990-12-31"
+        )
+        form = AdvancedSearchForm(data=data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["quoted_substrings"], ["public key"])
+        self.assertEqual(form.cleaned_data["words"], ["rsa"])
+        self.assertEqual(
+            form.cleaned_data["authors"], ["Diffie, W.", "Hellman, M.", "Rivest"]
+        )
+        self.assertEqual(form.cleaned_data["tags"], ["encryption", "signatures"])
+        self.assertEqual(form.cleaned_data["publisher"], ["ACM"])
+        self.assertNotIn("published_by", form.cleaned_data)
+        self.assertEqual(
+            form.cleaned_data["published_after"], datetime.date(1976, 1, 1)
+        )
+
+    def test_date_range_must_be_ordered(self):
+        data = {"published_after": "2000-01-01", "published_before": "1990-01-01"}
+        form = AdvancedSearchForm(data=data)
+        self.assertFalse(form.is_valid())
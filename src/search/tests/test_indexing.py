@@ -0,0 +1,251 @@
+"""
+Tests for pushing changes to compendium entries into Solr
+"""
+
+import io
+import json
+
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import transaction
+from django.test import tag
+from django.utils import timezone
+from entries.models import CompendiumEntry, CompendiumEntryTag
+from search.indexing import OutboxWorker, SolrIndexer
+from search.models import IndexUpdate
+from search.solr import SolrConnectionPool
+from utils.test_utils import FakeSolrServer, UnitTest
+
+
+def sent_documents(solr):
+    """
+    Get all of the documents (and deletions) that were sent to a
+    FakeSolrServer's update handler.
+    """
+    docs, deletes = [], []
+    for req in solr.requests:
+        if req["path"].endswith("/update") and req["body"]:
+            payload = json.loads(req["body"])
+            if isinstance(payload, list):
+                docs += payload
+            else:
+                deletes += payload["delete"]
+    return docs, deletes
+
+
+@tag("search")
+class SolrIndexerTestCase(UnitTest):
+    """
+    Tests for sending documents to Solr.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pool = SolrConnectionPool(max_retries=0)
+        self.entries = [
+            CompendiumEntry.objects.create(title=f"Entry {ii}", year=2000 + ii)
+            for ii in range(5)
+        ]
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_documents_are_sent_in_batches(self):
+        with FakeSolrServer() as solr:
+            indexer = SolrIndexer(
+                solr_url=solr.url, pool=self.pool, commit_within=500, batch_size=2
+            )
+            indexer.add(self.entries)
+            indexer.delete([1, 2, 3])
+
+        self.assertEqual(len(solr.requests), 5)
+        for req in solr.requests:
+            self.assertEqual(req["params"]["commitWithin"], "500")
+
+        docs, deletes = sent_documents(solr)
+        self.assertEqual([d["title"] for d in docs], [e.title for e in self.entries])
+        self.assertEqual(deletes, ["1", "2", "3"])
+
+
+@tag("search")
+class IndexOutboxTestCase(UnitTest):
+    """
+    Check that changes to compendium entries are recorded in the search index
+    outbox.
+    """
+
+    def pending(self):
+        return list(
+            IndexUpdate.objects.pending()
+            .order_by("id")
+            .values_list("entry_id", "action")
+        )
+
+    def test_saving_and_deleting_entries(self):
+        entry = CompendiumEntry.objects.create(title="Entry")
+        pk = entry.pk
+        entry.title = "New title"
+        entry.save()
+        entry.delete()
+
+        self.assertEqual(
+            self.pending(),
+            [
+                (pk, IndexUpdate.UPDATE),
+                (pk, IndexUpdate.UPDATE),
+                (pk, IndexUpdate.DELETE),
+            ],
+        )
+
+    def test_changing_tags(self):
+        entries = [CompendiumEntry.objects.create(title=f"E{ii}") for ii in range(3)]
+        tag = CompendiumEntryTag.objects.create(tagname="cryptography")
+        IndexUpdate.objects.all().delete()
+
+        entries[0].tags.add(tag)
+        self.assertEqual(self.pending(), [(entries[0].pk, IndexUpdate.UPDATE)])
+
+        tag.compendiumentry_set.add(entries[1], entries[2])
+        tag.compendiumentry_set.clear()
+        self.assertEqual(
+            set(pk for (pk, _) in self.pending()), set(entry.pk for entry in entries)
+        )
+
+    def test_outbox_is_written_in_same_transaction(self):
+        # If saving an entry is rolled back, then so is the outbox row
+        try:
+            with transaction.atomic():
+                CompendiumEntry.objects.create(title="Entry")
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(IndexUpdate.objects.depth(), 0)
+
+    def test_depth_and_age(self):
+        self.assertEqual(IndexUpdate.objects.depth(), 0)
+        self.assertIsNone(IndexUpdate.objects.oldest_pending_age())
+
+        CompendiumEntry.objects.create(title="Entry")
+        IndexUpdate.objects.update(created=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(IndexUpdate.objects.depth(), 1)
+        self.assertGreaterEqual(
+            IndexUpdate.objects.oldest_pending_age(), timedelta(minutes=5)
+        )
+
+
+@tag("search")
+class OutboxWorkerTestCase(UnitTest):
+    """
+    Tests for sending changes from the outbox to Solr.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pool = SolrConnectionPool(max_retries=0)
+        self.entry = CompendiumEntry.objects.create(title="Entry")
+
+    def tearDown(self):
+        self.pool.close()
+
+    def worker(self, solr_url, **kwargs):
+        indexer = SolrIndexer(solr_url=solr_url, pool=self.pool)
+        return OutboxWorker(indexer=indexer, **kwargs)
+
+    def test_repeated_changes_are_deduplicated(self):
+        for _ in range(10):
+            self.entry.save()
+        IndexUpdate.objects.record([12345], IndexUpdate.DELETE)
+
+        with FakeSolrServer() as solr:
+            worker = self.worker(solr.url)
+            self.assertEqual(worker.drain(), 12)
+            self.assertEqual(IndexUpdate.objects.depth(), 0)
+            self.assertIsNotNone(worker.last_lag)
+
+        # All of the changes should have been sent in one batch, which Solr
+        # commits within commitWithin (rather than with an explicit commit)
+        docs, deletes = sent_documents(solr)
+        self.assertEqual(len(docs), 1)
+        self.assertEqual(docs[0]["id"], str(self.entry.pk))
+        self.assertEqual(deletes, ["12345"])
+        for request in solr.requests:
+            self.assertIn("commitWithin", request["params"])
+            self.assertNotIn("softCommit", request["params"])
+
+    def test_claimed_rows_are_skipped(self):
+        # Rows that a worker is sending to Solr aren't picked up by others,
+        # until their claim expires
+        worker = self.worker("http://127.0.0.1:9/solr/compendium")
+        self.assertEqual(len(worker._claim()), 1)
+        self.assertEqual(IndexUpdate.objects.due().count(), 0)
+        self.assertEqual(worker._claim(), [])
+
+        IndexUpdate.objects.update(next_attempt=timezone.now())
+        self.assertEqual(len(worker._claim()), 1)
+
+    def test_deleted_entries_are_removed(self):
+        # If an entry is updated and deleted before the worker gets to it,
+        # then it should be removed from the index.
+        pk = self.entry.pk
+        self.entry.delete()
+        with FakeSolrServer() as solr:
+            self.worker(solr.url).drain()
+
+        docs, deletes = sent_documents(solr)
+        self.assertEqual(docs, [])
+        self.assertEqual(deletes, [str(pk)])
+
+    def test_batches(self):
+        for ii in range(4):
+            CompendiumEntry.objects.create(title=f"Entry {ii}")
+
+        with FakeSolrServer() as solr:
+            worker = self.worker(solr.url, batch_size=2)
+            self.assertEqual(worker.process_batch(), 2)
+            self.assertEqual(IndexUpdate.objects.depth(), 3)
+            self.assertEqual(worker.drain(), 3)
+
+    def test_backoff_when_solr_is_unavailable(self):
+        # Nothing is listening on port 9 (the discard port)
+        worker = self.worker("http://127.0.0.1:9/solr/compendium", max_backoff=60)
+        self.assertEqual(worker.process_batch(), 0)
+
+        update = IndexUpdate.objects.get()
+        self.assertIsNone(update.processed)
+        self.assertEqual(update.attempts, 1)
+        self.assertGreater(update.next_attempt, timezone.now())
+        self.assertNotEqual(update.last_error, "")
+
+        # The update shouldn't be retried until it's due
+        self.assertEqual(IndexUpdate.objects.due().count(), 0)
+        IndexUpdate.objects.update(next_attempt=timezone.now())
+        with FakeSolrServer() as solr:
+            self.assertEqual(self.worker(solr.url).process_batch(), 1)
+
+    def test_prune(self):
+        with FakeSolrServer() as solr:
+            worker = self.worker(solr.url)
+            worker.drain()
+        self.assertEqual(worker.prune(timedelta(days=1)), 0)
+        self.assertEqual(worker.prune(timedelta(seconds=-1)), 1)
+
+    def test_prune_keeps_tombstones(self):
+        # The latest deletion of each entry is never pruned, since Solr's
+        # delta-import relies on it to remove the entry from the index
+        pk = self.entry.pk
+        self.entry.delete()
+        IndexUpdate.objects.record([pk], IndexUpdate.DELETE)
+        with FakeSolrServer() as solr:
+            worker = self.worker(solr.url)
+            worker.drain()
+
+        self.assertEqual(worker.prune(timedelta(seconds=-1)), 2)
+        tombstone = IndexUpdate.objects.get()
+        self.assertEqual(tombstone.entry_id, pk)
+        self.assertEqual(tombstone.action, IndexUpdate.DELETE)
+        self.assertEqual(tombstone.id, IndexUpdate.objects.order_by("id").last().id)
+
+    def test_status_command(self):
+        out = io.StringIO()
+        call_command("process_index_outbox", "--status", stdout=out)
+        self.assertIn("Outbox depth: 1", out.getvalue())
@@ -0,0 +1,197 @@
+"""
+Tests for the precomputed snapshots of the compendium
+"""
+
+import brotli
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from bibtexparser.bparser import BibTexParser
+from django.core import serializers
+from django.core.management import call_command
+from django.test import override_settings, tag
+from entries.models import Author, CompendiumEntry, CompendiumEntryTag
+from search.cache import corpus_version
+from search.snapshots import CompendiumSnapshots
+from search.tests.test_cache import LOCMEM_CACHES
+from utils.test_utils import UnitTest
+
+
+@tag("search")
+@override_settings(CACHES=LOCMEM_CACHES)
+class CompendiumSnapshotsTestCase(UnitTest):
+    """
+    Tests for writing snapshots of the compendium, and for redirecting the
+    bulk export API to them.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.settings_override = override_settings(
+            SNAPSHOT_ROOT=self.root, SNAPSHOT_URL="/static/snapshots/", SNAPSHOT_KEEP=2
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.snapshots = CompendiumSnapshots(chunk_size=2)
+        corpus_version.cache.clear()
+
+        for ii in range(3):
+            entry = CompendiumEntry.objects.create(
+                title=f"Entry {ii}", year=2000 + ii, month=ii + 1, publisher_text="ACM"
+            )
+            entry.tags.add(CompendiumEntryTag.objects.get_or_create(tagname="rsa")[0])
+            entry.authors.add(Author.objects.get_or_create(authorname="Alice")[0])
+
+    def read(self, name: str) -> str:
+        path = os.path.join(self.root, name)
+        with gzip.open(path + ".gz", "rb") as f:
+            data = f.read()
+        with open(path + ".br", "rb") as f:
+            self.assertEqual(brotli.decompress(f.read()), data)
+        return data.decode("utf-8")
+
+    def test_build(self):
+        manifest = self.snapshots.build()
+        self.assertEqual(manifest["state"]["entries"], 3)
+        self.assertEqual(self.snapshots.latest(), manifest)
+        files = manifest["files"]
+
+        # The JSON snapshot is the same as the (unredirected) API response
+        expected = serializers.serialize("json", CompendiumEntry.objects.order_by("pk"))
+        self.assertEqual(
+            json.loads(self.read(files["json"]["name"])), json.loads(expected)
+        )
+
+        lines = self.read(files["ndjson"]["name"]).splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[0])["tags"], ["rsa"])
+
+        # The BibTeX snapshot can be read by the BibTeX upload form
+        bibtex = BibTexParser(common_strings=True).parse(
+            self.read(files["bibtex"]["name"])
+        )
+        self.assertEqual(len(bibtex.entries), 3)
+        entry = bibtex.entries_dict[f"compendium{CompendiumEntry.objects.first().pk}"]
+        self.assertEqual(entry["title"], "{Entry 0}")
+        self.assertEqual(entry["author"], "{Alice}")
+        self.assertEqual(entry["month"], "January")
+        self.assertEqual(entry["keywords"], "rsa")
+
+    def test_only_rebuilt_when_compendium_changes(self):
+        self.assertTrue(self.snapshots.is_stale())
+        first = self.snapshots.build()
+        self.assertFalse(self.snapshots.is_stale())
+        self.assertIsNone(self.snapshots.build())
+
+        CompendiumEntry.objects.first().delete()
+        self.assertTrue(self.snapshots.is_stale())
+        second = self.snapshots.build()
+        self.assertNotEqual(first["version"], second["version"])
+        self.assertEqual(second["state"]["entries"], 2)
+
+        entry = CompendiumEntry.objects.first()
+        entry.title = "New title"
+        entry.save()
+        self.assertTrue(self.snapshots.is_stale())
+
+    def test_old_versions_are_pruned(self):
+        versions = [self.snapshots.build(force=True)["version"] for _ in range(3)]
+        names = os.listdir(self.root)
+        self.assertFalse(any(versions[0] in name for name in names))
+        self.assertTrue(any(versions[1] in name for name in names))
+        self.assertTrue(any(versions[2] in name for name in names))
+
+    def test_api_redirects_to_latest_snapshot(self):
+        # Without a snapshot, the export is streamed from the database
+        response = self.client.get("/search_all")
+        self.assertEqual(response.status_code, 200)
+
+        manifest = self.snapshots.build()
+        files = manifest["files"]
+        response = self.client.get("/search_all")
+        self.assertRedirects(
+            response,
+            f"/static/snapshots/{files['json']['name']}",
+            fetch_redirect_response=False,
+        )
+
+        response = self.client.get(
+            "/search_all", {"format": "bibtex"}, HTTP_ACCEPT_ENCODING="gzip, br"
+        )
+        self.assertRedirects(
+            response,
+            f"/static/snapshots/{files['bibtex']['br']}",
+            fetch_redirect_response=False,
+        )
+
+        response = self.client.get(
+            "/search_all", {"format": "ndjson"}, HTTP_ACCEPT_ENCODING="br;q=0, gzip"
+        )
+        self.assertRedirects(
+            response,
+            f"/static/snapshots/{files['ndjson']['name']}",
+            fetch_redirect_response=False,
+        )
+
+        # Exports of a subset of fields (or in other formats) aren't redirected
+        response = self.client.get("/search_all", {"fields": "id,title"})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get("/search_all", {"format": "csv"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_api_streams_changed_compendium(self):
+        self.snapshots.build()
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = CompendiumEntry.objects.first()
+            entry.title = "New title"
+            entry.save()
+
+        # The snapshot is out-of-date, so the export is streamed from the
+        # database (along with the ETag of the current compendium)
+        response = self.client.get("/search_all")
+        self.assertEqual(response.status_code, 200)
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertIn("New title", content)
+
+        manifest = self.snapshots.build()
+        response = self.client.get("/search_all")
+        self.assertRedirects(
+            response,
+            f"/static/snapshots/{manifest['files']['json']['name']}",
+            fetch_redirect_response=False,
+        )
+
+    def test_latest_url_does_not_query_compendium(self):
+        manifest = self.snapshots.build()
+        with self.assertNumQueries(0):
+            url = self.snapshots.latest_url("json")
+        self.assertEqual(url, f"/static/snapshots/{manifest['files']['json']['name']}")
+
+    def test_corpus_version_is_refreshed(self):
+        # If the corpus version is lost (e.g. evicted from the cache), the
+        # snapshot isn't used until the manifest is rebuilt with the new
+        # version, which doesn't require writing the snapshot again
+        manifest = self.snapshots.build()
+        corpus_version.cache.clear()
+        self.assertIsNone(self.snapshots.latest_url("json"))
+
+        self.assertIsNone(self.snapshots.build())
+        latest = self.snapshots.latest()
+        self.assertEqual(latest["version"], manifest["version"])
+        self.assertEqual(latest["corpus_version"], corpus_version.value())
+        self.assertIsNotNone(self.snapshots.latest_url("json"))
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("build_snapshots", stdout=out)
+        self.assertIn("Wrote snapshot", out.getvalue())
+
+        out = io.StringIO()
+        call_command("build_snapshots", stdout=out)
+        self.assertIn("up-to-date", out.getvalue())
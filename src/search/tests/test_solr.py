@@ -0,0 +1,633 @@
+"""
+Tests for the code that connects the site to Solr
+"""
+
+import asyncio
+import datetime
+import io
+import os
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import override_settings, tag
+from django.urls import reverse
+from search.cache import SearchResultCache
+from search.solr import (
+    AsyncSearchEngine,
+    AsyncSolrConnectionPool,
+    SearchEngine,
+    SolrConnectionPool,
+    SolrQueryError,
+    decode_cursor,
+    encode_cursor,
+)
+from search.tests.test_cache import LOCMEM_CACHES
+from unittest import skipUnless
+from utils.test_utils import FakeSolrServer, UnitTest, empty_solr_response
+from xml.etree import ElementTree
+
+SOLR_SCHEMA = os.path.join(
+    settings.BASE_DIR, os.pardir, "docker", "solr", "conf", "managed-schema"
+)
+
+
+@tag("search")
+class SolrConnectionPoolTestCase(UnitTest):
+    """
+    Check that SearchEngine reuses connections from its pool when it queries
+    Solr.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pool = SolrConnectionPool(pool_size=2, max_retries=0)
+        self.query = {"quoted_substrings": [], "words": ["cryptography"]}
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_stats_before_any_requests(self):
+        stats = self.pool.stats()
+        self.assertEqual(stats["pool_size"], 2)
+        self.assertEqual(stats["created"], 0)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertEqual(stats["idle"], 0)
+
+    def test_connections_are_reused(self):
+        with FakeSolrServer() as solr:
+            engine = SearchEngine(solr_url=solr.url, pool=self.pool)
+            for _ in range(5):
+                results = engine.basic_search(self.query)
+                self.assertEqual(results["response"]["numFound"], 0)
+
+            # Every query should have gone over the same keep-alive connection
+            self.assertEqual(len(solr.requests), 5)
+            stats = engine.pool_stats()
+            self.assertEqual(stats["requests"], 5)
+            self.assertEqual(stats["created"], 1)
+            self.assertEqual(stats["idle"], 1)
+            self.assertEqual(stats["in_use"], 0)
+
+    def test_basic_search_does_not_modify_query(self):
+        query = {"quoted_substrings": ["hello, world"], "words": ["a"]}
+        with FakeSolrServer() as solr:
+            engine = SearchEngine(solr_url=solr.url, pool=self.pool)
+            engine.basic_search(query)
+        self.assertEqual(query["quoted_substrings"], ["hello, world"])
+
+
+@tag("search")
+class SubstringQueryTestCase(UnitTest):
+    """
+    Check the queries used to match substrings of titles and abstracts.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.engine = SearchEngine()
+
+    def test_tokens_use_ngram_field(self):
+        self.assertEqual(
+            self.engine.substring_query("crypt"), 'basic_search_ngram:"crypt"'
+        )
+        self.assertEqual(
+            self.engine.substring_query("hello, world"),
+            'basic_search_ngram:"hello, world"',
+        )
+
+    def test_multiple_words_match_loosely(self):
+        # Multi-word tokens are phrase queries on the n-gram field, in which
+        # all of the n-grams of a word share its position. The phrase matches
+        # consecutive words that contain each word of the token, in order
+        # ("Othello worldwide" as well as "hello world", but not "world
+        # hello"), which is looser than a literal substring match, but never
+        # misses one. Single tokens shorter than the n-grams still fall back
+        # to wildcard queries.
+        query = {"quoted_substrings": ["hello world", "world hello"], "words": ["a"]}
+        with FakeSolrServer() as solr:
+            pool = SolrConnectionPool(max_retries=0)
+            SearchEngine(solr_url=solr.url, pool=pool).basic_search(query)
+            pool.close()
+
+        self.assertEqual(
+            solr.requests[0]["params"]["q"],
+            'basic_search_ngram:"hello world" && basic_search_ngram:"world hello" '
+            "&& basic_search:*a*",
+        )
+
+    @skipUnless(os.path.exists(SOLR_SCHEMA), "The Solr schema isn't available")
+    def test_ngram_sizes_match_schema(self):
+        # The n-gram range that SearchEngine assumes has to be the one that
+        # the basic_search_ngram field (of type text_ngram) is indexed with
+        schema = ElementTree.parse(SOLR_SCHEMA).getroot()
+        field = schema.find("field[@name='basic_search_ngram']")
+        self.assertEqual(field.get("type"), "text_ngram")
+        ngrams = schema.find(
+            "fieldType[@name='text_ngram']/analyzer[@type='index']"
+            "/filter[@class='solr.NGramFilterFactory']"
+        )
+        self.assertEqual(int(ngrams.get("minGramSize")), self.engine.ngram_min_size)
+        self.assertEqual(int(ngrams.get("maxGramSize")), self.engine.ngram_max_size)
+
+    def test_tokens_outside_ngram_range(self):
+        # Tokens that are too short or too long to have been indexed as
+        # n-grams fall back to wildcard queries.
+        self.assertEqual(self.engine.substring_query("a"), "basic_search:*a*")
+        long_token = "x" * (self.engine.ngram_max_size + 1)
+        self.assertEqual(
+            self.engine.substring_query(long_token), f"basic_search:*{long_token}*"
+        )
+        self.assertEqual(
+            self.engine.substring_query("a cipher"),
+            '(basic_search:*a* && basic_search_ngram:"cipher")',
+        )
+
+    def test_empty_query_matches_everything(self):
+        with FakeSolrServer() as solr:
+            pool = SolrConnectionPool(max_retries=0)
+            SearchEngine(solr_url=solr.url, pool=pool).basic_search({})
+            pool.close()
+        self.assertEqual(solr.requests[0]["params"]["q"], "*:*")
+
+    def test_benchmark_command(self):
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            out = io.StringIO()
+            call_command(
+                "benchmark_search",
+                "--benchmark=ngram",
+                "--entries=25",
+                "--batch-size=10",
+                "--queries=5",
+                stdout=out,
+            )
+
+        updates = [r for r in solr.requests if r["path"].endswith("/update")]
+        selects = [r for r in solr.requests if r["path"].endswith("/select")]
+
+        # 3 batches of documents + commit + delete
+        self.assertEqual(len(updates), 5)
+        # 2 warmup queries + 2 queries for each token
+        self.assertEqual(len(selects), 12)
+        self.assertIn("n-gram", out.getvalue())
+
+    def test_filter_cache_benchmark(self):
+        lookups = []
+
+        def respond(params):
+            if params.get("cat") != "CACHE":
+                return empty_solr_response(params)
+            # Pretend that every other filter query was found in the cache
+            lookups.append(len(lookups))
+            prefix = "CACHE.searcher.filterCache"
+            stats = {f"{prefix}.lookups": 10 * len(lookups)}
+            stats[f"{prefix}.hits"] = 5 * len(lookups)
+            return {"solr-mbeans": ["CACHE", {"filterCache": {"stats": stats}}]}
+
+        with FakeSolrServer(respond=respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            out = io.StringIO()
+            call_command(
+                "benchmark_search",
+                "--benchmark=filters",
+                "--entries=10",
+                "--queries=5",
+                "--filter-combinations=3",
+                stdout=out,
+            )
+
+        # Stats are read before and after running each strategy
+        self.assertEqual(len(lookups), 4)
+
+        selects = [r for r in solr.requests if r["path"].endswith("/select")]
+        self.assertEqual(len(selects), 10)
+        for request in selects:
+            self.assertEqual(request["params"]["fq"][0], "id:bench-*")
+        # Filters are sent as separate filter queries, and then combined into
+        # a single filter query
+        self.assertGreater(max(len(r["params"]["fq"]) for r in selects[:5]), 2)
+        for request in selects[5:]:
+            self.assertEqual(len(request["params"]["fq"]), 2)
+
+        output = out.getvalue()
+        self.assertIn("separate", output)
+        self.assertIn("combined", output)
+        self.assertIn("50.0%", output)
+
+
+@tag("search")
+class FacetedSearchTestCase(UnitTest):
+    """
+    Tests for refining search results by facets.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.engine = SearchEngine()
+
+    def respond(self, params):
+        results = empty_solr_response(params)
+        results["facet_counts"] = {
+            "facet_fields": {
+                "tags": ["encryption", 3, 'quote"d', 1],
+                "publisher": ["ACM", 2],
+            },
+            "facet_ranges": {"year": {"counts": ["1990", 1, "2000", 2], "gap": 10},},
+        }
+        return results
+
+    def test_filter_queries(self):
+        query = {"tags": ["b", 'quote"d', "b"], "publisher": ["ACM", "IEEE"]}
+        query["year"] = [2000, 1990]
+        self.assertEqual(
+            self.engine.filter_queries(query),
+            [
+                'tags:"b"',
+                'tags:"quote\\"d"',
+                'publisher:("ACM" OR "IEEE")',
+                "year:([1990 TO 1999] OR [2000 TO 2009])",
+            ],
+        )
+        self.assertEqual(self.engine.filter_queries({}), [])
+
+    def test_advanced_filter_queries(self):
+        query = {"authors": ["Rivest", "Diffie, W."], "tags": ["rsa"]}
+        query["published_after"] = datetime.date(1976, 6, 1)
+        self.assertEqual(
+            self.engine.filter_queries(query),
+            [
+                'tags:"rsa"',
+                'authors:"Diffie, W."',
+                'authors:"Rivest"',
+                "year:[1976 TO *]",
+            ],
+        )
+
+        query = {"published_before": datetime.date(1990, 1, 1)}
+        self.assertEqual(self.engine.filter_queries(query), ["year:[* TO 1990]"])
+
+    def test_facets_are_requested_with_query(self):
+        with FakeSolrServer() as solr:
+            pool = SolrConnectionPool(max_retries=0)
+            engine = SearchEngine(solr_url=solr.url, pool=pool)
+            engine.basic_search({"words": ["crypto"], "tags": ["encryption"]})
+            pool.close()
+
+        self.assertEqual(len(solr.requests), 1)
+        params = solr.requests[0]["params"]
+        self.assertEqual(params["facet"], "true")
+        self.assertEqual(params["facet.field"], ["tags", "publisher"])
+        self.assertEqual(params["facet.range"], "year")
+        self.assertEqual(params["fq"], 'tags:"encryption"')
+
+    def test_refinement_links(self):
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            response = self.client.get(
+                reverse("search"), {"query": "crypto", "tags": "encryption", "page": 2}
+            )
+
+        self.assertEqual(solr.requests[0]["params"]["fq"], 'tags:"encryption"')
+
+        facets = {f["name"]: f for f in response.context["facets"]}
+        self.assertEqual(list(facets), ["tags", "publisher", "year"])
+
+        # Selecting a facet adds it to the filters, while deselecting a facet
+        # removes it. Both reset the page number.
+        tags = {v["value"]: v for v in facets["tags"]["values"]}
+        self.assertTrue(tags["encryption"]["selected"])
+        self.assertEqual(tags["encryption"]["url"], "?query=crypto")
+        self.assertFalse(tags['quote"d']["selected"])
+        self.assertEqual(
+            tags['quote"d']["url"], "?query=crypto&tags=encryption&tags=quote%22d"
+        )
+
+        years = facets["year"]["values"]
+        self.assertEqual(years[0]["label"], "1990\u20131999")
+        self.assertEqual(years[0]["count"], 1)
+        self.assertContains(response, "publisher=ACM")
+
+        # Pagination links keep the selected filters
+        self.assertEqual(
+            response.context["search_params"], "query=crypto&tags=encryption"
+        )
+
+    def test_invalid_facets(self):
+        params = {"query": "crypto", "year": "abc"}
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            for name in ("search", "async search"):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(response.status_code, 422)
+                self.assertTemplateUsed(response, "entry_list.html")
+                self.assertContains(response, "Years must be integers", status_code=422)
+                self.assertEqual(response.context["query"], "crypto")
+
+        self.assertEqual(len(solr.requests), 0)
+
+
+@tag("search")
+class CursorPaginationTestCase(UnitTest):
+    """
+    Tests for paging through search results with Solr's cursorMark.
+    """
+
+    def respond(self, params):
+        # Return two pages of results: Solr returns the cursorMark that it was
+        # given on the last page.
+        results = empty_solr_response(params)
+        results["response"]["numFound"] = 3
+        if params.get("cursorMark") == "*":
+            results["nextCursorMark"] = "AoE/page+2"
+        else:
+            results["nextCursorMark"] = params.get("cursorMark")
+        return results
+
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor("AoE/page+2")
+        self.assertNotIn("/", cursor)
+        self.assertNotIn("+", cursor)
+        self.assertEqual(decode_cursor(cursor), "AoE/page+2")
+        self.assertEqual(decode_cursor("*"), "*")
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor!")
+
+    def test_cursor_params(self):
+        with FakeSolrServer(respond=self.respond) as solr:
+            pool = SolrConnectionPool(max_retries=0)
+            engine = SearchEngine(solr_url=solr.url, pool=pool)
+            first = engine.basic_search({"words": ["crypto"], "cursor": "*"})
+            last = engine.basic_search({"words": ["crypto"], "cursor": "AoE/page+2"})
+            engine.basic_search({"words": ["crypto"], "page": 5})
+            pool.close()
+
+        params = solr.requests[0]["params"]
+        self.assertEqual(params["cursorMark"], "*")
+        self.assertEqual(params["sort"], "score desc,id asc")
+        self.assertEqual(params["start"], "0")
+        self.assertNotIn("facet", params)
+
+        self.assertEqual(first["meta"]["next_cursor"], encode_cursor("AoE/page+2"))
+        self.assertIsNone(last["meta"]["next_cursor"])
+
+        # Offset paging is still used when there's no cursor
+        params = solr.requests[2]["params"]
+        self.assertEqual(params["start"], "100")
+        self.assertNotIn("cursorMark", params)
+        self.assertNotIn("sort", params)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cursor_pages_are_not_cached(self):
+        query = {"words": ["crypto"], "cursor": "*"}
+        with FakeSolrServer(respond=self.respond) as solr:
+            pool = SolrConnectionPool(max_retries=0)
+            engine = SearchEngine(solr_url=solr.url, pool=pool)
+            engine.basic_search(query)
+            engine.basic_search(query)
+            pool.close()
+
+        self.assertEqual(len(solr.requests), 2)
+
+    def test_api_pages_with_cursor(self):
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            response = self.client.get("/search_basic", {"query": "crypto"})
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertEqual(data["hits"], 3)
+            self.assertEqual(data["results"], [])
+            self.assertEqual(data["rows"], 20)
+
+            # Follow the cursor to the last page
+            response = self.client.get(
+                "/search_basic", {"query": "crypto", "cursor": data["next_cursor"]}
+            )
+            self.assertIsNone(response.json()["next_cursor"])
+
+            # Page numbers and invalid cursors are rejected
+            response = self.client.get("/search_basic", {"query": "crypto", "page": 3})
+            self.assertEqual(response.status_code, 422)
+            response = self.client.get(
+                "/search_basic", {"query": "crypto", "cursor": "not a cursor!"}
+            )
+            self.assertEqual(response.status_code, 422)
+
+        self.assertEqual(len(solr.requests), 2)
+        self.assertEqual(solr.requests[0]["params"]["cursorMark"], "*")
+        self.assertEqual(solr.requests[1]["params"]["cursorMark"], "AoE/page+2")
+
+    def reject_cursors(self, params):
+        # Solr rejects cursorMarks that it didn't create
+        if params.get("cursorMark") in (None, "*"):
+            return self.respond(params)
+        msg = "Unable to parse 'cursorMark' after totem"
+        return (
+            400,
+            {
+                "responseHeader": {"status": 400, "QTime": 0},
+                "error": {"msg": msg, "code": 400},
+            },
+        )
+
+    def test_solr_rejects_cursor(self):
+        cursor = encode_cursor("not a cursorMark")
+        with FakeSolrServer(respond=self.reject_cursors) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            pool = SolrConnectionPool(max_retries=0)
+            engine = SearchEngine(solr_url=solr.url, pool=pool)
+            with self.assertRaises(SolrQueryError) as cm:
+                engine.basic_search({"words": ["crypto"], "cursor": "not a cursor"})
+            pool.close()
+            self.assertEqual(cm.exception.status_code, 400)
+            self.assertIn("Unable to parse 'cursorMark'", str(cm.exception))
+
+            # The API reports the cursor as invalid, rather than failing
+            for path in ("/search_basic", "/search_basic_async"):
+                response = self.client.get(path, {"query": "crypto", "cursor": cursor})
+                self.assertEqual(response.status_code, 422)
+                self.assertEqual(response.json(), {"error": "Invalid cursor"})
+
+        self.assertEqual(len(solr.requests), 3)
+
+
+@tag("search")
+class AsyncSearchEngineTestCase(UnitTest):
+    """
+    Tests for the asyncio variant of SearchEngine.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.query = {"quoted_substrings": [], "words": ["cryptography"]}
+
+    def test_async_search_matches_sync_search(self):
+        """Both engines should send the same query to Solr."""
+
+        async def search(url):
+            pool = AsyncSolrConnectionPool(pool_size=2, max_retries=0)
+            engine = AsyncSearchEngine(solr_url=url, pool=pool)
+            try:
+                results = [await engine.basic_search(self.query) for _ in range(3)]
+                return results, engine.pool_stats()
+            finally:
+                await pool.close()
+
+        with FakeSolrServer() as solr:
+            results, stats = asyncio.run(search(solr.url))
+            pool = SolrConnectionPool(max_retries=0)
+            SearchEngine(solr_url=solr.url, pool=pool).basic_search(self.query)
+            pool.close()
+
+        self.assertEqual(len(solr.requests), 4)
+        self.assertEqual(solr.requests[0], solr.requests[-1])
+        self.assertEqual(results[0]["meta"], {"page": 0, "rows": 20})
+
+        # The searches should have shared a single keep-alive connection
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["in_use"], 0)
+        self.assertNotIn("idle", stats)
+
+    def test_connections_in_use(self):
+        pool = AsyncSolrConnectionPool(pool_size=2, max_retries=0)
+        in_use = []
+
+        def respond(params):
+            in_use.append(pool.stats()["in_use"])
+            return empty_solr_response(params)
+
+        async def search(url):
+            engine = AsyncSearchEngine(solr_url=url, pool=pool)
+            try:
+                await asyncio.gather(
+                    *(engine.basic_search(self.query) for _ in range(2))
+                )
+            finally:
+                await pool.close()
+
+        with FakeSolrServer(respond=respond) as solr:
+            asyncio.run(search(solr.url))
+
+        self.assertEqual(len(in_use), 2)
+        self.assertGreaterEqual(min(in_use), 1)
+        self.assertEqual(pool.stats()["in_use"], 0)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_cache_is_used_off_the_event_loop(self):
+        class Cache(SearchResultCache):
+            # Record whether each lookup was made from the event loop
+            def get(self, query):
+                try:
+                    asyncio.get_running_loop()
+                    calls.append(True)
+                except RuntimeError:
+                    calls.append(False)
+                return super().get(query)
+
+        calls = []
+        cache = Cache(timeout=60)
+        cache.cache.clear()
+
+        async def search(url):
+            pool = AsyncSolrConnectionPool(max_retries=0)
+            engine = AsyncSearchEngine(solr_url=url, pool=pool, cache=cache)
+            try:
+                return [await engine.basic_search(self.query) for _ in range(2)]
+            finally:
+                await pool.close()
+
+        with FakeSolrServer() as solr:
+            (first, second) = asyncio.run(search(solr.url))
+
+        self.assertEqual(len(solr.requests), 1)
+        self.assertEqual(first, second)
+        self.assertEqual(calls, [False, False])
+
+    def test_async_views(self):
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            response = self.client.get(reverse("async search"), {"query": "crypto"})
+            self.assertEqual(response.status_code, 200)
+            self.assertTemplateUsed(response, "entry_list.html")
+
+            response = self.client.get("/search_basic_async", {"query": "crypto"})
+            self.assertEqual(response.status_code, 200)
+
+            response = self.client.get("/search_basic_async")
+            self.assertEqual(response.status_code, 422)
+
+        self.assertEqual(len(solr.requests), 2)
+
+
+@tag("search")
+class SearchStatsViewTestCase(UnitTest):
+    """
+    Tests for the endpoint reporting search backend statistics.
+    """
+
+    def setUp(self):
+        super().setUp(preauth=True)
+
+    def test_only_staff_can_view_stats(self):
+        response = self.client.get(reverse("search stats"))
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse("search stats"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("solr_pool", response.json())
+
+
+@tag("search")
+class DeltaImportCommandTestCase(UnitTest):
+    """
+    Tests for the command that runs and monitors DataImportHandler imports.
+    """
+
+    def respond(self, params):
+        # Report the import as busy for the first status check, and then
+        # report it as having finished.
+        self.n_status_checks += params["command"] == "status"
+        busy = self.n_status_checks < 2
+        return {
+            "responseHeader": {"status": 0, "QTime": 0},
+            "status": "busy" if busy else "idle",
+            "statusMessages": {
+                "Total Rows Fetched": "10",
+                "Total Documents Processed": "5" if busy else "10",
+                "": "" if busy else "Indexing completed. Added/Updated: 10 documents.",
+            },
+        }
+
+    def test_delta_import(self):
+        self.n_status_checks = 0
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            out = io.StringIO()
+            call_command("solr_delta_import", "--poll-interval=0", stdout=out)
+
+        commands = [r["params"]["command"] for r in solr.requests]
+        self.assertEqual(commands, ["delta-import", "status", "status"])
+        self.assertEqual(solr.requests[0]["params"]["clean"], "false")
+        self.assertIn("Indexing completed", out.getvalue())
+        self.assertIn("documents processed=10", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+
+    def test_full_import(self):
+        self.n_status_checks = 0
+        with FakeSolrServer(respond=self.respond) as solr, override_settings(
+            SOLR_URL=solr.url
+        ):
+            call_command(
+                "solr_delta_import", "--full", "--poll-interval=0", stdout=io.StringIO()
+            )
+
+        params = solr.requests[0]["params"]
+        self.assertEqual(params["command"], "full-import")
+        self.assertEqual(params["clean"], "true")
+        self.assertEqual(params["commit"], "true")
@@ -1,8 +1,18 @@
 from django.conf.urls import url
-from search.views import BasicSearchAPIView, FullCompendiumView, SearchView
+from search.views import (
+    AsyncBasicSearchAPIView,
+    AsyncSearchView,
+    BasicSearchAPIView,
+    FullCompendiumView,
+    SearchStatsView,
+    SearchView,
+)
 
 urlpatterns = [
     url(r"^$", SearchView.as_view(), name="search"),
+    url(r"^_async$", AsyncSearchView.as_view(), name="async search"),
     url(r"_all", FullCompendiumView.as_view()),
+    url(r"_basic_async", AsyncBasicSearchAPIView.as_view()),
     url(r"_basic", BasicSearchAPIView.as_view()),
+    url(r"_stats", SearchStatsView.as_view(), name="search stats"),
 ]
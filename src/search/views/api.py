@@ -3,11 +3,46 @@ REST API for searching the compendium.
 """
 
 import abc
-
-from .mixins import JsonAPIError, JsonResponseMixin, BasicSearchMixin
+import os
+
+from .mixins import (
+    AsyncBasicSearchMixin,
+    AsyncViewMixin,
+    BasicSearchMixin,
+    ExportMixin,
+    JsonAPIError,
+    JsonResponseMixin,
+)
+from django.shortcuts import redirect
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import etag
 from django.views.generic import View, TemplateView
 from entries.models import CompendiumEntry
-from search.solr import SearchEngine
+from search.cache import corpus_version, search_cache
+from search.models import IndexUpdate
+from search.snapshots import compendium_snapshots
+from search.solr import AsyncSearchEngine, SearchEngine
+
+"""
+Validators for conditional requests
+"""
+
+
+def corpus_etag(request, *args, **kwargs) -> str:
+    """
+    ETag for responses that are computed from the entire compendium, which
+    only changes along with the corpus version.
+    """
+    return f"compendium-{corpus_version.value()}"
+
+
+def search_results_etag(request, *args, **kwargs) -> str:
+    """
+    ETag for search results, which only change when the compendium or the Solr
+    index does (i.e. whenever cached search results are invalidated).
+    """
+    return f"search-{search_cache.generation()}"
+
 
 """
 Abstract classes
@@ -28,28 +63,150 @@ Concrete child classes
 """
 
 
-class FullCompendiumView(JsonView):
+@method_decorator(etag(corpus_etag), name="get")
+class FullCompendiumView(ExportMixin, JsonView):
     """
-    Retrieve the entire compendium in a JSON response.
+    Retrieve the entire compendium in a JSON response. The response is
+    streamed, so the size of the compendium doesn't affect how much memory
+    the request takes.
+
+    The compendium can also be exported as NDJSON, CSV or BibTeX, or with only
+    a subset of fields, using the `format` and `fields` parameters (see
+    ExportMixin).
+
+    Full exports in the formats that snapshots are written in (see
+    search.snapshots) are redirected to the latest snapshot, if there is one
+    and the compendium hasn't changed since it was written, so that they're
+    served as static files instead. Otherwise the export is streamed from the
+    database.
+
+    Responses include an ETag derived from the corpus version, so clients that
+    already have an up-to-date copy of the compendium get a 304 (Not Modified)
+    response without anything being read from the database.
     """
 
+    stream_querysets = True
+    snapshots = compendium_snapshots
+
+    def get(self, request):
+        try:
+            export_format, fields = self.get_export_params(request.GET)
+        except JsonAPIError as ex:
+            return self.render_json_error(ex)
+
+        if not request.GET.get("fields"):
+            accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+            url = self.snapshots.latest_url(export_format, accept_encoding)
+            if url is not None:
+                return redirect(url)
+
+        if fields is None:
+            return super().get(request)
+        return self.render_export(self.get_data(request.GET), export_format, fields)
+
     def get_data(self, *args, **kwargs):
         return CompendiumEntry.objects.all()
 
 
+@method_decorator(etag(search_results_etag), name="get")
 class BasicSearchAPIView(BasicSearchMixin, JsonView):
     """
     Run basic search against Solr and get results as JSON.
+
+    Results are paged with a cursor rather than by page number, since Solr
+    can find each page after a cursor without sorting all of the results
+    that came before it. The first page is returned for the cursor "*" (or
+    if no cursor is given), and every page includes the `next_cursor` for
+    the page after it, which is null on the last page.
+
+    Responses include an ETag that changes whenever the search results might
+    have, so repeated searches can be revalidated without querying Solr.
     """
 
     search_engine = SearchEngine()
 
     def get_data(self, get_params, **kwargs):
+        self.check_query_params(get_params)
+        results = self.execute_basic_search(self.search_params(get_params))
+        return self.format_results(results)
+
+    def check_query_params(self, get_params):
         query = get_params.get("query", None)
         if query is None:
             raise JsonAPIError("'query' parameter missing", status_code=422)
+        if "page" in get_params:
+            raise JsonAPIError(
+                "'page' is not supported; use 'cursor' to page through results",
+                status_code=422,
+            )
+
+    def search_params(self, get_params):
+        """
+        Get the parameters to search with, starting from the first page of
+        results if the client didn't give us a cursor.
+        """
+        params = get_params.copy()
+        if not params.get("cursor"):
+            params["cursor"] = "*"
+        return params
+
+    def format_results(self, results: dict):
+        return {
+            "hits": results["response"]["numFound"],
+            "rows": results["meta"]["rows"],
+            "next_cursor": results["meta"].get("next_cursor"),
+            "results": results["response"]["docs"],
+        }
+
+
+class AsyncBasicSearchAPIView(
+    AsyncViewMixin, AsyncBasicSearchMixin, BasicSearchAPIView
+):
+    """
+    Variant of BasicSearchAPIView that queries Solr without blocking the
+    worker. Only useful when the site is served over ASGI.
+    """
+
+    async def get(self, request):
+        get_params = request.GET
+        try:
+            self.check_query_params(get_params)
+            results = await self.execute_basic_search_async(
+                self.search_params(get_params)
+            )
+        except JsonAPIError as ex:
+            return self.render_json_error(ex)
 
-        results = self.execute_basic_search(get_params)
-        results = list(results)
+        return self.render_json(self.format_results(results))
 
-        return results
+
+class SearchStatsView(JsonView):
+    """
+    Report statistics about the search backend for the worker process that
+    handles the request, e.g. the state of its connection pools to Solr, as
+    well as the indexing lag. Only available to staff members.
+    """
+
+    search_engine = SearchEngine()
+    async_search_engine = AsyncSearchEngine()
+
+    def get_data(self, get_params, **kwargs):
+        if not self.request.user.is_staff:
+            raise JsonAPIError(
+                "Only staff members may view search stats", status_code=403
+            )
+
+        return {
+            "pid": os.getpid(),
+            "solr_pool": self.search_engine.pool_stats(),
+            "solr_async_pool": self.async_search_engine.pool_stats(),
+            "result_cache": self.search_engine.cache.stats(),
+            "index_outbox": self.outbox_stats(),
+        }
+
+    def outbox_stats(self):
+        age = IndexUpdate.objects.oldest_pending_age()
+        return {
+            "depth": IndexUpdate.objects.depth(),
+            "oldest_pending_age": None if age is None else age.total_seconds(),
+        }
@@ -6,12 +6,24 @@ import abc
 import json
 import logging
 
+from asgiref.sync import markcoroutinefunction
 from django.core import serializers
 from django.db.models import QuerySet
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.decorators import classonlymethod
+from search.export import (
+    BIBTEX_FIELDS,
+    export_rows,
+    serialize_json,
+    to_bibtex,
+    to_csv,
+    to_json,
+    to_ndjson,
+    validate_fields,
+)
 from search.forms import BasicSearchForm
-from search.solr import SearchEngine
-from typing import Dict, Optional, Union
+from search.solr import AsyncSearchEngine, SearchEngine, SolrQueryError
+from typing import Dict, List, Optional, Tuple, Union
 
 """
 Definitions for JSON REST API
@@ -32,8 +44,16 @@ class JsonAPIError(Exception):
 class JsonResponseMixin(metaclass=abc.ABCMeta):
     """
     Mixin used to render a JSON response from database queries.
+
+    QuerySets are serialized all at once by default. Views that return large
+    QuerySets should set `stream_querysets = True`, in which case the
+    response is streamed to the client while the QuerySet is read from the
+    database in chunks of `stream_chunk_size` rows.
     """
 
+    stream_querysets = False
+    stream_chunk_size = 500
+
     def render_to_json_response(
         self, get_params: dict, context: Optional[dict] = None,
     ):
@@ -42,8 +62,6 @@ class JsonResponseMixin(metaclass=abc.ABCMeta):
         """
 
         try:
-            status_code = 200
-
             if context is not None:
                 query_results = self.get_data(get_params, context=context)
             else:
@@ -51,21 +69,50 @@ class JsonResponseMixin(metaclass=abc.ABCMeta):
                 # can use their own defaults.
                 query_results = self.get_data(get_params)
 
-            if isinstance(query_results, QuerySet):
-                query_results = serializers.serialize("json", query_results)
-            elif isinstance(query_results, str):
-                # Assume that the string is already JSON-formatted
-                pass
-            else:
-                query_results = json.dumps(query_results)
-
         except JsonAPIError as ex:
             # Error processing the query
-            status_code = ex.status_code
-            query_results = json.dumps({"error": str(ex)})
+            return self.render_json_error(ex)
+
+        return self.render_json(query_results)
+
+    def render_json(self, query_results: Union[Dict, QuerySet, str]):
+        """
+        Serialize the results of a query into a JSON response.
+        """
 
+        if isinstance(query_results, QuerySet) and self.stream_querysets:
+            return self.render_json_stream(query_results)
+        elif isinstance(query_results, QuerySet):
+            query_results = serializers.serialize("json", query_results)
+        elif isinstance(query_results, str):
+            # Assume that the string is already JSON-formatted
+            pass
+        else:
+            query_results = json.dumps(query_results)
+
+        return HttpResponse(query_results, content_type="application/json", status=200,)
+
+    def render_json_stream(self, queryset: QuerySet):
+        """
+        Serialize a QuerySet into a streaming JSON response. The output is
+        the same as that of serializers.serialize("json", queryset), but
+        only one chunk of the QuerySet is held in memory at a time.
+        """
+        return StreamingHttpResponse(
+            serialize_json(queryset, self.stream_chunk_size),
+            content_type="application/json",
+            status=200,
+        )
+
+    def render_json_error(self, ex: JsonAPIError):
+        """
+        Create a JSON response describing an error raised while handling a
+        request to the API.
+        """
         return HttpResponse(
-            query_results, content_type="application/json", status=status_code,
+            json.dumps({"error": str(ex)}),
+            content_type="application/json",
+            status=ex.status_code,
         )
 
     @abc.abstractmethod
@@ -79,6 +126,89 @@ class JsonResponseMixin(metaclass=abc.ABCMeta):
         pass
 
 
+class ExportMixin:
+    """
+    Mixin for JSON API views returning a QuerySet of compendium entries, which
+    allows clients to export a selection of the entries' fields in a flat
+    format (see search.export) using the following parameters:
+
+    format : "json", "ndjson", "csv" or "bibtex"
+        The format of the response. Defaults to "json".
+
+    fields : str
+        A comma-separated list of fields to export. If no fields are given,
+        NDJSON and CSV exports contain every field that can be exported, while
+        JSON responses are serialized with the Django serializer (as they are
+        without this mixin). BibTeX exports always contain the same fields.
+    """
+
+    export_content_types = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv; charset=utf-8",
+        "bibtex": "application/x-bibtex; charset=utf-8",
+    }
+
+    # Exports that are downloaded as files, rather than displayed
+    export_filenames = {"csv": "compendium.csv", "bibtex": "compendium.bib"}
+
+    # Number of rows to read from the database at a time
+    export_chunk_size = 1000
+
+    def get_export_params(self, get_params) -> Tuple[str, Optional[List[str]]]:
+        """
+        Validate the format and fields requested by the client. The fields are
+        returned as None if the Django serializer should be used instead.
+        """
+        export_format = get_params.get("format", "json")
+        if export_format not in self.export_content_types:
+            formats = ", ".join(self.export_content_types)
+            raise JsonAPIError(
+                f"Unknown format {export_format!r} (available formats: {formats})",
+                status_code=422,
+            )
+
+        fields = get_params.get("fields")
+        if export_format == "json" and not fields:
+            return export_format, None
+        if export_format == "bibtex":
+            if fields:
+                raise JsonAPIError(
+                    "'fields' can't be used with BibTeX exports", status_code=422
+                )
+            return export_format, BIBTEX_FIELDS
+
+        try:
+            return export_format, validate_fields(fields)
+        except ValueError as ex:
+            raise JsonAPIError(str(ex), status_code=422)
+
+    def render_export(
+        self, queryset: QuerySet, export_format: str, fields: List[str]
+    ) -> StreamingHttpResponse:
+        """
+        Create a streaming response that exports the selected fields of every
+        entry in a QuerySet.
+        """
+        rows = export_rows(queryset, fields, chunk_size=self.export_chunk_size)
+        if export_format == "csv":
+            content = to_csv(rows, fields)
+        elif export_format == "ndjson":
+            content = to_ndjson(rows)
+        elif export_format == "bibtex":
+            content = to_bibtex(rows)
+        else:
+            content = to_json(rows)
+
+        response = StreamingHttpResponse(
+            content, content_type=self.export_content_types[export_format]
+        )
+        if export_format in self.export_filenames:
+            filename = self.export_filenames[export_format]
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
 """
 Search mixins
 """
@@ -99,6 +229,9 @@ class BasicSearchMixin(metaclass=abc.ABCMeta):
     # Wrapper class for querying Solr
     search_engine = SearchEngine()
 
+    # Form used to validate search parameters
+    search_form_class = BasicSearchForm
+
     def check_basic_search(self, request) -> bool:
         """
         Check whether or not the user chose to execute a basic search.
@@ -115,24 +248,91 @@ class BasicSearchMixin(metaclass=abc.ABCMeta):
         """
         if isinstance(data, dict):
             self.search_logger.info(f"Received search params: {data}")
-            return BasicSearchForm(data=data)
+            return self.search_form_class(data=data)
         else:
             self.search_logger.info(f"Received search params: {data.GET.dict()}")
-            return BasicSearchForm(data=data.GET)
+            return self.search_form_class(data=data.GET)
 
     def execute_basic_search(self, request):
         """
         Run a basic search request. Return all compendium entries matching
         the input query.
         """
+        query = self.clean_basic_search(request)
+        try:
+            return self.search_engine.basic_search(query)
+        except SolrQueryError as ex:
+            raise self.search_error(ex, query)
+
+    def clean_basic_search(self, request) -> dict:
+        """
+        Validate the parameters for a basic search request, returning the
+        cleaned data that should be passed to the search engine.
+        """
 
         form = self.create_search_form(request)
 
-        # TODO: more robust error checking
         if form.is_valid():
             self.search_logger.debug(f"Cleaned search params: {form.cleaned_data}")
-            results = self.search_engine.basic_search(form.cleaned_data)
+            return form.cleaned_data
         else:
-            raise Exception(str(form.errors))
+            raise JsonAPIError(form.errors.as_text(), status_code=422)
+
+    def search_error(self, ex: SolrQueryError, query: dict) -> Exception:
+        """
+        Get the exception to raise when Solr rejects a search. Errors caused
+        by the client's parameters (which for valid search forms can only be
+        a cursor that decodes, but isn't one that Solr created) are reported
+        to the client, while errors in Solr itself are re-raised as-is.
+        """
+        if 400 <= ex.status_code < 500 and query.get("cursor") not in (None, "*"):
+            self.search_logger.info(f"Solr rejected cursor: {ex}")
+            return JsonAPIError("Invalid cursor", status_code=422)
+        return ex
+
+
+class AsyncBasicSearchMixin(BasicSearchMixin):
+    """
+    Variant of BasicSearchMixin for async views, which runs searches with
+    AsyncSearchEngine.
+    """
+
+    # Wrapper class for querying Solr from an event loop
+    async_search_engine = AsyncSearchEngine()
+
+    async def execute_basic_search_async(self, request):
+        """
+        Coroutine version of BasicSearchMixin.execute_basic_search.
+        """
+        query = self.clean_basic_search(request)
+        try:
+            return await self.async_search_engine.basic_search(query)
+        except SolrQueryError as ex:
+            raise self.search_error(ex, query)
+
+
+"""
+Async views
+"""
+
+
+class AsyncViewMixin:
+    """
+    Mixin for class-based views whose HTTP method handlers are coroutines
+    (async def get(...), etc.). Django awaits the view when it's served over
+    ASGI, so a single worker process can wait on many requests at once.
+    """
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        # Mark the view function as a coroutine function so that Django's
+        # request handler awaits the coroutine returned by dispatch().
+        return markcoroutinefunction(view)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
 
-        return results
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
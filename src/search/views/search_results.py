@@ -5,11 +5,19 @@ User-facing views for performing search
 import math
 import re
 
+from asgiref.sync import sync_to_async
 from django.core.paginator import Paginator
+from django.http import QueryDict
 from django.shortcuts import render, redirect
 from django.views import View
-from entries.models import CompendiumEntry
-from search.views.mixins import BasicSearchMixin
+from search.documents import entry_from_document
+from search.views.mixins import (
+    AsyncBasicSearchMixin,
+    AsyncViewMixin,
+    BasicSearchMixin,
+    JsonAPIError,
+)
+from typing import List, Tuple
 
 
 class SearchView(BasicSearchMixin, View):
@@ -19,17 +27,48 @@ class SearchView(BasicSearchMixin, View):
 
     default_pagination = 10
 
+    template_name = "entry_list.html"
+
+    # Name of the GET parameter holding the search string
+    query_param = "query"
+
+    # Labels for the facets that search results can be refined by
+    facet_labels = {"tags": "Tags", "publisher": "Publisher", "year": "Year"}
+
     def get(self, request):
-        req = request.GET.dict()
-        query = req.setdefault("query", "")
+        query = request.GET.get(self.query_param, "")
         self.search_logger.info(f"QUERY = {query}")
-        results = self.execute_basic_search(req)
-        search_form = self.create_search_form(req)
+        try:
+            results = self.execute_basic_search(request)
+        except JsonAPIError as ex:
+            return self.render_search_error(request, ex)
+        context = self.get_results_context(request, results)
+        return render(request, self.template_name, context)
+
+    def render_search_error(self, request, ex: JsonAPIError):
+        """
+        Re-render the search form along with its errors when a search can't be
+        made with the parameters that were given (e.g. an invalid year).
+        """
+        search_form = self.create_search_form(request)
+        context = {
+            "query": request.GET.get(self.query_param, ""),
+            "search_form": search_form,
+            "search_errors": search_form.errors if search_form.errors else str(ex),
+        }
+        return render(request, self.template_name, context, status=ex.status_code)
+
+    def get_results_context(self, request, results: dict) -> dict:
+        """
+        Create the context used to render the results of a search.
+        """
+        query = request.GET.get(self.query_param, "")
+        search_form = self.create_search_form(request)
 
         # Populate some CompendiumEntry objects with the data that we found
         # from Solr
         entries = results["response"]["docs"]
-        entries = [CompendiumEntry(**entry) for entry in entries]
+        entries = [entry_from_document(doc) for doc in entries]
 
         hits = results["response"]["numFound"]
         rows = results["meta"]["rows"]  # Entries per page
@@ -51,6 +90,9 @@ class SearchView(BasicSearchMixin, View):
             "start": results["response"]["start"] + 1,
             "end": results["response"]["start"] + len(entries),
             "entries": entries,
+            "facets": self.get_facets(request, results),
+            # Parameters for links to other pages of the same search
+            "search_params": self._search_params(request).urlencode(),
         }
 
         # Check spelling
@@ -59,12 +101,83 @@ class SearchView(BasicSearchMixin, View):
         if not correctly_spelled:
             context["suggested_query"] = suggested_query
 
-        return render(request, "entry_list.html", context)
+        return context
+
+    def get_facets(self, request, results: dict) -> List[dict]:
+        """
+        Create a list of the facets returned by Solr, with links that add
+        each facet value to (or remove it from) the search's filters.
+        """
+        facet_counts = results.get("facet_counts", {})
+        facets = {
+            name: _pairs(counts)
+            for (name, counts) in facet_counts.get("facet_fields", {}).items()
+        }
+
+        year_counts = facet_counts.get("facet_ranges", {}).get("year", {})
+        gap = int(year_counts.get("gap", self.search_engine.year_facet_gap))
+        facets["year"] = [
+            (start, count, f"{start}\u2013{int(start) + gap - 1}")
+            for (start, count) in _pairs(year_counts.get("counts", []))
+        ]
+
+        context = []
+        for (name, label) in self.facet_labels.items():
+            selected = request.GET.getlist(name)
+            values = []
+            for (value, count, *value_label) in facets.get(name, []):
+                values.append(
+                    {
+                        "value": value,
+                        "label": value_label[0] if value_label else value,
+                        "count": count,
+                        "selected": value in selected,
+                        "url": self._toggle_facet_url(request, name, value),
+                    }
+                )
+
+            # Always show the selected values, so that they can be removed
+            shown = set(v["value"] for v in values)
+            for value in selected:
+                if value not in shown:
+                    values.append(
+                        {
+                            "value": value,
+                            "label": value,
+                            "count": None,
+                            "selected": True,
+                            "url": self._toggle_facet_url(request, name, value),
+                        }
+                    )
+
+            if len(values) > 0:
+                context.append({"name": name, "label": label, "values": values})
+
+        return context
 
     """
     Internal API
     """
 
+    def _search_params(self, request) -> QueryDict:
+        # Get the parameters of the current search, minus the page number
+        params = request.GET.copy()
+        params.pop("page", None)
+        return params
+
+    def _toggle_facet_url(self, request, name: str, value: str) -> str:
+        # Create a link that selects a facet value if it isn't selected, and
+        # deselects it otherwise. Changing the filters takes the user back
+        # to the first page of results.
+        params = self._search_params(request)
+        values = params.getlist(name)
+        if value in values:
+            values.remove(value)
+        else:
+            values.append(value)
+        params.setlist(name, values)
+        return f"?{params.urlencode()}"
+
     def _check_spelling(self, query: str, results: dict):
         """
         Check the spelling of the results returned by execute_basic_search.
@@ -104,3 +217,34 @@ class SearchView(BasicSearchMixin, View):
             query = re.sub(f"\\b{word}\\b", replacement, query, flags=re.IGNORECASE)
 
         return correctly_spelled, query
+
+
+class AsyncSearchView(AsyncViewMixin, AsyncBasicSearchMixin, SearchView):
+    """
+    Variant of SearchView that queries Solr without blocking the worker. Only
+    useful when the site is served over ASGI (see encryption_compendium.asgi).
+    """
+
+    async def get(self, request):
+        query = request.GET.get(self.query_param, "")
+        self.search_logger.info(f"QUERY = {query}")
+        try:
+            results = await self.execute_basic_search_async(request)
+        except JsonAPIError as ex:
+            return await sync_to_async(self.render_search_error)(request, ex)
+        context = self.get_results_context(request, results)
+
+        # Rendering the results may hit the database, which has to happen
+        # outside of the event loop.
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+"""
+Helper functions
+"""
+
+
+def _pairs(counts: list) -> List[Tuple]:
+    # Solr returns facet counts as a flat list of alternating values and
+    # counts, e.g. ["crypto", 10, "privacy", 5]
+    return list(zip(counts[::2], counts[1::2]))
@@ -26,3 +26,26 @@ def unique_slug_generator(instance, new_slug=None):
         )
         return unique_slug_generator(instance, new_slug=new_slug)
     return slug
+
+
+def unique_slugs(model, titles, max_length=250):
+    """
+    Generate unique slugs for a batch of new model instances with the given
+    titles, using a single query to find the slugs that are already taken.
+    """
+    # Leave room for the random suffix added to duplicate slugs
+    slugs = [slugify(title)[: max_length - 5] for title in titles]
+    taken = set(
+        model.objects.filter(slug__in=set(slugs)).values_list("slug", flat=True)
+    )
+
+    unique = []
+    for slug in slugs:
+        new_slug = slug
+        while new_slug in taken:
+            new_slug = "{slug}-{randstr}".format(
+                slug=slug, randstr=random_string_generator(size=4)
+            )
+        taken.add(new_slug)
+        unique.append(new_slug)
+    return unique
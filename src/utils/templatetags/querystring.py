@@ -0,0 +1,24 @@
+"""
+Template tags for building links that keep the current query parameters.
+"""
+
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def querystring(context, **kwargs):
+    """
+    Build a query string from the GET parameters of the current request, with
+    the parameters given as keyword arguments replaced (or removed, if they're
+    None). For instance, {% querystring page=2 %} links to the second page of a
+    list while keeping its filters and sort order.
+    """
+    params = context["request"].GET.copy()
+    for (key, value) in kwargs.items():
+        if value is None:
+            params.pop(key, None)
+        else:
+            params[key] = value
+    return f"?{params.urlencode()}"
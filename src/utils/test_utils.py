@@ -3,14 +3,24 @@ Various helpful functions and classes for running tests.
 """
 
 import abc
+import contextlib
 import dotenv
+import json
 import os
 import random
+import threading
 import time
 
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection, connections
 from django.test import TestCase, Client, tag
+from django.test.utils import CaptureQueriesContext
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
+from django.urls import URLResolver, get_resolver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from selenium import webdriver
+from typing import Callable, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
 from uuid import UUID
 
 from users.models import User
@@ -35,6 +45,94 @@ def create_random_user(rd):
     return username, email, password
 
 
+"""
+---------------------------------------------------
+Fake Solr server
+---------------------------------------------------
+"""
+
+
+def empty_solr_response(params: dict) -> dict:
+    """
+    Create a response to a Solr query that didn't match any documents.
+    """
+    return {
+        "responseHeader": {"status": 0, "QTime": 0, "params": params},
+        "response": {"numFound": 0, "start": int(params.get("start", 0)), "docs": []},
+    }
+
+
+class FakeSolrServer:
+    """
+    A minimal HTTP server that imitates the parts of the Solr API used by the
+    site. The server records every request that it receives and answers with
+    the output of a configurable response function, so that tests can check
+    the queries we send without needing a running Solr instance. The response
+    function returns the JSON payload of the response, or a (status code,
+    payload) tuple to answer with an error.
+
+    Usage
+    -----
+        with FakeSolrServer() as solr:
+            engine = SearchEngine(solr_url=solr.url)
+            ...
+            self.assertEqual(len(solr.requests), 1)
+    """
+
+    def __init__(self, respond=empty_solr_response):
+        self.respond = respond
+        self.requests = []
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Use HTTP/1.1 so that clients can keep connections alive
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                self._reply(url.path, parse_qs(url.query), None)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                self._reply(url.path, parse_qs(url.query), body)
+
+            def _reply(self, path, query, body):
+                params = {k: v[0] if len(v) == 1 else v for (k, v) in query.items()}
+                server.requests.append({"path": path, "params": params, "body": body})
+                response = server.respond(params)
+                (status, response) = (
+                    response if isinstance(response, tuple) else (200, response)
+                )
+                payload = json.dumps(response).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/solr/compendium"
+
+    def __enter__(self):
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
 """
 ---------------------------------------------------
 Generic abstract testing class
@@ -176,3 +274,273 @@ Unit testing base class
 class UnitTest(TestCase, AbstractTestCase):
     def setUp(self, **kwargs):
         AbstractTestCase.setUp(self, **kwargs)
+
+    @contextlib.contextmanager
+    def captureOnCommitCallbacks(self, *, using=DEFAULT_DB_ALIAS, execute=False):
+        """
+        Capture the callbacks that are registered with transaction.on_commit
+        inside the block, and run them afterwards if `execute` is True. The
+        transaction wrapping every test never commits, so these callbacks
+        aren't run otherwise.
+
+        This is a backport of TestCase.captureOnCommitCallbacks from Django
+        3.2, and can be removed once the site is upgraded.
+        """
+        callbacks = []
+        n_callbacks = len(connections[using].run_on_commit)
+        try:
+            yield callbacks
+        finally:
+            registered = connections[using].run_on_commit[n_callbacks:]
+            callbacks[:] = [func for (_, func) in registered]
+            if execute:
+                for callback in callbacks:
+                    callback()
+
+
+"""
+---------------------------------------------------
+Query and latency budgets for views
+---------------------------------------------------
+"""
+
+
+def url_routes(patterns=None, prefix: str = "") -> List[str]:
+    """
+    List the routes of the site's URL patterns (from
+    encryption_compendium/urls.py by default), prefixing the routes of included
+    URL configurations with the route that includes them, e.g.
+    "^research/^dashboard". Views that are provided by Django itself (e.g. the
+    admin site and static files) are skipped.
+    """
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+
+    routes = []
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            routes += url_routes(pattern.url_patterns, route)
+        elif not pattern.callback.__module__.startswith("django."):
+            routes.append(route)
+    return routes
+
+
+class ViewBudget:
+    """
+    The most that a request to one of the site's views is allowed to cost.
+
+    Parameters
+    ----------
+    route : str
+        The route of the URL pattern that handles the request, as listed by
+        url_routes.
+
+    path : Union[str, Callable]
+        The path to request, or a function that takes the test case and
+        returns the path (for paths that depend on the seeded data, e.g. the
+        slug of an entry).
+
+    max_queries : int
+        The maximum number of SQL queries that the request may make.
+
+    max_solr_calls : int
+        The maximum number of requests to Solr that the request may make.
+
+    max_seconds : float
+        The maximum wall time of the request, including streaming the response.
+        Only checked when CHECK_VIEW_LATENCY is set (see ViewBudgetTest).
+
+    method : str
+        The HTTP method of the request.
+
+    data : Optional[Union[Dict, Callable]]
+        The GET parameters or POST data of the request, or a function that
+        takes the test case and returns them.
+
+    user : Optional[str]
+        The attribute of the test case holding the user that makes the
+        request, or None to make the request anonymously.
+
+    status : int
+        The expected status code of the response.
+    """
+
+    def __init__(
+        self,
+        route: str,
+        path: Union[str, Callable],
+        max_queries: int,
+        max_solr_calls: int = 0,
+        max_seconds: float = 2.0,
+        method: str = "get",
+        data: Optional[Union[Dict, Callable]] = None,
+        user: Optional[str] = None,
+        status: int = 200,
+    ):
+        self.route = route
+        self.path = path
+        self.max_queries = max_queries
+        self.max_solr_calls = max_solr_calls
+        self.max_seconds = max_seconds
+        self.method = method
+        self.data = data
+        self.user = user
+        self.status = status
+
+    def __str__(self):
+        path = self.path if isinstance(self.path, str) else self.route
+        return f"{self.method.upper()} {path}" + (
+            f" (as {self.user})" if self.user else ""
+        )
+
+
+class RequestProfiler:
+    """
+    Makes requests to the site with Django's test client, and records how much
+    each one cost: the SQL queries it made, the number of requests it sent to
+    Solr, and its wall time.
+
+    Parameters
+    ----------
+    solr : Optional[FakeSolrServer]
+        The fake Solr server that the site is sending its queries to (through
+        settings.SOLR_URL), if any.
+
+    Usage
+    -----
+        with FakeSolrServer() as solr, override_settings(SOLR_URL=solr.url):
+            cost = RequestProfiler(solr).request("get", "/search", {"query": "rsa"})
+            cost["queries"], cost["solr_calls"], cost["seconds"]
+    """
+
+    def __init__(self, solr: Optional[FakeSolrServer] = None):
+        self.solr = solr
+
+    def request(
+        self, method: str, path: str, data: Optional[Dict] = None, user=None
+    ) -> Dict:
+        """
+        Make a request (as `user`, if it isn't None) and return its cost, along
+        with the response's status code and the SQL of every query.
+
+        Caches are cleared beforehand, so that the cost doesn't depend on the
+        requests that were made before.
+        """
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        for cache in caches.all():
+            cache.clear()
+
+        n_solr_calls = self._solr_calls()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(path, data or {})
+            if response.streaming:
+                b"".join(response.streaming_content)
+        seconds = time.perf_counter() - start
+
+        return {
+            "status": response.status_code,
+            "queries": len(queries),
+            "sql": [query["sql"] for query in queries],
+            "solr_calls": self._solr_calls() - n_solr_calls,
+            "seconds": seconds,
+        }
+
+    def _solr_calls(self) -> int:
+        return 0 if self.solr is None else len(self.solr.requests)
+
+
+class ViewBudgetTest(UnitTest):
+    """
+    Base class for tests that hold the views of the site to their budgets.
+
+    Subclasses declare a ViewBudget for every URL pattern of the site (see
+    url_routes), and implement seed() to fill the database. Each budget is
+    measured once the data have been seeded at each of data_sizes; the test
+    fails if a request exceeds its budget, or if its number of queries differs
+    between data sizes (e.g. because a view makes a query per entry).
+
+    Wall time depends on the machine running the tests, so the max_seconds of
+    each budget is only checked when the CHECK_VIEW_LATENCY environment
+    variable is set (e.g. in .env).
+    """
+
+    budgets: List[ViewBudget] = []
+
+    # The sizes of the data that each view is measured with
+    data_sizes = (5, 60)
+
+    @abc.abstractmethod
+    def seed(self, size: int):
+        """
+        Grow the data in the database to the given size.
+        """
+        pass
+
+    def check_latency(self) -> bool:
+        """
+        Check whether the wall time of requests should be held to their
+        budgets.
+        """
+        dotenv.load_dotenv()
+        return bool(os.getenv("CHECK_VIEW_LATENCY"))
+
+    def measure_budgets(self, profiler: RequestProfiler) -> Dict[int, List[Dict]]:
+        """
+        Measure the cost of every budgeted request at each of the data sizes.
+        """
+        costs = {}
+        for size in self.data_sizes:
+            self.seed(size)
+            costs[size] = [self.measure(profiler, budget) for budget in self.budgets]
+        return costs
+
+    def measure(self, profiler: RequestProfiler, budget: ViewBudget) -> Dict:
+        path = budget.path if isinstance(budget.path, str) else budget.path(self)
+        data = budget.data(self) if callable(budget.data) else budget.data
+        user = getattr(self, budget.user) if budget.user else None
+        return profiler.request(budget.method, path, data, user=user)
+
+    def assertWithinBudgets(self, profiler: RequestProfiler):
+        """
+        Check every budget at every data size.
+        """
+        costs = self.measure_budgets(profiler)
+        check_latency = self.check_latency()
+        (smallest, *others) = self.data_sizes
+        for (ii, budget) in enumerate(self.budgets):
+            with self.subTest(str(budget)):
+                for size in self.data_sizes:
+                    cost = costs[size][ii]
+                    self.assertEqual(cost["status"], budget.status)
+                    self.assertLessEqual(
+                        cost["queries"],
+                        budget.max_queries,
+                        _describe_queries(cost["sql"]),
+                    )
+                    self.assertLessEqual(cost["solr_calls"], budget.max_solr_calls)
+                    if check_latency:
+                        self.assertLessEqual(cost["seconds"], budget.max_seconds)
+
+                for size in others:
+                    self.assertEqual(
+                        costs[size][ii]["queries"],
+                        costs[smallest][ii]["queries"],
+                        f"The number of queries grew from {smallest} to {size} "
+                        "rows of data:\n" + _describe_queries(costs[size][ii]["sql"]),
+                    )
+
+    def assertAllRoutesBudgeted(self):
+        """
+        Check that every URL pattern of the site has at least one budget.
+        """
+        budgeted = {budget.route for budget in self.budgets}
+        self.assertEqual([r for r in url_routes() if r not in budgeted], [])
+        self.assertEqual([r for r in budgeted if r not in url_routes()], [])
+
+
+def _describe_queries(sql: List[str]) -> str:
+    return "\n".join(f"{ii + 1}. {query}" for (ii, query) in enumerate(sql))
@@ -156,6 +156,31 @@ class URLTextInput(IconTextInput):
     placeholder = "https://example.com"
 
 
+class SeparatedValuesInput(forms.TextInput):
+    """
+    TextInput widget for entering multiple values in a single input, e.g.
+    "alice; bob". Values may also be given as separate parameters (e.g.
+    ?authors=alice&authors=bob), in which case they're all returned.
+    """
+
+    def __init__(self, *args, separator: str = ",", **kwargs):
+        self.separator = separator
+        kwargs.setdefault("attrs", {})
+        kwargs["attrs"].setdefault("class", "uk-input")
+        super().__init__(*args, **kwargs)
+
+    def value_from_datadict(self, data, files, name):
+        try:
+            return data.getlist(name)
+        except AttributeError:
+            return data.get(name)
+
+    def format_value(self, value):
+        if isinstance(value, (list, tuple)):
+            value = f"{self.separator} ".join(str(v) for v in value)
+        return super().format_value(value)
+
+
 class SearchInput(IconTextInput):
     """
     Custom TextInput widget for search bars.